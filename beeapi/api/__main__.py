@@ -1,3 +1,4 @@
+import os
 import typing
 
 import click
@@ -32,12 +33,120 @@ from beeapi.api import app as app_module
     show_default=True,
 )
 @click.option("--reload", is_flag=True, default=False, help="Enable auto-reload.")
+@click.option(
+    "--query-engine",
+    type=click.Choice([beeconsts.QUERY_ENGINE_THREAD, beeconsts.QUERY_ENGINE_PROCESS]),
+    default=beeconsts.DEFAULT_QUERY_ENGINE,
+    help="Run queries in a pool of threads or of processes; processes scale scoring past one core per worker.",
+    show_default=True,
+)
+@click.option(
+    "--query-workers",
+    type=int,
+    default=beeconsts.DEFAULT_QUERY_WORKERS,
+    help="Number of query threads/processes per worker process.",
+    show_default=True,
+)
+@click.option(
+    "--query-queue-size",
+    type=int,
+    default=beeconsts.DEFAULT_QUERY_QUEUE_SIZE,
+    help="Number of queries allowed to wait for a free query thread before new ones are rejected with a 503.",
+    show_default=True,
+)
+@click.option(
+    "--query-timeout",
+    type=float,
+    default=beeconsts.DEFAULT_QUERY_TIMEOUT_SECONDS,
+    help="Seconds to wait for a query to finish before responding with a 504.",
+    show_default=True,
+)
+@click.option(
+    "--phrase-engine",
+    type=click.Choice([beeconsts.PHRASE_ENGINE_WHOOSH, beeconsts.PHRASE_ENGINE_MEMORY]),
+    default=beeconsts.DEFAULT_PHRASE_ENGINE,
+    help="Look up the dictionary phrases with Whoosh, or with a (much faster) in-memory index built from it.",
+    show_default=True,
+)
+@click.option(
+    "--job-store",
+    type=click.Choice([beeconsts.JOB_STORE_MEMORY, beeconsts.JOB_STORE_SQLITE]),
+    default=beeconsts.DEFAULT_JOB_STORE,
+    help="Where to keep job statuses and results; use sqlite to share jobs between multiple --workers.",
+    show_default=True,
+)
+@click.option(
+    "--optimize-interval",
+    type=float,
+    default=beeconsts.DEFAULT_OPTIMIZE_INTERVAL_SECONDS,
+    help="Seconds between checks whether the index segments need merging; 0 disables background merges.",
+    show_default=True,
+)
+@click.option(
+    "--prune-matches",
+    is_flag=True,
+    default=beeconsts.DEFAULT_PRUNE_MATCHES,
+    help="Skip the parts of queries already covered by a direct match of a longer phrase; faster, but less exhaustive.",
+)
+@click.option(
+    "--stem-lookup/--no-stem-lookup",
+    default=beeconsts.DEFAULT_STEM_LOOKUP,
+    help="Look the subphrases of queries up among the dictionary phrases first, before running phrase queries for them.",
+    show_default=True,
+)
+@click.option(
+    "--warmup-queries",
+    type=click.Path(dir_okay=False),
+    default=beeconsts.DEFAULT_WARMUP_QUERIES_PATH,
+    help="File of queries (one per line) to warm the index up on before reporting ready; by default, the most frequent queries of the previous run.",
+    show_default=True,
+)
+@click.option(
+    "--warmup-query-count",
+    type=int,
+    default=beeconsts.DEFAULT_WARMUP_QUERY_COUNT,
+    help="Number of warm-up queries to run at startup; 0 only warms up the index itself.",
+    show_default=True,
+)
+@click.option(
+    "--record-queries/--no-record-queries",
+    default=beeconsts.DEFAULT_RECORD_QUERIES,
+    help="Save the most frequent queries to the --warmup-queries file on shutdown, to warm up the next run on.",
+    show_default=True,
+)
 def main(
     port: str,
     workers: int,
     log_level: str,
     reload: bool,
+    query_engine: str,
+    query_workers: int,
+    query_queue_size: int,
+    query_timeout: float,
+    phrase_engine: str,
+    job_store: str,
+    optimize_interval: float,
+    prune_matches: bool,
+    stem_lookup: bool,
+    warmup_queries: str,
+    warmup_query_count: int,
+    record_queries: bool,
 ):
+    # The app is built by a factory in each worker process,
+    # so the executor settings are passed down via the environment.
+    os.environ[beeconsts.ENV_QUERY_ENGINE] = query_engine
+    os.environ[beeconsts.ENV_QUERY_WORKERS] = str(query_workers)
+    os.environ[beeconsts.ENV_QUERY_QUEUE_SIZE] = str(query_queue_size)
+    os.environ[beeconsts.ENV_QUERY_TIMEOUT] = str(query_timeout)
+    os.environ[beeconsts.ENV_PHRASE_ENGINE] = phrase_engine
+    os.environ[beeconsts.ENV_JOB_STORE] = job_store
+    os.environ[beeconsts.ENV_OPTIMIZE_INTERVAL] = str(optimize_interval)
+    os.environ[beeconsts.ENV_PRUNE_MATCHES] = str(prune_matches).lower()
+    os.environ[beeconsts.ENV_STEM_LOOKUP] = str(stem_lookup).lower()
+    os.environ[beeconsts.ENV_WARMUP_QUERIES_PATH] = warmup_queries
+    os.environ[beeconsts.ENV_WARMUP_QUERY_COUNT] = str(warmup_query_count)
+    os.environ[beeconsts.ENV_RECORD_QUERIES] = str(record_queries).lower()
+
     uvicorn.run(
         f"{app_module.__name__}:{app_module.get_app.__name__}",
         port=port,
@@ -1,2 +1,7 @@
 JOBS_ENDPOINT = "/jobs"
+BATCH_JOBS_ENDPOINT = "/jobs/batch"
 DICT_ENDPOINT = "/dictionary"
+BULK_DICT_ENDPOINT = "/dictionary/bulk"
+ADMIN_INDEX_ENDPOINT = "/admin/index"
+HEALTH_ENDPOINT = "/healthz"
+READY_ENDPOINT = "/readyz"
@@ -1,12 +1,22 @@
+import concurrent.futures
+import os
+import threading
 import typing
 
 from fastapi import FastAPI
 
+from beeapi import constants as beeconsts
 from beeapi.constants import DEFAULT_DICT_PATH
 from beeapi.core.parsing import OFFCategoriesDictParser
-from beeapi.core import apptypes
+from beeapi.core import apptypes, logging
+from beeapi.core.indexing import IndexSwitcher
+from beeapi.core.maintenance import IndexMaintenanceScheduler
+from beeapi.core.warmup import QueryRecorder, load_warmup_queries
 from beeapi.api import types as api_types
+from beeapi.api.executors import QueryExecutor, build_query_executor
+from beeapi.api.jobs import JobManager, build_job_store
 
+logger = logging.get_logger()
 
 app = None
 
@@ -19,29 +29,214 @@ def get_config() -> api_types.ApiConfig:
     return options
 
 
+def _get_env_setting(envvar: str, cast: typing.Callable, default):
+    raw_value = (os.environ.get(envvar) or '').strip()
+    value = cast(raw_value) if raw_value else default
+    return value
+
+
+def get_executor_config() -> api_types.ApiConfig:
+    options = dict(
+        engine=_get_env_setting(beeconsts.ENV_QUERY_ENGINE, str, beeconsts.DEFAULT_QUERY_ENGINE),
+        max_workers=_get_env_setting(beeconsts.ENV_QUERY_WORKERS, int, beeconsts.DEFAULT_QUERY_WORKERS),
+        max_pending=_get_env_setting(beeconsts.ENV_QUERY_QUEUE_SIZE, int, beeconsts.DEFAULT_QUERY_QUEUE_SIZE),
+        timeout=_get_env_setting(beeconsts.ENV_QUERY_TIMEOUT, float, beeconsts.DEFAULT_QUERY_TIMEOUT_SECONDS),
+    )
+    return options
+
+
+def get_job_store_config() -> api_types.ApiConfig:
+    store_type = _get_env_setting(beeconsts.ENV_JOB_STORE, str, beeconsts.DEFAULT_JOB_STORE)
+
+    options = dict(
+        store_type=store_type,
+        max_entries=beeconsts.DEFAULT_JOB_STORE_SIZE,
+        ttl=beeconsts.DEFAULT_JOB_TTL_SECONDS,
+    )
+
+    if store_type == beeconsts.JOB_STORE_SQLITE:
+        options["path"] = _get_env_setting(beeconsts.ENV_JOB_STORE_PATH, str, beeconsts.DEFAULT_JOB_STORE_PATH)
+
+    return options
+
+
+def get_warmup_config() -> api_types.ApiConfig:
+    options = dict(
+        path=_get_env_setting(beeconsts.ENV_WARMUP_QUERIES_PATH, str, beeconsts.DEFAULT_WARMUP_QUERIES_PATH),
+        query_count=_get_env_setting(beeconsts.ENV_WARMUP_QUERY_COUNT, int, beeconsts.DEFAULT_WARMUP_QUERY_COUNT),
+        record=_get_env_setting(
+            beeconsts.ENV_RECORD_QUERIES, lambda raw: raw.lower() == "true", beeconsts.DEFAULT_RECORD_QUERIES
+        ),
+    )
+    return options
+
+
 def build_app(config: api_types.MaybeApiConfig = None) -> api_types.ApiApp:
     _config = config or get_config()
     new_app = FastAPI(**_config)
     return new_app
 
 
+index_switcher = None
+
+
+def get_index_switcher() -> IndexSwitcher:
+    global index_switcher
+    if not index_switcher:
+        # Makes sure there's an index to switch from in the first place
+        OFFCategoriesDictParser.parse_cached(
+            filepath=DEFAULT_DICT_PATH
+        )
+        index_switcher = IndexSwitcher()
+
+    return index_switcher
+
+
+def get_index_switcher_dependency() -> typing.Generator:
+    switcher = get_index_switcher()
+    try:
+        yield switcher
+    finally:
+        pass
+
+
 def build_index(config: api_types.MaybeApiConfig = None) -> apptypes.Index:
     _config = config or get_config()
 
-    _index = OFFCategoriesDictParser.parse_cached(
-        filepath=DEFAULT_DICT_PATH
-    )
+    # Follows the published version of the index, so rebuilds get picked up without a restart
+    _index = get_index_switcher().get_index()
     return _index
 
 
-def get_index_dependency(config: api_types.MaybeApiConfig = None) -> typing.Generator:
-    _index = build_index(config=config)
+def get_index_dependency() -> typing.Generator:
+    # NOTE: no arguments here - FastAPI would treat them as request parameters
+    _index = build_index()
     try:
         yield _index
     finally:
         pass
 
 
+maintenance_scheduler = None
+
+
+def get_maintenance_scheduler() -> typing.Optional[IndexMaintenanceScheduler]:
+    """Returns the (not yet started) index maintenance scheduler, unless it has been disabled."""
+    global maintenance_scheduler
+    if not maintenance_scheduler:
+        interval = _get_env_setting(
+            beeconsts.ENV_OPTIMIZE_INTERVAL, float, beeconsts.DEFAULT_OPTIMIZE_INTERVAL_SECONDS
+        )
+
+        if interval <= 0:
+            return None
+
+        maintenance_scheduler = IndexMaintenanceScheduler(
+            # Follows the index over version switches
+            get_index=lambda: get_index_switcher().index,
+            interval=interval,
+        )
+
+    return maintenance_scheduler
+
+
+def get_query_executor(config: api_types.MaybeApiConfig = None) -> QueryExecutor:
+    _config = config or get_executor_config()
+    executor = build_query_executor(**_config)
+    return executor
+
+
+def get_executor_dependency() -> typing.Generator:
+    executor = get_query_executor()
+    try:
+        yield executor
+    finally:
+        pass
+
+
+query_recorder = None
+
+
+def get_query_recorder() -> typing.Optional[QueryRecorder]:
+    """Returns the recorder of incoming queries (to warm up the next run on), unless recording has been disabled."""
+    global query_recorder
+    if not query_recorder:
+        if not get_warmup_config()["record"]:
+            return None
+
+        query_recorder = QueryRecorder()
+
+    return query_recorder
+
+
+# Set once the warm-up is done; until then, the app reports itself as not ready for traffic
+app_ready = threading.Event()
+warmup_stats = {}
+
+
+def warm_up(config: api_types.MaybeApiConfig = None) -> dict:
+    """Warms up the index and replays the warm-up queries, then marks the app as ready.
+
+    Each query worker warms up the index for itself (see `QueryExecutor.warm_up()`).
+    A failed warm-up is logged, but does not keep the app from serving traffic (cold).
+    """
+    _config = config or get_warmup_config()
+
+    try:
+        index = build_index()
+        executor = get_query_executor()
+
+        stats = executor.warm_up(index)
+
+        queries = load_warmup_queries(_config["path"], count=_config["query_count"])
+
+        # One batch per query worker, to spread the replayed queries over all of them
+        batches = [queries[offset::executor.max_workers] for offset in range(executor.max_workers)]
+        futures = [
+            executor.submit_queries(user_queries=batch, index=index)
+            for batch in batches if batch
+        ]
+
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+        stats["queries"] = len(queries)
+        logger.info(f"Warm-up finished: {stats}")
+
+    except Exception as E:
+        logger.warning("Warm-up failed; serving traffic without it.", exc_info=True)
+        stats = {"error": repr(E)}
+
+    warmup_stats.clear()
+    warmup_stats.update(stats)
+    app_ready.set()
+
+    return stats
+
+
+job_manager = None
+
+
+def get_job_manager(config: api_types.MaybeApiConfig = None) -> JobManager:
+    global job_manager
+    if config or not job_manager:
+        _config = config or get_job_store_config()
+        job_manager = JobManager(
+            store=build_job_store(**_config),
+            executor=get_query_executor(),
+        )
+
+    return job_manager
+
+
+def get_job_manager_dependency() -> typing.Generator:
+    manager = get_job_manager()
+    try:
+        yield manager
+    finally:
+        pass
+
+
 def get_app(
     config: api_types.MaybeApiConfig = None
 ) -> api_types.ApiApp:
@@ -0,0 +1,202 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import typing
+
+from beeapi import constants as beeconsts
+from beeapi.core import apptypes, procpool
+from beeapi.core.exceptions import QueryExecutorSaturated
+from beeapi.core.queryhandler import run_queries
+from beeapi.core.warmup import warm_up_index
+
+
+class QueryExecutor:
+    """Runs blocking query work on a bounded thread pool, off the asyncio event loop.
+
+    At most `max_workers` jobs run at once and at most `max_pending` more may wait
+    for a free worker; submissions beyond that are rejected immediately with
+    QueryExecutorSaturated rather than queueing up unboundedly.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 0, timeout: typing.Optional[float] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self.pool = self._build_pool()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+
+    def _build_pool(self) -> concurrent.futures.Executor:
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="beeapi-query",
+        )
+        return pool
+
+
+    def submit(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        if not self._slots.acquire(blocking=False):
+            raise QueryExecutorSaturated(
+                f"All {self.max_workers} query workers are busy and {self.max_pending} jobs are already queued."
+            )
+
+        try:
+            future = self.pool.submit(func, *args, **kwargs)
+
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # The slot is only freed once the work is actually done, even if
+        # the caller has stopped waiting for it (e.g. after a timeout).
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+    def submit_queries(
+        self,
+        user_queries: typing.Sequence[str],
+        index: apptypes.Index,
+        lang: typing.Optional[str] = None,
+    ) -> concurrent.futures.Future:
+        future = self.submit(run_queries, user_queries=list(user_queries), index=index, lang=lang)
+        return future
+
+
+    def _submit_to_each_worker(self, func, *args, **kwargs) -> list[concurrent.futures.Future]:
+        # A worker that's done with one call could pick up another before the others get theirs,
+        # so the calls wait until all the workers have one before they go ahead
+        barrier = threading.Barrier(self.max_workers)
+
+        def run_on_worker():
+            barrier.wait()
+            return func(*args, **kwargs)
+
+        futures = []
+        try:
+            for _ in range(self.max_workers):
+                futures.append(self.submit(run_on_worker))
+
+        except BaseException:
+            barrier.abort()
+            raise
+
+        return futures
+
+
+    def warm_up(self, index: apptypes.Index) -> dict:
+        """Warms up the index in each of the workers; returns the stats of the slowest warm-up.
+
+        Every worker thread queries through its own Searcher (see SearcherManager), along with
+        the segment readers and word count lookups that hang off it, so warming up any other
+        thread's would leave the workers cold.
+        """
+        futures = self._submit_to_each_worker(warm_up_index, index)
+        worker_stats = [future.result() for future in futures]
+
+        stats = dict(max(worker_stats, key=lambda _stats: _stats["seconds"]), workers=len(worker_stats))
+        return stats
+
+
+    async def _await(self, future: concurrent.futures.Future, timeout: typing.Optional[float] = None):
+        _timeout = self.timeout if timeout is None else timeout
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=_timeout
+            )
+
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+        return result
+
+
+    async def run(self, func, *args, timeout: typing.Optional[float] = None, **kwargs):
+        future = self.submit(func, *args, **kwargs)
+        result = await self._await(future, timeout=timeout)
+        return result
+
+
+    async def run_queries(
+        self,
+        user_queries: typing.Sequence[str],
+        index: apptypes.Index,
+        timeout: typing.Optional[float] = None,
+        lang: typing.Optional[str] = None,
+    ) -> list[list[apptypes.Phrase]]:
+        future = self.submit_queries(user_queries, index, lang=lang)
+        results = await self._await(future, timeout=timeout)
+        return results
+
+
+    def shutdown(self, wait: bool = True):
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class ProcessQueryExecutor(QueryExecutor):
+    """A QueryExecutor that scores queries in worker processes rather than threads.
+
+    Each worker opens the on-disk index on its own (read-only and mmapped),
+    so the `index` passed in by the caller is only used to pick the API's index
+    and is never sent across the process boundary.
+    """
+
+    def _build_pool(self) -> concurrent.futures.Executor:
+        pool = procpool.build_process_pool(
+            workers=self.max_workers,
+        )
+        return pool
+
+
+    def submit_queries(
+        self,
+        user_queries: typing.Sequence[str],
+        index: apptypes.Index,
+        lang: typing.Optional[str] = None,
+    ) -> concurrent.futures.Future:
+        future = self.submit(procpool.run_queries_in_worker, list(user_queries), lang=lang)
+        return future
+
+
+    def warm_up(self, index: apptypes.Index) -> dict:
+        """Starts up all of the worker processes, each of which warms up its own index as it does
+        (see `procpool.init_worker()`); returns the stats of the slowest warm-up.
+
+        The pool only starts a process for a submission no idle one can take, and none is
+        idle before it has warmed up - so submitting one call per worker starts all of them.
+        """
+        futures = [self.submit(procpool.get_worker_warmup_stats) for _ in range(self.max_workers)]
+        worker_stats = [future.result() for future in futures]
+
+        stats = dict(max(worker_stats, key=lambda _stats: _stats["seconds"]), workers=len(worker_stats))
+        return stats
+
+
+def _get_executor_by_engine(engine):
+    lookup = {
+        beeconsts.QUERY_ENGINE_THREAD: QueryExecutor,
+        beeconsts.QUERY_ENGINE_PROCESS: ProcessQueryExecutor,
+    }
+    executor_class = lookup[engine]
+    return executor_class
+
+
+@functools.lru_cache(maxsize=1)
+def build_query_executor(
+    max_workers: int,
+    max_pending: int,
+    timeout: typing.Optional[float],
+    engine: str = beeconsts.DEFAULT_QUERY_ENGINE,
+) -> QueryExecutor:
+    executor_class = _get_executor_by_engine(engine=engine.lower())
+    executor = executor_class(
+        max_workers=max_workers,
+        max_pending=max_pending,
+        timeout=timeout,
+    )
+    return executor
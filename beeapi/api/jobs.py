@@ -0,0 +1,253 @@
+import abc
+import collections
+import concurrent.futures
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+import typing
+import uuid
+
+from beeapi import constants as beeconsts
+from beeapi.core import apptypes, logging
+from beeapi.api.executors import QueryExecutor
+
+logger = logging.get_logger()
+
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JobRecord = dict
+
+
+class BaseJobStore(abc.ABC):
+    """Keeps track of submitted jobs and, once they finish, their results.
+
+    Records are dicts with `id`, `status`, `results` and `error` keys.
+    """
+
+    def __init__(self, max_entries: int, ttl: typing.Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+
+    @abc.abstractmethod
+    def put(self, record: JobRecord) -> JobRecord:
+        return record
+
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> typing.Optional[JobRecord]:
+        return None
+
+
+    def create(self) -> JobRecord:
+        record = dict(
+            id=uuid.uuid4().hex,
+            status=JOB_PENDING,
+            results=None,
+            error=None,
+        )
+        return self.put(record)
+
+
+    def complete(self, job_id: str, results) -> JobRecord:
+        record = dict(
+            id=job_id,
+            status=JOB_DONE,
+            results=results,
+            error=None,
+        )
+        return self.put(record)
+
+
+    def fail(self, job_id: str, error: str) -> JobRecord:
+        record = dict(
+            id=job_id,
+            status=JOB_FAILED,
+            results=None,
+            error=error,
+        )
+        return self.put(record)
+
+
+class InMemoryJobStore(BaseJobStore):
+    """A per-process job store; only suitable when the API runs as a single worker process."""
+
+    def __init__(self, max_entries: int, ttl: typing.Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._records = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def _is_expired(self, updated_at: float, now: float) -> bool:
+        expired = self.ttl is not None and (now - updated_at) > self.ttl
+        return expired
+
+
+    def put(self, record: JobRecord) -> JobRecord:
+        now = time.monotonic()
+
+        with self._lock:
+            self._records.pop(record["id"], None)
+            self._records[record["id"]] = (record, now)
+
+            while self._records:
+                oldest_id, (_, updated_at) = next(iter(self._records.items()))
+                if len(self._records) <= self.max_entries and not self._is_expired(updated_at, now):
+                    break
+                del self._records[oldest_id]
+
+        return record
+
+
+    def get(self, job_id: str) -> typing.Optional[JobRecord]:
+        with self._lock:
+            entry = self._records.get(job_id)
+
+        if entry is None:
+            return None
+
+        record, updated_at = entry
+        if self._is_expired(updated_at, time.monotonic()):
+            return None
+
+        return record
+
+
+class SqliteJobStore(BaseJobStore):
+    """A job store backed by an SQLite file, so that all API worker processes can share it."""
+
+    def __init__(self, path: str, max_entries: int, ttl: typing.Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = path
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, results TEXT, error TEXT, updated_at REAL"
+                ")"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Iterator[sqlite3.Connection]:
+        """Yields a connection to the store, committing (or rolling back) and then closing it.
+
+        NOTE: a connection's own context manager only ends the transaction - it leaves the connection open.
+        """
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+
+    def put(self, record: JobRecord) -> JobRecord:
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, results, error, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (record["id"], record["status"], json.dumps(record["results"]), record["error"], now),
+            )
+
+            if self.ttl is not None:
+                conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl,))
+
+            conn.execute(
+                "DELETE FROM jobs WHERE id NOT IN (SELECT id FROM jobs ORDER BY updated_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+        return record
+
+
+    def get(self, job_id: str) -> typing.Optional[JobRecord]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, results, error, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        _id, status, results, error, updated_at = row
+        if self.ttl is not None and (time.time() - updated_at) > self.ttl:
+            return None
+
+        record = dict(
+            id=_id,
+            status=status,
+            results=json.loads(results),
+            error=error,
+        )
+        return record
+
+
+def _get_job_store_by_type(store_type):
+    lookup = {
+        beeconsts.JOB_STORE_MEMORY: InMemoryJobStore,
+        beeconsts.JOB_STORE_SQLITE: SqliteJobStore,
+    }
+    store_class = lookup[store_type]
+    return store_class
+
+
+def build_job_store(store_type: str = beeconsts.DEFAULT_JOB_STORE, **kwargs) -> BaseJobStore:
+    store_class = _get_job_store_by_type(store_type=store_type.lower())
+    store = store_class(**kwargs)
+    return store
+
+
+class JobManager:
+    """Runs submitted queries in the background on a QueryExecutor and records the outcome in a job store."""
+
+    def __init__(self, store: BaseJobStore, executor: QueryExecutor):
+        self.store = store
+        self.executor = executor
+
+
+    def _on_done(self, job_id: str, single: bool, future: concurrent.futures.Future):
+        try:
+            results = future.result()
+
+        except concurrent.futures.CancelledError:
+            self.store.fail(job_id, error="Job had been cancelled.")
+
+        except Exception as E:
+            logger.warning(f"Job {job_id} failed!", exc_info=True)
+            self.store.fail(job_id, error=repr(E))
+
+        else:
+            self.store.complete(job_id, results=results[0] if single else results)
+
+
+    def submit(
+        self,
+        user_queries: typing.Sequence[str],
+        index: apptypes.Index,
+        single: bool = False,
+        lang: typing.Optional[str] = None,
+    ) -> JobRecord:
+        """Queues up a job for `user_queries`; with `single`, the job's result is that of the one query."""
+        future = self.executor.submit_queries(
+            user_queries=user_queries,
+            index=index,
+            lang=lang,
+        )
+
+        # Only create the record once the executor has accepted the job, so
+        # that rejected submissions don't leave orphaned pending jobs behind.
+        record = self.store.create()
+        future.add_done_callback(
+            lambda done_future: self._on_done(record["id"], single, done_future)
+        )
+        return record
+
+
+    def get(self, job_id: str) -> typing.Optional[JobRecord]:
+        record = self.store.get(job_id)
+        return record
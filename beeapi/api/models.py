@@ -22,3 +22,21 @@ class JobResponseModel(BaseModel):
 
 class AnnotatedJobResponseModel(JobResponseModel):
     README: typing.Optional[str]
+
+
+class JobStatusModel(BaseModel):
+    id: str
+    status: str
+    # Batch jobs have a list of results per query text
+    results: typing.Optional[typing.Union[list[list[apptypes.Phrase]], list[apptypes.Phrase]]]
+    error: typing.Optional[str]
+
+
+class DictionaryDocumentModel(BaseModel):
+    lineno: int
+    original: str
+    stemmed: str
+    # Documents with a path replace any previously indexed document with the same path
+    path: typing.Optional[str] = None
+    # The language prefix of the document's phrase, e.g. 'fr' (English, if not given)
+    lang: typing.Optional[str] = None
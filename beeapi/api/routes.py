@@ -1,55 +1,222 @@
-from fastapi import Depends
+import asyncio
+import functools
+import json
+import threading
+import typing
+
+import pydantic
+from fastapi import Body, Depends, HTTPException, Request
 
 from beeapi import constants as beeconsts
-from beeapi.core.indexing import add_document_to_index, get_existing_index, build_file_storage, index_exists
-from beeapi.core.queryhandler import run_query
+from beeapi.core.exceptions import QueryExecutorSaturated
+from beeapi.core.maintenance import get_segment_stats
+from beeapi.core.indexing import (
+    build_document, get_existing_index, build_file_storage, index_exists, IndexSwitcher
+)
+from beeapi.core.writebuffer import get_write_buffer, close_all as close_write_buffers
+from beeapi.core.parsing import OFFCategoriesDictParser
+from beeapi.core.queryhandler import get_cache_stats
 
 from beeapi.api import models, types as api_types, apiconstants
-from beeapi.api.app import get_app, get_index_dependency
+from beeapi.api.app import (
+    get_app, get_index_dependency, get_executor_dependency, get_query_executor, get_job_manager_dependency,
+    get_index_switcher_dependency, get_maintenance_scheduler, get_query_recorder, get_warmup_config,
+    warm_up, app_ready, warmup_stats,
+)
+from beeapi.api.executors import QueryExecutor
+from beeapi.api.jobs import JobManager
 
 app = get_app()
+index_rebuild_lock = threading.Lock()
+
+
+@app.on_event("startup")
+def start_index_maintenance():
+    scheduler = get_maintenance_scheduler()
+    if scheduler:
+        scheduler.start()
+
+
+@app.on_event("startup")
+def start_warmup():
+    # Warming up takes a while; the API serves (cold) requests meanwhile, but only reports itself ready afterwards
+    warmup_thread = threading.Thread(target=warm_up, name="beeapi-warmup", daemon=True)
+    warmup_thread.start()
+
+
+@app.on_event("shutdown")
+def shutdown_query_executor():
+    scheduler = get_maintenance_scheduler()
+    if scheduler:
+        scheduler.stop()
+
+    recorder = get_query_recorder()
+    if recorder:
+        recorder.save(get_warmup_config()["path"])
+
+    get_query_executor().shutdown(wait=False)
+    # Commits whatever documents are still waiting in the write buffers
+    close_write_buffers()
 
 
 @app.get("/", response_model=models.IndexResponseModel)
 async def root():
     jobs_readme = (
         "Send a POST request to this endpoint to submit jobs (requires the ?text='yourtext' parameter).",
-        "For demo purposes, this endpoint also accepts GET requests with the same parameter sets.",
+        f"This returns a job ID right away; GET {apiconstants.JOBS_ENDPOINT}/<id> for the job's status and results.",
+        "For demo purposes, this endpoint also accepts GET requests with the same parameter sets,",
+        "which wait for and return the results directly.",
     )
 
     return {
         "endpoints": {
             "/": "This page.",
             apiconstants.JOBS_ENDPOINT: " ".join(jobs_readme),
+            apiconstants.BATCH_JOBS_ENDPOINT: "POST a JSON list of texts to submit them all as a single job.",
             apiconstants.DICT_ENDPOINT: "Represents the indexed dictionary. GET to check if index exists.",
+            apiconstants.BULK_DICT_ENDPOINT: (
+                "PUT newline-delimited JSON documents (with `lineno`, `original` and `stemmed` keys) to add them all."
+            ),
+            apiconstants.ADMIN_INDEX_ENDPOINT: (
+                "GET for the live version of the index. POST to switch to the latest published version;"
+                " with ?rebuild=true, rebuilds the index from the dictionary first."
+            ),
+            apiconstants.HEALTH_ENDPOINT: "Liveness probe; responds as soon as the API is up.",
+            apiconstants.READY_ENDPOINT: "Readiness probe; responds with a 503 until the index has been warmed up.",
         }
     }
 
 
-async def _generic_new_job(text: str, index: api_types.ApiIndex) -> api_types.ResponsePhrases:
-    matches = run_query(
-        user_query=text,
-        index=index,
+@app.get(apiconstants.HEALTH_ENDPOINT, response_model=models.BasicResponseModel)
+async def healthz():
+    msg = {
+        "results": "ok"
+    }
+    return msg
+
+
+@app.get(apiconstants.READY_ENDPOINT, response_model=models.BasicResponseModel)
+async def readyz():
+    if not app_ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="The index is still warming up.",
+        )
+
+    msg = {
+        "results": warmup_stats
+    }
+    return msg
+
+
+def _record_queries(user_queries: typing.Sequence[str]):
+    recorder = get_query_recorder()
+    if recorder:
+        recorder.record(user_queries)
+
+
+def _saturated_error(error: QueryExecutorSaturated) -> HTTPException:
+    http_error = HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(beeconsts.DEFAULT_RETRY_AFTER_SECONDS)},
     )
+    return http_error
+
+
+async def _generic_new_job(
+    text: str,
+    index: api_types.ApiIndex,
+    executor: QueryExecutor,
+    lang: typing.Optional[str] = None,
+) -> api_types.ResponsePhrases:
+    # Querying is CPU-bound and fully synchronous; running it on the event
+    # loop directly would stall every other connection this worker serves.
+    try:
+        matches, = await executor.run_queries(
+            user_queries=[text],
+            index=index,
+            lang=lang,
+        )
+
+    except QueryExecutorSaturated as E:
+        raise _saturated_error(E)
+
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Query did not finish within {executor.timeout} seconds.",
+        )
 
     msg = matches
     return msg
 
 
-@app.post(apiconstants.JOBS_ENDPOINT, response_model=models.JobResponseModel)
-async def new_job(text: str, index: api_types.ApiIndex = Depends(get_index_dependency)):
-    # NOTE: this is a pretty slow job (10s+ latency under 100-user load); this would
-    # almost certainly benefit from BackgroundTasks or a message queue and job system,
-    # but I don't want to set up a whole pile of architecture just to support doing
-    # that in the demo version.
-    result = await _generic_new_job(
-        text=text,
-        index=index
-    )
-    response = {
-        "results": result
-    }
-    return response
+@app.post(apiconstants.JOBS_ENDPOINT, response_model=models.JobStatusModel, status_code=202)
+async def new_job(
+    text: str,
+    lang: typing.Optional[str] = None,
+    index: api_types.ApiIndex = Depends(get_index_dependency),
+    job_manager: JobManager = Depends(get_job_manager_dependency),
+):
+    # Querying is a pretty slow job, so rather than keeping the client waiting,
+    # we hand back a job ID right away for it to poll for the results.
+    try:
+        job = job_manager.submit(
+            user_queries=[text],
+            index=index,
+            single=True,
+            lang=lang,
+        )
+
+    except QueryExecutorSaturated as E:
+        raise _saturated_error(E)
+
+    _record_queries([text])
+    return job
+
+
+@app.post(apiconstants.BATCH_JOBS_ENDPOINT, response_model=models.JobStatusModel, status_code=202)
+async def new_batch_job(
+    texts: typing.List[str] = Body(...),
+    lang: typing.Optional[str] = None,
+    index: api_types.ApiIndex = Depends(get_index_dependency),
+    job_manager: JobManager = Depends(get_job_manager_dependency),
+):
+    if len(texts) > beeconsts.MAX_BATCH_JOB_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch jobs are limited to {beeconsts.MAX_BATCH_JOB_SIZE} texts.",
+        )
+
+    try:
+        job = job_manager.submit(
+            user_queries=texts,
+            index=index,
+            lang=lang,
+        )
+
+    except QueryExecutorSaturated as E:
+        raise _saturated_error(E)
+
+    _record_queries(texts)
+    return job
+
+
+@app.get(f"{apiconstants.JOBS_ENDPOINT}/{{job_id}}", response_model=models.JobStatusModel)
+async def get_job(
+    job_id: str,
+    job_manager: JobManager = Depends(get_job_manager_dependency),
+):
+    job = job_manager.get(job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job `{job_id}` does not exist or has expired.",
+        )
+
+    return job
 
 
 @app.get(
@@ -57,11 +224,19 @@ async def new_job(text: str, index: api_types.ApiIndex = Depends(get_index_depen
     response_model=models.AnnotatedJobResponseModel,
     response_model_exclude_unset=True,
 )
-async def new_job_demo(text: str, index: api_types.ApiIndex = Depends(get_index_dependency)):
+async def new_job_demo(
+    text: str,
+    lang: typing.Optional[str] = None,
+    index: api_types.ApiIndex = Depends(get_index_dependency),
+    executor: QueryExecutor = Depends(get_executor_dependency),
+):
     result = await _generic_new_job(
         text=text,
-        index=index
+        index=index,
+        executor=executor,
+        lang=lang,
     )
+    _record_queries([text])
 
     msg = {
         "README": "While this is not proper REST API design, this endpoint had been left in to make it easy to demo the API.",
@@ -70,6 +245,49 @@ async def new_job_demo(text: str, index: api_types.ApiIndex = Depends(get_index_
     return msg
 
 
+@app.get(apiconstants.ADMIN_INDEX_ENDPOINT, response_model=models.BasicResponseModel)
+async def get_index_version(
+    switcher: IndexSwitcher = Depends(get_index_switcher_dependency),
+):
+    msg = {
+        "results": switcher.info()
+    }
+    return msg
+
+
+@app.post(apiconstants.ADMIN_INDEX_ENDPOINT, response_model=models.BasicResponseModel)
+async def switch_index_version(
+    rebuild: bool = False,
+    switcher: IndexSwitcher = Depends(get_index_switcher_dependency),
+):
+    # Other API worker processes notice the new version by themselves within a few seconds;
+    # this just makes sure this one switches over right away.
+    if rebuild:
+        if not index_rebuild_lock.acquire(blocking=False):
+            raise HTTPException(
+                status_code=409,
+                detail="The index is already being rebuilt.",
+            )
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(OFFCategoriesDictParser.parse_versioned, beeconsts.DEFAULT_DICT_PATH),
+            )
+        finally:
+            index_rebuild_lock.release()
+
+    switched = switcher.refresh(force=True)
+
+    msg = {
+        "results": {
+            "switched": switched,
+            **switcher.info(),
+        }
+    }
+    return msg
+
+
 @app.put(f"/{apiconstants.DICT_ENDPOINT}/<lineno>")
 async def add_document(
     lineno: int,
@@ -78,12 +296,13 @@ async def add_document(
     index: api_types.ApiIndex = Depends(get_index_dependency)
 ):
     try:
-        add_document_to_index(
-            original=original,
-            stemmed=stemmed,
-            lineno=lineno,
-            index=index,
-            commit=True
+        # Committing every single document would leave the index in a pile of tiny segments
+        get_write_buffer(index).add(
+            build_document(
+                original=original,
+                stemmed=stemmed,
+                lineno=lineno,
+            )
         )
 
     except Exception as E:
@@ -94,12 +313,65 @@ async def add_document(
 
     else:
         msg = {
-            "response": "document added successfully"
+            "response": "document queued for indexing"
         }
 
     return msg
 
 
+def _parse_bulk_documents(body: bytes) -> list[dict]:
+    documents = []
+
+    for (lineno, line) in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        if len(documents) >= beeconsts.MAX_BULK_DICT_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Bulk uploads are limited to {beeconsts.MAX_BULK_DICT_SIZE} documents.",
+            )
+
+        try:
+            document = models.DictionaryDocumentModel(**json.loads(line))
+
+        except (ValueError, TypeError, pydantic.ValidationError) as E:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid document on line {lineno}: {E}",
+            )
+
+        documents.append(
+            build_document(
+                original=document.original,
+                stemmed=document.stemmed,
+                lineno=document.lineno,
+                path=document.path,
+                lang=document.lang,
+            )
+        )
+
+    return documents
+
+
+@app.put(apiconstants.BULK_DICT_ENDPOINT, response_model=models.BasicResponseModel, status_code=202)
+async def add_documents_bulk(
+    request: Request,
+    index: api_types.ApiIndex = Depends(get_index_dependency),
+):
+    # Validate the whole upload first, so that a bad line doesn't leave half of it indexed
+    documents = _parse_bulk_documents(await request.body())
+    pending_count = get_write_buffer(index).add_many(documents)
+
+    msg = {
+        "results": {
+            "queued": len(documents),
+            "pending": pending_count,
+        }
+    }
+    return msg
+
+
 @app.get(f"{apiconstants.DICT_ENDPOINT}", response_model=models.BasicResponseModel)
 async def get_index(index_name: str = None):
     _index_name = index_name or beeconsts.DEFAULT_INDEX_NAME
@@ -110,6 +382,8 @@ async def get_index(index_name: str = None):
             "results": {
                 "name": _index_name,
                 "doc_count": index.doc_count(),
+                "segments": get_segment_stats(index),
+                "cache": get_cache_stats(),
             }
         }
 
@@ -162,15 +436,16 @@ async def add_document(
     lineno: int,
     original: str,
     stemmed: str,
-    index: api_types.ApiIndex = Depends(get_index)
+    index: api_types.ApiIndex = Depends(get_index_dependency)
 ):
     try:
-        add_document_to_index(
-            original=original,
-            stemmed=stemmed,
-            lineno=lineno,
-            index=index,
-            commit=True
+        # Committing every single document would leave the index in a pile of tiny segments
+        get_write_buffer(index).add(
+            build_document(
+                original=original,
+                stemmed=stemmed,
+                lineno=lineno,
+            )
         )
 
     except Exception as E:
@@ -181,7 +456,7 @@ async def add_document(
 
     else:
         msg = {
-            "response": "document added successfully"
+            "response": "document queued for indexing"
         }
 
     return msg
@@ -1,7 +1,7 @@
 import os
 
 from beeapi import constants as beeconsts
-from beeapi.core.queryhandler import run_query
+from beeapi.core.queryhandler import get_stem_lookup, run_query
 
 
 def get_query_input():
@@ -9,10 +9,13 @@ def get_query_input():
     return raw_query
 
 
-def run_app_once(raw_query, clear_cache=False):
+def run_app_once(raw_query, clear_cache=False, prune_matches=None, lang=None, stem_lookup=None):
     match_phrases = run_query(
         user_query=raw_query,
-        clear_cache=clear_cache
+        clear_cache=clear_cache,
+        prune_matches=prune_matches,
+        lang=lang,
+        stem_lookup=stem_lookup,
     )
     return match_phrases
 
@@ -52,8 +55,10 @@ def run_default_mode():
 
     else:
         query = get_query_input()
+        # Building the stem index takes longer than a single query saves, so a one-off query only does if asked to
         result = run_app_once(
-            raw_query=query
+            raw_query=query,
+            stem_lookup=get_stem_lookup(default=False),
         )
         print(result)
 
@@ -23,13 +23,56 @@ DEFAULT_DICT_PATH = os.path.join(PROJECT_DIR, SPEC_SUFFIX, "off_categories.tsv")
 
 DEFAULT_INDEX_DIR = os.path.join(PROJECT_DIR, "indices")
 
+PATH_COLUMN = "path"
 RAW_COLUMN = "original"
 CONTENTS_COLUMN = "contents"
 STEMMED_CONTENTS_COLUMN = "stemmed"
+WORD_COUNT_COLUMN = "word_count"
+LANG_COLUMN = "lang"
+# The categories without a language prefix are the English ones
+DEFAULT_DICT_LANG = "en"
+MAX_WORD_COUNT = 255
+
+DEFAULT_INDEXING_BATCH_SIZE = 1000
+DEFAULT_INDEXING_LIMIT_MB = 128
+DEFAULT_READ_CHUNK_SIZE = 1024 * 1024
+STDIN_PATH = "-"
+DEFAULT_STEM_CACHE_SIZE = 10000
+
+INDEX_MANIFEST_VERSION = 1
+
+DEFAULT_WRITE_BUFFER_SIZE = 500
+DEFAULT_WRITE_BUFFER_PERIOD_SECONDS = 2.0
+DEFAULT_WRITE_LOCK_TIMEOUT_SECONDS = 10.0
+
+DEFAULT_OPTIMIZE_INTERVAL_SECONDS = 60.0
+DEFAULT_MAX_SEGMENTS = 10
+DEFAULT_MAX_DELETED_RATIO = 0.2
+DEFAULT_MAX_OPTIMIZE_BYTES = 512 * 1024 * 1024
+MAINTENANCE_NICENESS = 10
+INDEX_VERSION_POINTER = "CURRENT"
+DEFAULT_INDEX_VERSIONS_KEPT = 2
+DEFAULT_INDEX_CHECK_INTERVAL_SECONDS = 5.0
 
 INDEXER_FILE = "file"
 INDEXER_RAM = "ram"
 
+PHRASE_ENGINE_WHOOSH = "whoosh"
+PHRASE_ENGINE_MEMORY = "memory"
+
+DEFAULT_PHRASE_ENGINE = PHRASE_ENGINE_WHOOSH
+PHRASE_QUERY_LIMIT = 25
+
+DEFAULT_MAX_NGRAM_LENGTH = 3
+DEFAULT_MAX_NGRAM_SKIP = 0
+DEFAULT_PRUNE_MATCHES = False
+DEFAULT_STEM_LOOKUP = True
+
+SCORING_BACKEND_RAPIDFUZZ = "rapidfuzz"
+SCORING_BACKEND_LEVENSHTEIN = "levenshtein"
+SCORING_BACKEND_NUMPY = "numpy"
+SCORING_BACKEND_PYTHON = "python"
+
 MAGIC_DIRECT_MATCH_BOOST = 100
 MAGIC_SENTENCE_MATCH_BOOST_MULT = 2
 MAGIC_SENTENCE_MISMATCH_PENALTY_MULT = 3
@@ -37,5 +80,47 @@ MAGIC_WORD_ALIGNMENT_DIFF_PENALTY_MULT = 5
 MAGIC_WORD_ALIGNMENT_BOOST_MULT = 5
 
 ENV_MAIN_RUN_LOOPED = "BEEAPI_MAIN_RUN_LOOPED"
-USER_QUERY_CACHE_SIZE = 50
-PHRASE_QUERY_CACHE_SIZE = 50
+ENV_SCORING_BACKEND = "BEEAPI_SCORING_BACKEND"
+ENV_PHRASE_ENGINE = "BEEAPI_PHRASE_ENGINE"
+ENV_PRUNE_MATCHES = "BEEAPI_PRUNE_MATCHES"
+ENV_STEM_LOOKUP = "BEEAPI_STEM_LOOKUP"
+ENV_QUERY_ENGINE = "BEEAPI_QUERY_ENGINE"
+ENV_QUERY_WORKERS = "BEEAPI_QUERY_WORKERS"
+ENV_QUERY_QUEUE_SIZE = "BEEAPI_QUERY_QUEUE_SIZE"
+ENV_QUERY_TIMEOUT = "BEEAPI_QUERY_TIMEOUT"
+ENV_JOB_STORE = "BEEAPI_JOB_STORE"
+ENV_JOB_STORE_PATH = "BEEAPI_JOB_STORE_PATH"
+ENV_OPTIMIZE_INTERVAL = "BEEAPI_OPTIMIZE_INTERVAL"
+ENV_WARMUP_QUERIES_PATH = "BEEAPI_WARMUP_QUERIES_PATH"
+ENV_WARMUP_QUERY_COUNT = "BEEAPI_WARMUP_QUERY_COUNT"
+ENV_RECORD_QUERIES = "BEEAPI_RECORD_QUERIES"
+
+QUERY_ENGINE_THREAD = "thread"
+QUERY_ENGINE_PROCESS = "process"
+
+DEFAULT_QUERY_ENGINE = QUERY_ENGINE_THREAD
+DEFAULT_QUERY_WORKERS = 4
+MAX_BATCH_JOB_SIZE = 1000
+MAX_BULK_DICT_SIZE = 100000
+DEFAULT_QUERY_QUEUE_SIZE = 64
+DEFAULT_QUERY_TIMEOUT_SECONDS = 30.0
+DEFAULT_RETRY_AFTER_SECONDS = 1
+
+JOB_STORE_MEMORY = "memory"
+JOB_STORE_SQLITE = "sqlite"
+
+DEFAULT_JOB_STORE = JOB_STORE_MEMORY
+DEFAULT_JOB_STORE_PATH = os.path.join(PROJECT_DIR, "jobs.sqlite3")
+DEFAULT_JOB_STORE_SIZE = 10000
+DEFAULT_JOB_TTL_SECONDS = 60 * 60
+
+DEFAULT_WARMUP_QUERIES_PATH = os.path.join(PROJECT_DIR, "warmup_queries.txt")
+DEFAULT_WARMUP_QUERY_COUNT = 100
+DEFAULT_RECORD_QUERIES = True
+MAX_RECORDED_QUERIES = 1000
+USER_QUERY_CACHE_SIZE = 1000
+USER_QUERY_CACHE_MAX_BYTES = 16 * 1024 * 1024
+PHRASE_QUERY_CACHE_SIZE = 20000
+PHRASE_QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+QUERY_CACHE_TTL_SECONDS = 60 * 60
+PHRASE_MATCHER_CACHE_SIZE = 20000
@@ -1,6 +1,7 @@
 import typing
 
 import whoosh.index
+import whoosh.searching
 
 RawData = bytes
 AnnotatedRawData = tuple[RawData, int]
@@ -9,9 +10,23 @@ AnnotatedRawDataStream = typing.Iterable[AnnotatedRawData]
 Phrase = str
 PhrasePair = tuple[Phrase, Phrase]
 LangPhrase = tuple[str, Phrase]
+# The raw and the stemmed phrase, plus the language of both
+LangPhrasePair = tuple[Phrase, Phrase, str]
 AnnotatedPhrase = tuple[Phrase, int]
+AnnotatedPhrasePair = tuple[PhrasePair, int]
 AnnotatedLangPhrase = tuple[LangPhrase, int]
+AnnotatedLangPhrasePair = tuple[LangPhrasePair, int]
 PhraseIter = typing.Iterable[AnnotatedPhrase]
 PhraseGen = typing.Iterable[AnnotatedPhrase]
 
+
+class Candidate(typing.NamedTuple):
+    """A dictionary phrase, along with the features of it that the scoring heuristics need."""
+    phrase: Phrase
+    words: tuple[str, ...]
+    word_count: int
+
+
 Index = whoosh.index.Index
+Searcher = whoosh.searching.Searcher
+Generation = tuple[int, typing.Optional[int]]
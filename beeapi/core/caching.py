@@ -0,0 +1,159 @@
+import collections
+import sys
+import threading
+import time
+import typing
+import weakref
+
+Generation = typing.Hashable
+
+MISSING = object()
+
+_caches = weakref.WeakSet()
+
+
+def estimate_size(obj) -> int:
+    """Rough, recursive estimate of the memory held by a cached value (in bytes)."""
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, (str, bytes, int, float)):
+        return size
+
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for (key, value) in obj.items())
+
+    elif isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+
+    return size
+
+
+class ResultCache:
+    """A thread-safe LRU cache with TTL expiry, bounded by entry count and (estimated) size.
+
+    Every entry is stored under a (key, generation) pair, where the generation
+    identifies the version of the index the value was computed against. Entries
+    for a generation that has been superseded can be dropped in bulk with
+    `invalidate()` once the index is written to.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: typing.Optional[int] = None,
+        ttl: typing.Optional[float] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        _caches.add(self)
+
+
+    def _drop(self, cache_key):
+        _, _, size = self._entries.pop(cache_key)
+        self._size -= size
+
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+            self.evictions += 1
+
+
+    def get(self, key, generation: Generation, default=MISSING):
+        cache_key = (generation, key)
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+
+            if entry is not None:
+                value, expires_at, _ = entry
+
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return value
+
+                self._drop(cache_key)
+                self.evictions += 1
+
+            self.misses += 1
+
+        return default
+
+
+    def put(self, key, generation: Generation, value):
+        cache_key = (generation, key)
+        size = estimate_size(key) + estimate_size(value)
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+
+        with self._lock:
+            if cache_key in self._entries:
+                self._drop(cache_key)
+
+            self._entries[cache_key] = (value, expires_at, size)
+            self._size += size
+            self._evict()
+
+        return value
+
+
+    def invalidate(self, is_stale: typing.Callable[[Generation], bool]) -> int:
+        """Drops all entries whose generation `is_stale()`; returns the number of entries dropped."""
+        with self._lock:
+            stale_keys = [
+                cache_key for cache_key in self._entries
+                if is_stale(cache_key[0])
+            ]
+
+            for cache_key in stale_keys:
+                self._drop(cache_key)
+
+            self.invalidations += len(stale_keys)
+
+        return len(stale_keys)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+        return stats
+
+
+def invalidate_all(is_stale: typing.Callable[[Generation], bool]) -> int:
+    dropped = sum(cache.invalidate(is_stale) for cache in list(_caches))
+    return dropped
+
+
+def get_all_stats() -> dict:
+    stats = {cache.name: cache.stats() for cache in list(_caches)}
+    return stats
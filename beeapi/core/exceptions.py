@@ -5,3 +5,7 @@ class ImpossibleException(BaseException):
 
     def __init__(self):
         raise RuntimeError("This exception should never be raised - it's only a syntactic placeholder!")
+
+
+class QueryExecutorSaturated(RuntimeError):
+    """Raised when a query cannot be scheduled, because all workers are busy and the backlog is full."""
@@ -1,11 +1,19 @@
+import contextlib
 import functools
+import itertools
+import json
 import os
+import re
+import shutil
+import threading
+import time
 import typing
+import weakref
 
 from whoosh.filedb.filestore import FileStorage, RamStorage
 
 from beeapi import constants as beeconst
-from beeapi.core import apptypes
+from beeapi.core import apptypes, caching
 from beeapi.core.schemas import OFFDictSchema
 
 
@@ -18,12 +26,118 @@ def _get_indexer_by_type(idx_type):
     return builder
 
 
-def build_file_storage(index_dir=None, *args, **kwargs):
+INDEX_VERSION_PATTERN = re.compile(r"v(\d+)")
+
+
+def get_current_index_version(index_dir=None) -> typing.Optional[str]:
+    """Returns the name of the published version of the index in `index_dir`, if it is versioned at all."""
+    _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+    pointer_path = os.path.join(_index_dir, beeconst.INDEX_VERSION_POINTER)
+
+    try:
+        with open(pointer_path, "r", encoding="utf8") as pointer_file:
+            version = pointer_file.read().strip()
+
+    except FileNotFoundError:
+        return None
+
+    return version or None
+
+
+def resolve_index_dir(index_dir=None, version=None) -> str:
+    """Maps an index directory to the directory of its published version.
+
+    Unversioned (i.e. legacy) index directories, which hold the index files
+    themselves, are returned as-is.
+    """
+    _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+    _version = version or get_current_index_version(index_dir=_index_dir)
+
+    resolved_dir = os.path.join(_index_dir, _version) if _version else _index_dir
+    return resolved_dir
+
+
+def list_index_versions(index_dir=None) -> list[str]:
+    _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+
+    try:
+        dir_names = os.listdir(_index_dir)
+    except FileNotFoundError:
+        return []
+
+    versions = sorted(
+        (
+            dir_name for dir_name in dir_names
+            if INDEX_VERSION_PATTERN.fullmatch(dir_name)
+            and os.path.isdir(os.path.join(_index_dir, dir_name))
+        ),
+        key=lambda dir_name: int(INDEX_VERSION_PATTERN.fullmatch(dir_name).group(1)),
+    )
+    return versions
+
+
+def create_index_version(index_dir=None) -> tuple[str, str]:
+    """Creates an empty directory for the next version of the index; returns its name and path."""
     _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
     os.makedirs(_index_dir, exist_ok=True)
 
+    while True:
+        versions = list_index_versions(index_dir=_index_dir)
+        last_number = int(INDEX_VERSION_PATTERN.fullmatch(versions[-1]).group(1)) if versions else 0
+
+        version = f"v{last_number + 1:06d}"
+        version_dir = os.path.join(_index_dir, version)
+
+        try:
+            os.makedirs(version_dir)
+        except FileExistsError:
+            # Somebody else is building a new version at the same time; take the next one
+            continue
+
+        return version, version_dir
+
+
+def publish_index_version(version: str, index_dir=None) -> str:
+    """Points readers of `index_dir` at `version`; the switch is atomic, so they never see a partial index."""
+    _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+    pointer_path = os.path.join(_index_dir, beeconst.INDEX_VERSION_POINTER)
+    tmp_pointer_path = f"{pointer_path}.tmp"
+
+    with open(tmp_pointer_path, "w", encoding="utf8") as pointer_file:
+        pointer_file.write(version)
+
+    os.replace(tmp_pointer_path, pointer_path)
+    return pointer_path
+
+
+def prune_index_versions(index_dir=None, keep=None) -> list[str]:
+    """Deletes all but the `keep` newest versions of the index, never touching the published one."""
+    _index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+    _keep = beeconst.DEFAULT_INDEX_VERSIONS_KEPT if keep is None else keep
+
+    current_version = get_current_index_version(index_dir=_index_dir)
+    versions = list_index_versions(index_dir=_index_dir)
+
+    # The previous version sticks around for a while, so that queries still running against it can finish
+    pruned_versions = [
+        version for version in versions[:max(len(versions) - _keep, 0)]
+        if version != current_version
+    ]
+
+    for version in pruned_versions:
+        shutil.rmtree(os.path.join(_index_dir, version), ignore_errors=True)
+
+    return pruned_versions
+
+
+def build_file_storage(index_dir=None, readonly=False, *args, **kwargs):
+    _index_dir = resolve_index_dir(index_dir=index_dir)
+    os.makedirs(_index_dir, exist_ok=True)
+
     storage = FileStorage(
-        path=_index_dir
+        path=_index_dir,
+        supports_mmap=True,
+        readonly=readonly,
     )
     return storage
 
@@ -77,7 +191,7 @@ def index_exists(index_name=None, storage=None):
 
 
 @functools.lru_cache(maxsize=5)
-def build_file_indexer(index_dir=None, index_name=None):
+def _build_file_indexer(index_dir, index_name=None):
     storage = build_file_storage(index_dir=index_dir)
     index = build_index_from_storage(
         storage=storage,
@@ -86,6 +200,15 @@ def build_file_indexer(index_dir=None, index_name=None):
     return index
 
 
+def build_file_indexer(index_dir=None, index_name=None):
+    # Resolved before hitting the cache, so that a newly published version gets picked up
+    index = _build_file_indexer(
+        index_dir=resolve_index_dir(index_dir=index_dir),
+        index_name=index_name,
+    )
+    return index
+
+
 @functools.lru_cache(maxsize=5)
 def build_ram_indexer(index_name=None):
     storage = build_ram_storage()
@@ -103,17 +226,479 @@ def get_indexer(idx_type, *args, **kwargs):
     return indexer
 
 
-def add_document_to_index(original, stemmed, lineno, index=None, writer=None, commit=True, **kwargs):
-    _writer = writer or index.writer(**kwargs)
+def _close_searchers(searchers: list):
+    for searcher in searchers:
+        searcher.close()
+
+    searchers.clear()
+
+
+class _SearcherSlot:
+    """Holds the Searcher of a thread; it gets closed along with the slot.
+
+    Only the thread's (thread-local) storage refers to its slot, so that
+    happens by itself once the thread exits - or on `close()`.
+    """
+
+    def __init__(self):
+        # The finalizer mustn't refer to the slot itself, only to what it holds
+        self._searchers = []
+        self._finalizer = weakref.finalize(self, _close_searchers, self._searchers)
+
+
+    @property
+    def searcher(self) -> typing.Optional[apptypes.Searcher]:
+        return self._searchers[0] if self._searchers else None
+
+
+    @searcher.setter
+    def searcher(self, searcher: apptypes.Searcher):
+        self._searchers[:] = [searcher]
+
+
+    def close(self):
+        self._finalizer()
+
+
+class SearcherManager:
+    """Keeps long-lived Searchers for an Index open instead of opening one per query.
+
+    Whoosh Searchers are not safe to share between threads, so each thread gets
+    its own Searcher, which is kept open across queries and only refreshed when
+    the index generation changes (i.e. after a commit). A thread's Searcher is
+    closed when the thread exits, or else when the manager is closed.
+    """
+
+    _tokens = itertools.count()
+
+    def __init__(self, index: apptypes.Index):
+        self.index = index
+        self.token = next(self._tokens)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slots = weakref.WeakSet()
+
+
+    def _get_slot(self) -> _SearcherSlot:
+        slot = getattr(self._local, "slot", None)
+
+        if slot is None:
+            slot = self._local.slot = _SearcherSlot()
+
+            with self._lock:
+                self._slots.add(slot)
+
+        return slot
+
+
+    def acquire(self) -> apptypes.Searcher:
+        slot = self._get_slot()
+        searcher = slot.searcher
+
+        if searcher is None:
+            slot.searcher = self.index.searcher()
+
+        elif not searcher.up_to_date():
+            # refresh() reuses whatever segment readers are still valid
+            # and closes the rest; safe, as the old searcher is ours only.
+            slot.searcher = searcher.refresh()
+
+        return slot.searcher
+
+
+    @contextlib.contextmanager
+    def searcher(self) -> typing.Generator[apptypes.Searcher, None, None]:
+        yield self.acquire()
+
+
+    def generation(self, searcher: apptypes.Searcher) -> apptypes.Generation:
+        """Identifies the version of the index a searcher sees; used to key query caches.
+
+        Callers may tack on anything else the cached results depend on; only
+        the first two items are taken into account by `invalidate_stale()`.
+        """
+        generation = (self.token, searcher.reader().generation())
+        return generation
+
+
+    def invalidate_stale(self) -> int:
+        """Drops cached query results computed against older generations of this index."""
+        latest_generation = (self.token, self.index.latest_generation())
+
+        def is_stale(generation):
+            return generation[0] == self.token and tuple(generation[:2]) != latest_generation
+
+        dropped = caching.invalidate_all(is_stale)
+        return dropped
+
+
+    def invalidate_all(self) -> int:
+        """Drops all cached query results computed against this index, e.g. once it has been swapped out."""
+        dropped = caching.invalidate_all(lambda generation: generation[0] == self.token)
+        return dropped
+
+
+    def close(self):
+        with self._lock:
+            slots = list(self._slots)
+            self._slots.clear()
+            self._local = threading.local()
+
+        for slot in slots:
+            slot.close()
+
+
+def count_words(phrase: apptypes.Phrase) -> int:
+    word_count = min(len(phrase.split()), beeconst.MAX_WORD_COUNT)
+    return word_count
+
+
+def build_candidate(phrase: apptypes.Phrase, word_count: int = None) -> apptypes.Candidate:
+    # NOTE: the word list is just the phrase split up, so storing it as well would only double the index
+    words = tuple(phrase.split())
+
+    candidate = apptypes.Candidate(
+        phrase=phrase,
+        words=words,
+        word_count=len(words) if word_count is None else word_count,
+    )
+    return candidate
+
+
+def _get_full_column_reader(reader, column_name):
+    # A column missing from some segments would read as the default value for their documents
+    has_column = all(
+        leaf_reader.has_column(column_name)
+        for (leaf_reader, _) in reader.leaf_readers()
+    )
+
+    column_reader = reader.column_reader(column_name) if has_column else None
+    return column_reader
+
+
+def _is_fully_indexed(reader, field_name):
+    # Same deal for indexed fields: filtering on one missing from some segments would drop all their documents
+    is_indexed = all(
+        field_name in leaf_reader.indexed_field_names()
+        for (leaf_reader, _) in reader.leaf_readers()
+    )
+    return is_indexed
+
+
+class PhraseStore:
+    """Looks up the (raw) phrases of documents by their number, without loading their stored fields.
+
+    The phrases are read from the `original` column, which keeps a segment's phrases
+    back to back in a single UTF-8 buffer (with an array of their offsets) in the
+    mmapped segment files; their precomputed features are read from columns, too.
+    Indices built before the columns existed fall back to the stored fields.
 
-    _writer.update_document(
+    The documents with a given word count (or language) are looked up in the index, for
+    filtering phrase queries on; indices built before it was indexed need a reindex for that.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.word_count_indexed = _is_fully_indexed(reader, beeconst.WORD_COUNT_COLUMN)
+        self.lang_indexed = _is_fully_indexed(reader, beeconst.LANG_COLUMN)
+        self._docs_by_word_count = {}
+        self._docs_by_lang = {}
+
+
+    # Opening a column reader reads the offsets of all its values, so each is only opened once it's needed -
+    # a one-off query has no use for the stemmed and lang columns, say.
+    @functools.cached_property
+    def column(self):
+        return _get_full_column_reader(self.reader, beeconst.RAW_COLUMN)
+
+
+    @functools.cached_property
+    def word_count_column(self):
+        return _get_full_column_reader(self.reader, beeconst.WORD_COUNT_COLUMN)
+
+
+    @functools.cached_property
+    def stemmed_column(self):
+        return _get_full_column_reader(self.reader, beeconst.STEMMED_CONTENTS_COLUMN)
+
+
+    @functools.cached_property
+    def lang_column(self):
+        return _get_full_column_reader(self.reader, beeconst.LANG_COLUMN)
+
+
+    def __getitem__(self, docnum: int) -> str:
+        if self.column is not None:
+            return self.column[docnum]
+
+        return self.reader.stored_fields(docnum)[beeconst.RAW_COLUMN]
+
+
+    def get_candidate(self, docnum: int) -> apptypes.Candidate:
+        word_count = None if self.word_count_column is None else self.word_count_column[docnum]
+        candidate = build_candidate(self[docnum], word_count=word_count)
+        return candidate
+
+
+    def get_word_count_docs(self, word_count: int) -> typing.Optional[set]:
+        """Returns the numbers of the documents with the given word count, or None if they can't be looked up."""
+        if not self.word_count_indexed:
+            return None
+
+        docnums = self._docs_by_word_count.get(word_count)
+
+        if docnums is None:
+            docnums = self._docs_by_word_count.setdefault(
+                word_count,
+                self._read_term_docs(beeconst.WORD_COUNT_COLUMN, word_count),
+            )
+
+        return docnums
+
+
+    def has_word_count_docs(self, word_count: int) -> bool:
+        """Whether the documents with the given word count have been looked up already."""
+        return word_count in self._docs_by_word_count
+
+
+    def get_lang_docs(self, lang: str, word_count: int = None) -> typing.Optional[set]:
+        """Returns the numbers of the documents in the given language (and with the given word count,
+        if there is one), or None if they can't be looked up.
+        """
+        if not self.lang_indexed:
+            return None
+
+        docnums = self._docs_by_lang.get((lang, word_count))
+
+        if docnums is None:
+            if word_count is None:
+                docnums = self._read_term_docs(beeconst.LANG_COLUMN, lang)
+
+            else:
+                word_count_docnums = self.get_word_count_docs(word_count)
+                if word_count_docnums is None:
+                    return None
+
+                docnums = self.get_lang_docs(lang) & word_count_docnums
+
+            docnums = self._docs_by_lang.setdefault((lang, word_count), docnums)
+
+        return docnums
+
+
+    def _read_term_docs(self, field_name: str, value) -> set:
+        term = self.reader.schema[field_name].to_bytes(value)
+
+        # NOTE: a set, rather than a frozenset - Whoosh only takes the former for filtering searches
+        docnums = set()
+        if (field_name, term) in self.reader:
+            docnums.update(self.reader.postings(field_name, term).all_ids())
+
+        return docnums
+
+
+_phrase_stores = weakref.WeakKeyDictionary()
+
+
+def get_phrase_store(searcher: apptypes.Searcher) -> PhraseStore:
+    """Returns the PhraseStore for a searcher; it lives (only) as long as the searcher itself."""
+    phrase_store = _phrase_stores.get(searcher)
+
+    if phrase_store is None:
+        phrase_store = _phrase_stores.setdefault(searcher, PhraseStore(searcher.reader()))
+
+    return phrase_store
+
+
+@functools.lru_cache(maxsize=5)
+def get_searcher_manager(index: apptypes.Index) -> SearcherManager:
+    manager = SearcherManager(index=index)
+    return manager
+
+
+class IndexSwitcher:
+    """Hands out the published version of an on-disk index, switching over as soon as a new one is published.
+
+    The version pointer is re-read at most every `check_interval` seconds. Queries
+    already running keep the index (and Searchers) they started with, while new
+    ones get the new version; the replaced index is closed one switch later.
+    """
+
+    def __init__(self, index_dir=None, index_name=None, readonly=False, check_interval=None):
+        self.index_dir = index_dir or beeconst.DEFAULT_INDEX_DIR
+        self.index_name = index_name
+        self.readonly = readonly
+        self.check_interval = (
+            beeconst.DEFAULT_INDEX_CHECK_INTERVAL_SECONDS if check_interval is None
+            else check_interval
+        )
+
+        self.version = None
+        self.index = None
+
+        self._lock = threading.Lock()
+        self._checked_at = None
+        # The managers are held on to here, rather than looked up again, as get_searcher_manager() may have
+        # dropped them by the time they're retired - closing a fresh one in their stead would close nothing
+        self._searcher_manager = None
+        self._retired = None
+
+
+    def _open(self, version: typing.Optional[str]) -> typing.Optional[apptypes.Index]:
+        storage = build_file_storage(
+            index_dir=resolve_index_dir(index_dir=self.index_dir, version=version),
+            readonly=self.readonly,
+        )
+        index = get_existing_index(
+            storage=storage,
+            index_name=self.index_name,
+        )
+        return index
+
+
+    def _retire(self, searcher_manager: SearcherManager):
+        # Whatever was retired the last time around has had a whole version's
+        # lifetime to finish its queries, so it's safe to close it for good now.
+        if self._retired is not None:
+            self._retired.close()
+
+        self._retired = searcher_manager
+        searcher_manager.invalidate_all()
+
+
+    def refresh(self, force: bool = False) -> bool:
+        """Switches to the published version if it changed; returns whether it did."""
+        with self._lock:
+            now = time.monotonic()
+            check_due = self._checked_at is None or (now - self._checked_at) >= self.check_interval
+
+            if not (force or check_due):
+                return False
+
+            self._checked_at = now
+            version = get_current_index_version(index_dir=self.index_dir)
+
+            if self.index is not None and version == self.version:
+                return False
+
+            index = self._open(version)
+            if index is None:
+                return False
+
+            previous_searcher_manager = self._searcher_manager
+            self.version, self.index = version, index
+            self._searcher_manager = get_searcher_manager(index)
+
+            if previous_searcher_manager is not None:
+                self._retire(previous_searcher_manager)
+
+            return True
+
+
+    def get_index(self) -> typing.Optional[apptypes.Index]:
+        self.refresh()
+        return self.index
+
+
+    def info(self) -> dict:
+        index = self.index
+
+        info = {
+            "version": self.version,
+            "generation": None if index is None else index.latest_generation(),
+            "doc_count": None if index is None else index.doc_count(),
+        }
+        return info
+
+
+def get_manifest_path(index_dir=None, index_name=None) -> str:
+    _index_dir = resolve_index_dir(index_dir=index_dir)
+    _index_name = index_name or beeconst.DEFAULT_INDEX_NAME
+    manifest_path = os.path.join(_index_dir, f"{_index_name}.manifest.json")
+    return manifest_path
+
+
+def load_index_manifest(index_dir=None, index_name=None) -> typing.Optional[dict]:
+    """Loads the row key -> content hash mapping recorded for the index's current contents, if any."""
+    manifest_path = get_manifest_path(index_dir=index_dir, index_name=index_name)
+
+    try:
+        with open(manifest_path, "r", encoding="utf8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+    except FileNotFoundError:
+        return None
+
+    if manifest.get("version") != beeconst.INDEX_MANIFEST_VERSION:
+        return None
+
+    return manifest["rows"]
+
+
+def save_index_manifest(rows: dict, index_dir=None, index_name=None) -> str:
+    manifest_path = get_manifest_path(index_dir=index_dir, index_name=index_name)
+    tmp_manifest_path = f"{manifest_path}.tmp"
+
+    with open(tmp_manifest_path, "w", encoding="utf8") as manifest_file:
+        json.dump(
+            {"version": beeconst.INDEX_MANIFEST_VERSION, "rows": rows},
+            manifest_file,
+        )
+
+    # Swap it in whole, so that a crash never leaves a half-written manifest behind
+    os.replace(tmp_manifest_path, manifest_path)
+    return manifest_path
+
+
+def build_document(original, stemmed, lineno, path=None, lang=None) -> dict:
+    document = dict(
         lineno=lineno,
         original=original,
         contents=original,
         stemmed=stemmed,
+        word_count=count_words(original),
+        lang=lang or beeconst.DEFAULT_DICT_LANG,
     )
 
+    if path is not None:
+        # Documents with a path are unique by it, i.e. replace any older version
+        document[beeconst.PATH_COLUMN] = path
+
+    return document
+
+
+def cancel_writer(writer):
+    """Throws away whatever a (failed) writer wrote and releases the write lock, unless it had already finished."""
+    if not getattr(writer, "is_closed", False):
+        writer.cancel()
+
+
+def add_document_to_index(
+    original, stemmed, lineno, index=None, writer=None, commit=True, path=None, lang=None, replace=True, **kwargs
+):
+    """Adds a document to the index; with `replace` (the default), any older version of it (by path) is replaced.
+
+    Replacing has to look the path up in all the existing segments, so writers that start
+    from scratch (or know the document to be new) are better off with `replace=False`.
+    """
+    _writer = writer or index.writer(**kwargs)
+
+    document = build_document(
+        original=original,
+        stemmed=stemmed,
+        lineno=lineno,
+        path=path,
+        lang=lang,
+    )
+    if replace:
+        _writer.update_document(**document)
+    else:
+        _writer.add_document(**document)
+
     if commit:
         _writer.commit()
 
+        if index is not None:
+            get_searcher_manager(index).invalidate_stale()
+
     return _writer
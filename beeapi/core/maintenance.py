@@ -0,0 +1,171 @@
+import os
+import threading
+import typing
+
+from whoosh.index import LockError
+
+from beeapi import constants as beeconst
+from beeapi.core import apptypes, logging
+from beeapi.core.indexing import cancel_writer, get_searcher_manager
+
+logger = logging.get_logger()
+
+MAINTENANCE_MERGE = "merge"
+MAINTENANCE_OPTIMIZE = "optimize"
+
+
+def get_segment_stats(index: apptypes.Index) -> dict:
+    storage = index.storage
+    segments = index._segments()
+
+    segment_sizes = [
+        sum(storage.file_length(filename) for filename in segment.list_files(storage))
+        for segment in segments
+    ]
+
+    stats = {
+        "segments": len(segments),
+        "docs": sum(segment.doc_count_all() for segment in segments),
+        "deleted": sum(segment.deleted_count() for segment in segments),
+        "bytes": sum(segment_sizes),
+        "largest_segment_bytes": max(segment_sizes, default=0),
+    }
+    return stats
+
+
+def get_maintenance_action(
+    stats: dict,
+    max_segments: int = None,
+    max_deleted_ratio: float = None,
+    max_optimize_bytes: int = None,
+) -> typing.Optional[str]:
+    """Decides whether the index is due for a merge (of its small segments) or a full optimize."""
+    _max_segments = max_segments or beeconst.DEFAULT_MAX_SEGMENTS
+    _max_deleted_ratio = beeconst.DEFAULT_MAX_DELETED_RATIO if max_deleted_ratio is None else max_deleted_ratio
+    _max_optimize_bytes = max_optimize_bytes or beeconst.DEFAULT_MAX_OPTIMIZE_BYTES
+
+    # Rewriting everything is the only way to purge deleted documents, but it gets expensive
+    small_enough = stats["bytes"] <= _max_optimize_bytes
+    deleted_ratio = stats["deleted"] / stats["docs"] if stats["docs"] else 0.0
+
+    if deleted_ratio > _max_deleted_ratio and small_enough:
+        return MAINTENANCE_OPTIMIZE
+
+    if stats["segments"] > _max_segments:
+        return MAINTENANCE_OPTIMIZE if small_enough else MAINTENANCE_MERGE
+
+    return None
+
+
+def optimize_index(index: apptypes.Index, full: bool = True, lock_timeout: float = 0.0) -> bool:
+    """Merges the index's segments - all of them if `full`, else only the small ones.
+
+    Searchers keep reading the old segments until the merge is committed. Gives up
+    (and returns False) if a writer does not release the write lock within `lock_timeout`.
+    """
+    try:
+        writer = index.writer(timeout=lock_timeout)
+    except LockError:
+        return False
+
+    try:
+        writer.commit(merge=True, optimize=full)
+    except BaseException:
+        cancel_writer(writer)
+        raise
+
+    get_searcher_manager(index).invalidate_stale()
+
+    return True
+
+
+def _lower_thread_priority():
+    # On Linux, priorities are per-thread, so this leaves the query threads as they are
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), beeconst.MAINTENANCE_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class IndexMaintenanceScheduler:
+    """Periodically checks the segments of an index and merges them in the background once they pile up.
+
+    Merges never wait for the write lock; if a writer holds it, the merge is retried
+    on the next check. Multiple API worker processes may run a scheduler each, as
+    only one of them can hold the lock at a time.
+    """
+
+    def __init__(
+        self,
+        get_index: typing.Callable[[], apptypes.Index],
+        interval: float = None,
+        max_segments: int = None,
+        max_deleted_ratio: float = None,
+        max_optimize_bytes: int = None,
+    ):
+        self.get_index = get_index
+        self.interval = interval or beeconst.DEFAULT_OPTIMIZE_INTERVAL_SECONDS
+        self.max_segments = max_segments
+        self.max_deleted_ratio = max_deleted_ratio
+        self.max_optimize_bytes = max_optimize_bytes
+
+        self.runs = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+
+    def run_once(self) -> typing.Optional[str]:
+        """Runs whatever maintenance the index is due for; returns the action taken, if any."""
+        index = self.get_index()
+        if index is None:
+            return None
+
+        stats = get_segment_stats(index)
+        action = get_maintenance_action(
+            stats,
+            max_segments=self.max_segments,
+            max_deleted_ratio=self.max_deleted_ratio,
+            max_optimize_bytes=self.max_optimize_bytes,
+        )
+
+        if action is None:
+            return None
+
+        logger.info(f"Running index {action} over {stats['segments']} segments...")
+
+        if not optimize_index(index, full=(action == MAINTENANCE_OPTIMIZE)):
+            logger.info("Index is busy being written to, postponing maintenance.")
+            return None
+
+        self.runs += 1
+        return action
+
+
+    def _run(self):
+        _lower_thread_priority()
+
+        while not self._stopped.wait(timeout=self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.warning("Index maintenance failed!", exc_info=True)
+
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="beeapi-index-maintenance",
+            daemon=True,
+        )
+        self._thread.start()
+
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
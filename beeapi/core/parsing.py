@@ -1,16 +1,48 @@
 import abc
+import collections
+import concurrent.futures
+import contextlib
 import functools
+import gzip
+import hashlib
+import io
+import itertools
+import multiprocessing
 import os
 import re
+import sys
+import typing
 
+from beeapi import constants as beeconst
 from beeapi.core import apptypes, logging
-from beeapi.core.indexing import build_file_storage, get_existing_index, build_file_indexer, add_document_to_index
-from beeapi.core.stemming import WhooshSnowballStemmer
+from whoosh import writing
+
+from beeapi.core.indexing import (
+    build_file_storage, get_existing_index, build_file_indexer, add_document_to_index, get_searcher_manager,
+    load_index_manifest, save_index_manifest, create_index_version, publish_index_version, prune_index_versions,
+)
+from beeapi.core.stemming import (
+    WhooshSnowballStemmer, clear_stem_caches, format_stem_cache_stats, get_stem_cache_stats, merge_stem_cache_stats,
+)
+# Kept importable from here, too; they live on their own so that querying doesn't have to load all of this
+from beeapi.core.queryparsing import (
+    QUERY_PARSER_PATTERN, parse_query, generate_ngram_positions, generate_ngrams, generate_phrase_positions,
+)
+
+ZSTD_UNAVAILABLE = True
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+else:
+    ZSTD_UNAVAILABLE = False
 
 logger = logging.get_logger()
 wordmatcher = re.compile("(.*?:)?(.*?)$")
 
-QUERY_PARSER_PATTERN = re.compile(r"(\.?\w+)+")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
 
 
 class BaseDataDictParser(abc.ABC):
@@ -23,22 +55,101 @@ class BaseDataDictParser(abc.ABC):
         return self.parse(filepath, *args, **kwargs)
 
 
+def batched(items: typing.Iterable, batch_size: int) -> typing.Iterator[list]:
+    items_iter = iter(items)
+    while True:
+        batch = list(itertools.islice(items_iter, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextlib.contextmanager
+def open_data_stream(filepath: os.PathLike) -> typing.Iterator[typing.BinaryIO]:
+    """Opens a data file for binary reading, decompressing it on the fly if it is gzip- or zstd-compressed.
+
+    A `filepath` of `-` reads the data from stdin instead. The compression is recognized
+    from the first bytes of the data, so that piped-in dumps are handled just the same.
+    """
+    if filepath == beeconst.STDIN_PATH:
+        raw_source = contextlib.nullcontext(sys.stdin.buffer)
+    else:
+        raw_source = open(filepath, "rb")
+
+    with raw_source as raw_data:
+        buffered = raw_data if hasattr(raw_data, "peek") else io.BufferedReader(raw_data)
+        magic = buffered.peek(len(ZSTD_MAGIC))[:len(ZSTD_MAGIC)]
+
+        if magic.startswith(GZIP_MAGIC):
+            with gzip.GzipFile(fileobj=buffered) as data:
+                yield data
+
+        elif magic.startswith(ZSTD_MAGIC):
+            if ZSTD_UNAVAILABLE:
+                raise ImportError("The zstandard library required to read zstd-compressed data is not available!")
+
+            decompressor = zstandard.ZstdDecompressor()
+            with decompressor.stream_reader(buffered, read_across_frames=True) as data:
+                yield data
+
+        else:
+            yield buffered
+
+
+def iter_lines(data: typing.BinaryIO, chunk_size: int = None) -> typing.Iterator[bytes]:
+    """Yields the lines of a binary stream, without their line endings, reading it in large chunks."""
+    _chunk_size = chunk_size or beeconst.DEFAULT_READ_CHUNK_SIZE
+    remainder = b""
+
+    while True:
+        chunk = data.read(_chunk_size)
+        if not chunk:
+            break
+
+        # The last piece is an incomplete line (or empty); it gets finished by the next chunk
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        yield from lines
+
+    if remainder:
+        yield remainder
+
+
+def get_tsv_column(bin_line: bytes, index: int) -> typing.Optional[bytes]:
+    """Slices out a single column of a TSV line, without splitting (or decoding) the ones after it.
+
+    Returns None if the line does not have that many columns.
+    """
+    columns = bin_line.split(b"\t", index + 1)
+    if len(columns) <= index:
+        return None
+
+    column = columns[index]
+    if len(columns) == index + 1:
+        # The last column still holds the line ending, if there is one
+        column = column.rstrip(b"\r\n")
+
+    return column
+
+
 class OFFCategoriesDictParser(BaseDataDictParser):
     DATA_COLUMN_INDEX = 1
+    KEY_COLUMN_INDEX = 2
     DEFAULT_WORKERS_COUNT = 1
+    DEFAULT_BATCH_SIZE = beeconst.DEFAULT_INDEXING_BATCH_SIZE
+    DEFAULT_WRITER_LIMIT_MB = beeconst.DEFAULT_INDEXING_LIMIT_MB
 
 
     @classmethod
-    def _handle_line(cls, bin_line: bytes, lineno: int) -> apptypes.PhrasePair:
+    def _split_line(cls, bin_line: bytes, lineno: int) -> tuple[str, str]:
+        """Extracts the language (prefix) of a line, plus its (lowercased, space-separated) words."""
 
-        safe_length = (cls.DATA_COLUMN_INDEX + 1)
-        line = bin_line.decode("utf8")
-
-        columns = line.split("\t")
-        if len(columns) < safe_length:
+        # Only the data column is of any interest, so it is the only one that gets decoded
+        data_column = get_tsv_column(bin_line, cls.DATA_COLUMN_INDEX)
+        if data_column is None:
             logger.info(f"Skipping line {lineno} - insufficient columns!")
 
-        raw_data = columns[cls.DATA_COLUMN_INDEX]
+        raw_data = data_column.decode("utf8")
 
         deprefixer_match = wordmatcher.fullmatch(raw_data)
         if not deprefixer_match:
@@ -49,83 +160,383 @@ class OFFCategoriesDictParser(BaseDataDictParser):
             logger.info(f"Skipping line {lineno} due to lack of words!")
 
         raw_lang_prefix = deprefixer_match.group(1)
-        lang_prefix = raw_lang_prefix[:-1] if raw_lang_prefix else None
+        lang_prefix = raw_lang_prefix[:-1] if raw_lang_prefix else beeconst.DEFAULT_DICT_LANG
 
         data_words = deprefixed_data.split("-")
         lowercased_words = [word.lower() for word in data_words]
 
-        stemmer = WhooshSnowballStemmer.get_stemmer_for(lang_prefix)
-        stemmed_words = [stemmer(word) for word in lowercased_words]
-
         raw_joined_words = " ".join(lowercased_words)
+
+        return lang_prefix, raw_joined_words
+
+
+    @staticmethod
+    def _stem_words(raw_joined_words: str, stemmer: WhooshSnowballStemmer) -> str:
+        # Some of the 'words' still contain spaces; each of their words gets stemmed on its own
+        stemmed_words = [stemmer(word) for word in raw_joined_words.split()]
+
         joined_words = " ".join(stemmed_words)
+        return joined_words
+
+
+    @classmethod
+    def _handle_line(cls, bin_line: bytes, lineno: int) -> apptypes.LangPhrasePair:
+        lang_prefix, raw_joined_words = cls._split_line(bin_line=bin_line, lineno=lineno)
+
+        stemmer = WhooshSnowballStemmer.get_memoized_stemmer_for(lang_prefix)
+        joined_words = cls._stem_words(raw_joined_words, stemmer=stemmer)
+
+        return raw_joined_words, joined_words, lang_prefix
+
+
+    @classmethod
+    def _get_row_key(cls, bin_line: bytes, lineno: int) -> tuple[str, str]:
+        """Identifies a row by its category URI, plus a hash of the data it contributes to the index."""
+        # The columns past the two of interest are left unsplit
+        max_index = max(cls.KEY_COLUMN_INDEX, cls.DATA_COLUMN_INDEX)
+        columns = bin_line.rstrip(b"\r\n").split(b"\t", max_index + 1)
+
+        key_column = columns[cls.KEY_COLUMN_INDEX] if len(columns) > cls.KEY_COLUMN_INDEX else b""
+        data_column = columns[cls.DATA_COLUMN_INDEX] if len(columns) > cls.DATA_COLUMN_INDEX else b""
+
+        key = key_column.decode("utf8") or f"#{lineno}"
+        digest = hashlib.blake2b(data_column, digest_size=16).hexdigest()
+
+        return key, digest
+
+
+    @classmethod
+    def _key_rows(
+        cls,
+        bin_line_stream: apptypes.AnnotatedRawDataStream,
+        manifest: dict,
+        row_keys: dict,
+        previous_manifest: dict = None,
+    ) -> apptypes.AnnotatedRawDataStream:
+        """Records each row's key and hash in `manifest`, passing on only the rows that need (re)indexing.
+
+        A category may be listed under multiple parents; only its first row is kept.
+        With a `previous_manifest`, rows that are unchanged since are skipped, too.
+        The keys of the passed-on rows are recorded by line number in `row_keys`.
+        """
+
+        for (bin_line, lineno) in bin_line_stream:
+            key, digest = cls._get_row_key(bin_line=bin_line, lineno=lineno)
+
+            if key in manifest:
+                continue
+
+            manifest[key] = digest
+
+            if previous_manifest is not None and previous_manifest.get(key) == digest:
+                continue
+
+            row_keys[lineno] = key
+            yield bin_line, lineno
+
+
+    @classmethod
+    def _handle_batch(cls, bin_lines: list[apptypes.AnnotatedRawData]) -> list[apptypes.AnnotatedLangPhrasePair]:
+        """Processes a batch of lines (in order), stemming the lines of each language together."""
+        split_lines = [
+            cls._split_line(bin_line=bin_line, lineno=lineno)
+            for (bin_line, lineno) in bin_lines
+        ]
+
+        positions_by_lang = collections.defaultdict(list)
+        for (position, (lang_prefix, _)) in enumerate(split_lines):
+            positions_by_lang[lang_prefix].append(position)
+
+        stemmed_lines = [None] * len(split_lines)
+
+        for (lang_prefix, positions) in positions_by_lang.items():
+            stemmer = WhooshSnowballStemmer.get_memoized_stemmer_for(lang_prefix)
+
+            for position in positions:
+                _, raw_joined_words = split_lines[position]
+                stemmed_lines[position] = cls._stem_words(raw_joined_words, stemmer=stemmer)
+
+        processed_batch = [
+            ((raw_joined_words, joined_words, lang_prefix), lineno)
+            for ((lang_prefix, raw_joined_words), joined_words, (_, lineno)) in zip(split_lines, stemmed_lines, bin_lines)
+        ]
+        return processed_batch
 
-        return raw_joined_words, joined_words
+
+    @classmethod
+    def _handle_batch_reporting(cls, bin_lines: list[apptypes.AnnotatedRawData]) -> tuple[list, int, dict]:
+        """Runs `_handle_batch()` in a worker process, reporting back the stem memo stats of the worker, too."""
+        processed_batch = cls._handle_batch(bin_lines)
+        return processed_batch, os.getpid(), get_stem_cache_stats()
+
+
+    @classmethod
+    def _handle_lines_parallel(
+        cls,
+        bin_line_stream: apptypes.AnnotatedRawDataStream,
+        workers: int,
+        batch_size: int,
+        stem_stats: dict,
+    ) -> apptypes.PhraseGen:
+
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+        # The latest (cumulative) stats of each worker process, by its PID
+        worker_stem_stats = {}
+
+        def finish_batch(future):
+            processed_batch, worker_pid, worker_stats = future.result()
+            worker_stem_stats[worker_pid] = worker_stats
+            return processed_batch
+
+        with pool:
+            # Only keep a couple of batches per worker in flight, so that huge
+            # inputs get streamed through rather than read into memory whole.
+            pending = collections.deque()
+
+            for batch in batched(bin_line_stream, batch_size):
+                pending.append(pool.submit(cls._handle_batch_reporting, batch))
+
+                if len(pending) >= workers * 2:
+                    yield from finish_batch(pending.popleft())
+
+            while pending:
+                yield from finish_batch(pending.popleft())
+
+        stem_stats.update(merge_stem_cache_stats(worker_stem_stats.values()))
 
 
     @classmethod
     def _handle_lines(
         cls,
-        bin_line_stream: apptypes.AnnotatedRawDataStream
+        bin_line_stream: apptypes.AnnotatedRawDataStream,
+        workers: int = None,
+        batch_size: int = None,
+        stem_stats: dict = None,
     ) -> apptypes.PhraseGen:
+        """Processes the lines, in order; the stem memo stats get recorded in `stem_stats` once they are all done."""
 
-        for (bin_line, lineno) in bin_line_stream:
-            raw_processed_line = cls._handle_line(bin_line=bin_line, lineno=lineno)
-            yield raw_processed_line, lineno
+        _workers = workers or cls.DEFAULT_WORKERS_COUNT
+        _batch_size = batch_size or cls.DEFAULT_BATCH_SIZE
+        _stem_stats = {} if stem_stats is None else stem_stats
+
+        if _workers > 1:
+            yield from cls._handle_lines_parallel(
+                bin_line_stream=bin_line_stream,
+                workers=_workers,
+                batch_size=_batch_size,
+                stem_stats=_stem_stats,
+            )
+            return
+
+        # The workers start out with empty stem memos, too; this also keeps the stats per-run
+        clear_stem_caches()
+
+        for batch in batched(bin_line_stream, _batch_size):
+            yield from cls._handle_batch(batch)
+
+        _stem_stats.update(get_stem_cache_stats())
 
 
     @classmethod
-    def _read_data(cls, filepath: os.PathLike) -> apptypes.AnnotatedRawDataStream:
+    def _read_data(cls, filepath: os.PathLike, chunk_size: int = None) -> apptypes.AnnotatedRawDataStream:
+
+        with open_data_stream(filepath) as data:
+            bin_lines = iter_lines(data, chunk_size=chunk_size)
 
-        with open(filepath, "rb") as data:
-            for (lineno, bin_line) in enumerate(data):
-                if lineno == 0:
-                    # Skip header
-                    continue
+            # Skip header
+            next(bin_lines, None)
 
-                yield bin_line, lineno
+            yield from zip(bin_lines, itertools.count(1))
 
 
     @classmethod
     def _index_data(
         cls,
         processed_lines: apptypes.PhraseIter,
-        workers: int = None
+        workers: int = None,
+        batch_size: int = None,
+        limitmb: int = None,
+        multisegment: bool = None,
+        index_dir: os.PathLike = None,
+        row_keys: dict = None,
+        deleted_keys: typing.Iterable[str] = (),
+        clear: bool = False,
     ):
 
         _workers = workers or cls.DEFAULT_WORKERS_COUNT
-        indexer = build_file_indexer()
-        writer = indexer.writer(procs=_workers)
+        _batch_size = batch_size or cls.DEFAULT_BATCH_SIZE
+        _limitmb = limitmb or cls.DEFAULT_WRITER_LIMIT_MB
+
+        writer_options = dict(
+            procs=_workers,
+            limitmb=_limitmb,
+        )
+
+        if _workers > 1:
+            # Each writer process flushes its own segment, rather than merging them all
+            # at the end, unless told otherwise; merging can be left to the optimizer.
+            writer_options["batchsize"] = _batch_size
+            writer_options["multisegment"] = True if multisegment is None else multisegment
+
+        indexer = build_file_indexer(index_dir=index_dir)
+        writer = indexer.writer(**writer_options)
+
+        # NOTE: row_keys gets filled in lazily, as processed_lines is consumed
+        _row_keys = {} if row_keys is None else row_keys
 
         for raw_processed_line, lineno in processed_lines:
-            raw_line, stemmed_line = raw_processed_line
+            raw_line, stemmed_line, lang = raw_processed_line
             add_document_to_index(
                 writer=writer,
                 original=raw_line,
                 stemmed=stemmed_line,
                 lineno=lineno,
+                path=_row_keys.get(lineno),
+                lang=lang,
+                # The old segments get dropped wholesale in a full rebuild; deleting each row from them is wasted work
+                replace=not clear,
                 commit=False
             )
 
-        writer.commit()
+        for deleted_key in deleted_keys:
+            writer.delete_by_term(beeconst.PATH_COLUMN, deleted_key)
+
+        # A full rebuild replaces all the existing segments wholesale
+        writer.commit(mergetype=writing.CLEAR if clear else None)
+        get_searcher_manager(indexer).invalidate_stale()
 
         return indexer
 
 
     @classmethod
-    def parse(cls, filepath: os.PathLike, *args, **kwargs) -> apptypes.Index:
-        raw_data_stream = cls._read_data(
-            filepath=filepath
+    def parse(
+        cls,
+        filepath: os.PathLike,
+        *args,
+        workers: int = None,
+        batch_size: int = None,
+        index_dir: os.PathLike = None,
+        **kwargs
+    ) -> apptypes.Index:
+        manifest, row_keys = {}, {}
+
+        raw_data_stream = cls._key_rows(
+            bin_line_stream=cls._read_data(filepath=filepath),
+            manifest=manifest,
+            row_keys=row_keys,
+        )
+
+        stem_stats = {}
+
+        processed_data_stream = cls._handle_lines(
+            bin_line_stream=raw_data_stream,
+            workers=workers,
+            batch_size=batch_size,
+            stem_stats=stem_stats,
+        )
+
+        indexer = cls._index_data(
+            processed_lines=processed_data_stream,
+            workers=workers,
+            batch_size=batch_size,
+            index_dir=index_dir,
+            row_keys=row_keys,
+            clear=True,
+            **kwargs
         )
 
+        save_index_manifest(manifest, index_dir=index_dir)
+        logger.info(f"Stem cache hit rate: {format_stem_cache_stats(stem_stats)}")
+
+        return indexer
+
+
+    @classmethod
+    def parse_incremental(
+        cls,
+        filepath: os.PathLike,
+        *args,
+        workers: int = None,
+        batch_size: int = None,
+        index_dir: os.PathLike = None,
+        **kwargs
+    ) -> apptypes.Index:
+        """Brings the index up to date with the file, only reindexing the rows that changed.
+
+        Falls back to a full `parse()` if there is no index, or no manifest of what it contains.
+        """
+        file_storage = build_file_storage(index_dir=index_dir)
+        index = get_existing_index(storage=file_storage)
+        previous_manifest = load_index_manifest(index_dir=index_dir)
+
+        if index is None or previous_manifest is None:
+            return cls.parse(filepath, *args, workers=workers, batch_size=batch_size, index_dir=index_dir, **kwargs)
+
+        manifest, row_keys = {}, {}
+
+        # Nightly refreshes only touch a handful of rows, so these fit in memory just fine
+        changed_rows = list(cls._key_rows(
+            bin_line_stream=cls._read_data(filepath=filepath),
+            manifest=manifest,
+            row_keys=row_keys,
+            previous_manifest=previous_manifest,
+        ))
+        deleted_keys = previous_manifest.keys() - manifest.keys()
+
+        logger.info(f"Reindexing {len(changed_rows)} changed and {len(deleted_keys)} deleted rows.")
+
+        if not (changed_rows or deleted_keys):
+            return index
+
+        stem_stats = {}
+
         processed_data_stream = cls._handle_lines(
-            bin_line_stream=raw_data_stream
+            bin_line_stream=changed_rows,
+            batch_size=batch_size,
+            stem_stats=stem_stats,
         )
 
         indexer = cls._index_data(
-            processed_lines=processed_data_stream
+            processed_lines=processed_data_stream,
+            batch_size=batch_size,
+            index_dir=index_dir,
+            row_keys=row_keys,
+            deleted_keys=deleted_keys,
+            **kwargs
         )
 
+        save_index_manifest(manifest, index_dir=index_dir)
+        logger.info(f"Stem cache hit rate: {format_stem_cache_stats(stem_stats)}")
+
+        return indexer
+
+
+    @classmethod
+    def parse_versioned(
+        cls,
+        filepath: os.PathLike,
+        *args,
+        index_dir: os.PathLike = None,
+        keep: int = None,
+        **kwargs
+    ) -> apptypes.Index:
+        """Builds a fresh index into a new version directory and only publishes it once it is complete.
+
+        Readers following the published version (see IndexSwitcher) pick it up without
+        a restart, and never see a half-built index in the meantime.
+        """
+        version, version_dir = create_index_version(index_dir=index_dir)
+        logger.info(f"Building index version `{version}`...")
+
+        indexer = cls.parse(filepath, *args, index_dir=version_dir, **kwargs)
+
+        publish_index_version(version, index_dir=index_dir)
+        prune_index_versions(index_dir=index_dir, keep=keep)
+
         return indexer
 
 
@@ -140,8 +551,3 @@ class OFFCategoriesDictParser(BaseDataDictParser):
                 or cls.parse(filepath, *args, **kwargs)
         )
         return index
-
-
-def parse_query(user_query):
-    terms = QUERY_PARSER_PATTERN.findall(user_query)
-    return terms
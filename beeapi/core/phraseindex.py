@@ -0,0 +1,411 @@
+import array
+import bisect
+import collections
+import functools
+import itertools
+import os
+import threading
+import typing
+
+from beeapi import constants as beeconst
+from beeapi.core import apptypes, caching
+from beeapi.core.analyzers import BeeAnalyzer
+from beeapi.core.indexing import build_candidate, count_words, get_phrase_store
+
+
+class PackedPhrases(typing.Sequence[str]):
+    """An immutable list of phrases, packed back to back into a single UTF-8 buffer.
+
+    Takes a fraction of the memory of as many str objects (and of the GC's attention).
+    """
+
+    def __init__(self, phrases: typing.Iterable[str]):
+        encoded_phrases = [phrase.encode("utf8") for phrase in phrases]
+
+        self.buffer = b"".join(encoded_phrases)
+        self.offsets = array.array("I", itertools.accumulate(map(len, encoded_phrases), initial=0))
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, phrase_id: int) -> str:
+        if not 0 <= phrase_id < len(self):
+            raise IndexError(phrase_id)
+
+        phrase = self.buffer[self.offsets[phrase_id]:self.offsets[phrase_id + 1]].decode("utf8")
+        return phrase
+
+
+class PhraseLanguages:
+    """The language of each phrase of a phrase index, as a small id per phrase.
+
+    Splits the phrases into one partition per language, for the phrase lookups to search.
+    """
+
+    def __init__(self, langs: typing.Iterable[str]):
+        self.lang_ids = {}
+        self.phrase_lang_ids = array.array("H", (
+            self.lang_ids.setdefault(lang, len(self.lang_ids))
+            for lang in langs
+        ))
+        self.langs = tuple(self.lang_ids)
+
+
+    def __getitem__(self, phrase_id: int) -> str:
+        return self.langs[self.phrase_lang_ids[phrase_id]]
+
+
+    @classmethod
+    def from_searcher(cls, searcher: apptypes.Searcher) -> typing.Optional["PhraseLanguages"]:
+        """Reads the languages from the lang column; returns None for indices built before it existed."""
+        phrase_store = get_phrase_store(searcher)
+
+        if phrase_store.lang_column is None:
+            return None
+
+        reader = searcher.reader()
+
+        if phrase_store.lang_indexed:
+            # Reading the documents of each language is several times quicker than the language of each document
+            langs_by_docnum = {}
+            for lang in reader.field_terms(beeconst.LANG_COLUMN):
+                langs_by_docnum.update(dict.fromkeys(phrase_store.get_lang_docs(lang), lang))
+
+            langs = (langs_by_docnum[docnum] for docnum in reader.all_doc_ids())
+
+        else:
+            langs = (phrase_store.lang_column[docnum] for docnum in reader.all_doc_ids())
+
+        phrase_langs = cls(langs)
+        return phrase_langs
+
+
+    def select(self, phrase_ids: typing.Collection[int], lang: str) -> typing.Collection[int]:
+        """Returns the phrase ids in the given language's partition; if there are none, falls back to all of them."""
+        lang_id = self.lang_ids.get(lang)
+        if lang_id is None:
+            return phrase_ids
+
+        lang_phrase_ids = [
+            phrase_id for phrase_id in phrase_ids
+            if self.phrase_lang_ids[phrase_id] == lang_id
+        ]
+        return lang_phrase_ids or phrase_ids
+
+
+class InMemoryPhraseIndex:
+    """A compact, read-only phrase index answering the phrase queries of the query handler directly.
+
+    Finds the phrases in which word i starts with term i of a word tuple (for consecutive
+    words), exactly like the Whoosh Sequence-of-Prefix queries do, minus the overhead of
+    the query machinery and of scoring documents that we only ever want the phrases of.
+
+    The distinct terms are kept sorted, so that the terms with a given prefix have a
+    contiguous range of term ids; the (phrase id, position) postings are laid out
+    term by term in flat arrays, so the postings of a prefix are contiguous, too.
+    """
+
+    def __init__(
+        self,
+        phrases: typing.Sequence[str],
+        phrase_terms: typing.Sequence[typing.Sequence[str]],
+        phrase_langs: typing.Optional[PhraseLanguages] = None,
+    ):
+        self.phrases = PackedPhrases(phrases)
+        self.phrase_langs = phrase_langs
+        # The word counts of the candidates built from the phrases
+        self.word_counts = array.array("B", map(count_words, phrases))
+        self.terms = sorted(set().union(*phrase_terms)) if phrase_terms else []
+
+        term_ids = {term: term_id for (term_id, term) in enumerate(self.terms)}
+
+        # The term ids of each phrase, back to back; phrase i spans phrase_offsets[i:i+2]
+        self.phrase_offsets = array.array("I", [0])
+        self.phrase_term_ids = array.array("I")
+
+        postings = [[] for _ in self.terms]
+
+        for (phrase_id, terms) in enumerate(phrase_terms):
+            for (position, term) in enumerate(terms):
+                term_id = term_ids[term]
+                self.phrase_term_ids.append(term_id)
+                postings[term_id].append((phrase_id, position))
+
+            self.phrase_offsets.append(len(self.phrase_term_ids))
+
+        # The postings of each term, back to back; term i spans posting_offsets[i:i+2]
+        self.posting_offsets = array.array("I", [0])
+        self.posting_phrase_ids = array.array("I")
+        self.posting_positions = array.array("I")
+
+        for term_postings in postings:
+            for (phrase_id, position) in term_postings:
+                self.posting_phrase_ids.append(phrase_id)
+                self.posting_positions.append(position)
+
+            self.posting_offsets.append(len(self.posting_phrase_ids))
+
+
+    @classmethod
+    def from_searcher(cls, searcher: apptypes.Searcher) -> "InMemoryPhraseIndex":
+        phrase_store = get_phrase_store(searcher)
+        phrases = [phrase_store[docnum] for docnum in searcher.reader().all_doc_ids()]
+
+        # Analyzed the same way as the contents column, so the terms are the same as Whoosh's
+        phrase_terms = [
+            [token.text for token in BeeAnalyzer(phrase)]
+            for phrase in phrases
+        ]
+
+        phrase_index = cls(
+            phrases=phrases,
+            phrase_terms=phrase_terms,
+            phrase_langs=PhraseLanguages.from_searcher(searcher),
+        )
+        return phrase_index
+
+
+    def __len__(self):
+        return len(self.phrases)
+
+
+    def _prefix_range(self, prefix: str) -> tuple[int, int]:
+        start = bisect.bisect_left(self.terms, prefix)
+        # No term can sort after all the terms with the prefix, but before the prefix + the last character
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo=start)
+        return start, end
+
+
+    def search_phrase(
+        self,
+        word_tuple: typing.Sequence[str],
+        limit: int = None,
+        lang: str = None,
+    ) -> tuple[apptypes.Candidate, ...]:
+        """Returns the phrases matching the word tuple, best (i.e. closest) matches first.
+
+        Like the Whoosh queries (see `queryhandler._run_whoosh_phrase_query()`), returns up to
+        `limit` of the phrases as long as the word tuple, and up to `limit` of all the others;
+        with a `lang`, only the phrases in that language, unless none of them match.
+        """
+        _limit = limit or beeconst.PHRASE_QUERY_LIMIT
+
+        term_ranges = [self._prefix_range(word) for word in word_tuple]
+        if not term_ranges or any(start == end for (start, end) in term_ranges):
+            return ()
+
+        # Walk the postings of the most selective term; verify the other terms per phrase
+        pivot = min(
+            range(len(term_ranges)),
+            key=lambda idx: self.posting_offsets[term_ranges[idx][1]] - self.posting_offsets[term_ranges[idx][0]],
+        )
+        pivot_start, pivot_end = term_ranges[pivot]
+
+        # Phrase id -> where in phrase_term_ids the match starts
+        matches = {}
+
+        for posting in range(self.posting_offsets[pivot_start], self.posting_offsets[pivot_end]):
+            phrase_id = self.posting_phrase_ids[posting]
+            if phrase_id in matches:
+                continue
+
+            phrase_start = self.phrase_offsets[phrase_id]
+            phrase_end = self.phrase_offsets[phrase_id + 1]
+
+            first_word = phrase_start + self.posting_positions[posting] - pivot
+            if first_word < phrase_start or first_word + len(term_ranges) > phrase_end:
+                continue
+
+            if all(
+                start <= self.phrase_term_ids[first_word + idx] < end
+                for (idx, (start, end)) in enumerate(term_ranges)
+            ):
+                matches[phrase_id] = first_word
+
+        matched_phrase_ids = matches.keys()
+        if lang is not None and self.phrase_langs is not None:
+            matched_phrase_ids = self.phrase_langs.select(matched_phrase_ids, lang)
+
+        # Shorter phrases first, then the phrases whose words extend the terms by the fewest characters
+        prefix_length = sum(map(len, word_tuple))
+
+        def rank(phrase_id):
+            first_word = matches[phrase_id]
+            matched_term_ids = self.phrase_term_ids[first_word:first_word + len(term_ranges)]
+
+            word_count = self.phrase_offsets[phrase_id + 1] - self.phrase_offsets[phrase_id]
+            extension = sum(len(self.terms[term_id]) for term_id in matched_term_ids) - prefix_length
+            return word_count, extension, phrase_id
+
+        ranked_phrase_ids = sorted(matched_phrase_ids, key=rank)
+
+        exact_phrase_ids = [
+            phrase_id for phrase_id in ranked_phrase_ids
+            if self.word_counts[phrase_id] == len(word_tuple)
+        ]
+        other_phrase_ids = [
+            phrase_id for phrase_id in ranked_phrase_ids
+            if self.word_counts[phrase_id] != len(word_tuple)
+        ]
+
+        candidates = tuple(
+            build_candidate(self.phrases[phrase_id], word_count=self.word_counts[phrase_id])
+            for phrase_id in itertools.chain(exact_phrase_ids[:_limit], other_phrase_ids[:_limit])
+        )
+        return candidates
+
+
+@functools.lru_cache(maxsize=beeconst.PHRASE_MATCHER_CACHE_SIZE)
+def get_stemmed_phrase(word_tuple: typing.Sequence[str], lang: str) -> str:
+    """The word tuple, stemmed just like the phrases in the given language were.
+
+    The stemmers are only imported once stem lookups are made, so that one-off queries start up quickly.
+    """
+    from beeapi.core.stemming import WhooshSnowballStemmer
+
+    stemmer = WhooshSnowballStemmer.get_stemmer_for(lang)
+    stemmed_phrase = " ".join(stemmer(word) for word in word_tuple)
+    return stemmed_phrase
+
+
+class StemmedPhraseIndex:
+    """Maps the stemmed phrases of an index to the phrases, for exact (stemmed) phrase lookups.
+
+    Each phrase is stemmed in its own language, so a word tuple is only looked up among the
+    phrases in the language it is in - that of the query's `lang` hint, or the dictionary's
+    default one. Stemmed in any other language, its stems would match unrelated phrases
+    ('butter' is 'butt' to the French stemmer, which a French phrase happens to be).
+    """
+
+    def __init__(
+        self,
+        phrases: typing.Sequence[str],
+        stemmed_phrases: typing.Sequence[str],
+        phrase_langs: typing.Optional[PhraseLanguages] = None,
+    ):
+        self.phrases = PackedPhrases(phrases)
+        # Without the languages, all the phrases are taken to be in the default one
+        self.phrase_langs = phrase_langs or PhraseLanguages(itertools.repeat(beeconst.DEFAULT_DICT_LANG, len(phrases)))
+
+        phrase_ids = collections.defaultdict(list)
+        for (phrase_id, stemmed_phrase) in enumerate(stemmed_phrases):
+            phrase_ids[(self.phrase_langs[phrase_id], stemmed_phrase)].append(phrase_id)
+
+        self.phrase_ids = {
+            stemmed_phrase: tuple(stemmed_phrase_ids)
+            for (stemmed_phrase, stemmed_phrase_ids) in phrase_ids.items()
+        }
+
+
+    @classmethod
+    def from_searcher(cls, searcher: apptypes.Searcher) -> typing.Optional["StemmedPhraseIndex"]:
+        """Builds the index from the stemmed and lang columns; returns None for indices built before they existed."""
+        phrase_store = get_phrase_store(searcher)
+        phrase_langs = None if phrase_store.stemmed_column is None else PhraseLanguages.from_searcher(searcher)
+
+        if phrase_langs is None:
+            return None
+
+        docnums = list(searcher.reader().all_doc_ids())
+        phrase_index = cls(
+            phrases=[phrase_store[docnum] for docnum in docnums],
+            stemmed_phrases=[phrase_store.stemmed_column[docnum] for docnum in docnums],
+            phrase_langs=phrase_langs,
+        )
+        return phrase_index
+
+
+    def __len__(self):
+        return len(self.phrases)
+
+
+    def search_phrase(self, word_tuple: typing.Sequence[str], lang: str = None) -> tuple[apptypes.Candidate, ...]:
+        """Returns the phrases in the word tuple's language (by default, the dictionary's) that stem to the same."""
+        _lang = lang or beeconst.DEFAULT_DICT_LANG
+
+        phrase_ids = self.phrase_ids.get((_lang, get_stemmed_phrase(tuple(word_tuple), _lang)), ())
+
+        # Ties in scoring go to the first candidate, so any phrase spelled just like the word tuple comes first
+        phrase = " ".join(word_tuple)
+        ranked_phrase_ids = sorted(phrase_ids, key=lambda phrase_id: (self.phrases[phrase_id] != phrase, phrase_id))
+
+        candidates = tuple(
+            build_candidate(self.phrases[phrase_id])
+            for phrase_id in ranked_phrase_ids
+        )
+        return candidates
+
+
+phrase_index_cache = caching.ResultCache(
+    name="phrase_indices",
+    # For each kind of phrase index: one for the live generation of the
+    # index, one for a searcher that's yet to catch up
+    max_entries=4,
+)
+_phrase_index_lock = threading.Lock()
+
+
+def get_memory_phrase_index(searcher: apptypes.Searcher, generation: apptypes.Generation) -> InMemoryPhraseIndex:
+    """Returns the in-memory phrase index for the given generation of an index, building it on first use."""
+    phrase_index = phrase_index_cache.get(beeconst.PHRASE_ENGINE_MEMORY, generation)
+
+    if phrase_index is caching.MISSING:
+        with _phrase_index_lock:
+            phrase_index = phrase_index_cache.get(beeconst.PHRASE_ENGINE_MEMORY, generation)
+
+            if phrase_index is caching.MISSING:
+                phrase_index = phrase_index_cache.put(
+                    beeconst.PHRASE_ENGINE_MEMORY,
+                    generation,
+                    InMemoryPhraseIndex.from_searcher(searcher),
+                )
+
+    return phrase_index
+
+
+def get_stemmed_phrase_index(
+    searcher: apptypes.Searcher,
+    generation: apptypes.Generation,
+) -> typing.Optional[StemmedPhraseIndex]:
+    """Returns the stemmed phrase index for the given generation of an index (if it has the stemmed column)."""
+    phrase_index = phrase_index_cache.get(beeconst.STEMMED_CONTENTS_COLUMN, generation)
+
+    if phrase_index is caching.MISSING:
+        with _phrase_index_lock:
+            phrase_index = phrase_index_cache.get(beeconst.STEMMED_CONTENTS_COLUMN, generation)
+
+            if phrase_index is caching.MISSING:
+                phrase_index = phrase_index_cache.put(
+                    beeconst.STEMMED_CONTENTS_COLUMN,
+                    generation,
+                    StemmedPhraseIndex.from_searcher(searcher),
+                )
+
+    return phrase_index
+
+
+def get_whoosh_phrase_searcher(searcher: apptypes.Searcher, generation: apptypes.Generation) -> apptypes.Searcher:
+    return searcher
+
+
+def _get_phrase_engine_by_type(engine_type):
+    lookup = {
+        beeconst.PHRASE_ENGINE_WHOOSH: get_whoosh_phrase_searcher,
+        beeconst.PHRASE_ENGINE_MEMORY: get_memory_phrase_index,
+    }
+    builder = lookup[engine_type]
+    return builder
+
+
+def get_phrase_engine(engine_type: str = None) -> str:
+    _engine_type = engine_type or os.environ.get(beeconst.ENV_PHRASE_ENGINE) or beeconst.DEFAULT_PHRASE_ENGINE
+    return _engine_type.lower()
+
+
+def get_phrase_searcher(searcher: apptypes.Searcher, generation: apptypes.Generation, engine_type: str = None):
+    """Returns what the phrase queries should run against for the chosen engine: the Whoosh searcher, or not."""
+    builder = _get_phrase_engine_by_type(engine_type=get_phrase_engine(engine_type))
+    phrase_searcher = builder(searcher=searcher, generation=generation)
+    return phrase_searcher
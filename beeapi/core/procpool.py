@@ -0,0 +1,66 @@
+import concurrent.futures
+import multiprocessing
+import typing
+
+from beeapi import constants as beeconstants
+from beeapi.core import apptypes
+from beeapi.core.indexing import IndexSwitcher
+from beeapi.core.queryhandler import run_queries
+from beeapi.core.warmup import warm_up_index
+
+# Per-process state of a query worker; set up once by init_worker().
+_worker_switcher = None
+_worker_warmup_stats = {}
+
+
+def init_worker(index_dir=None, index_name=None):
+    """Opens the on-disk index (read-only, mmapped) once per worker process.
+
+    The segment files are mapped rather than read, so all workers share the
+    same pages of the OS page cache instead of each holding its own copy.
+    Workers follow newly published versions of the index on their own,
+    and warm up the one they start with before taking on any queries.
+    """
+    global _worker_switcher, _worker_warmup_stats
+
+    switcher = IndexSwitcher(
+        index_dir=index_dir,
+        index_name=index_name,
+        readonly=True,
+    )
+
+    index = switcher.get_index()
+    if index is None:
+        raise RuntimeError(f"No index `{index_name or beeconstants.DEFAULT_INDEX_NAME}` to query in the worker!")
+
+    _worker_warmup_stats = warm_up_index(index)
+    _worker_switcher = switcher
+
+
+def get_worker_warmup_stats() -> dict:
+    return dict(_worker_warmup_stats)
+
+
+def run_queries_in_worker(
+    user_queries: typing.Sequence[str],
+    lang: typing.Optional[str] = None,
+) -> list[list[apptypes.Phrase]]:
+    results = run_queries(
+        user_queries=user_queries,
+        index=_worker_switcher.get_index(),
+        lang=lang,
+    )
+    return results
+
+
+def build_process_pool(workers=None, index_dir=None, index_name=None) -> concurrent.futures.ProcessPoolExecutor:
+    _workers = workers or beeconstants.DEFAULT_QUERY_WORKERS
+
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=_workers,
+        # The parent is usually multithreaded (e.g. the API), so forking it is unsafe
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(index_dir, index_name),
+    )
+    return pool
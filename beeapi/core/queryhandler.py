@@ -1,15 +1,88 @@
+import os
 import re
 import functools
 import itertools
 
 from whoosh import query
-from whoosh.support.levenshtein import levenshtein
 
 from beeapi import constants as beeconstants
-from beeapi.core.parsing import OFFCategoriesDictParser, parse_query
+from beeapi.core import caching
+from beeapi.core.indexing import get_searcher_manager, get_phrase_store, index_exists
+from beeapi.core.phraseindex import get_phrase_engine, get_phrase_searcher, get_stemmed_phrase_index
+from beeapi.core.scoring import alignment, get_scoring_backend
+from beeapi.core.queryparsing import (
+    parse_query,
+    generate_ngrams,
+    generate_phrase_positions,
+)
+
+
+def _search_phrase_partition(sub_qry, searcher, partition_docnums=None, exact_docnums=None):
+    """Runs a phrase query over a partition of the index (or all of it, by default).
+
+    Returns the candidates, plus the number of matches the last search filtered out;
+    if there are no candidates, that's the number of matches outside the partition.
+    """
+    phrase_store = get_phrase_store(searcher)
+
+    if exact_docnums is None:
+        searches = [dict(filter=partition_docnums)]
+    else:
+        # Only the phrases as long as the word tuple get scored; the others only ever count as
+        # direct matches. Searching for each kind separately keeps the latter from crowding
+        # the former out of the (limited) results.
+        searches = [
+            dict(filter=exact_docnums),
+            dict(filter=partition_docnums, mask=exact_docnums),
+        ]
+
+        if not exact_docnums:
+            # NOTE: Whoosh ignores empty filters, rather than filtering everything out
+            searches = searches[1:]
+
+    candidates = []
+    filtered_count = 0
+
+    for search_kwargs in searches:
+        results = searcher.search(
+            sub_qry,
+            limit=beeconstants.PHRASE_QUERY_LIMIT,
+            **search_kwargs
+        )
+
+        # Only keep the phrases themselves - holding on to the Results
+        # would keep the searcher (and its readers) alive in the cache.
+        candidates.extend(phrase_store.get_candidate(docnum) for (docnum, _) in results.items())
+        filtered_count = results.filtered_count
+
+    return tuple(candidates), filtered_count
+
+
+def _search_phrase_at_once(sub_qry, searcher, word_count):
+    """Runs a phrase query over all of the index in a single search, if all of its matches fit in the results.
+
+    Those come out just as they would searching by word count (see `_search_phrase_partition()`),
+    only without looking up all the documents with the word count first - which takes longer than
+    the search itself for the shorter word counts. Returns None if the matches don't all fit.
+    """
+    phrase_store = get_phrase_store(searcher)
+
+    if not phrase_store.word_count_indexed or phrase_store.word_count_column is None:
+        return None
+
+    results = searcher.search(sub_qry, limit=beeconstants.PHRASE_QUERY_LIMIT)
+
+    if results.scored_length() >= beeconstants.PHRASE_QUERY_LIMIT:
+        return None
 
+    candidates = [phrase_store.get_candidate(docnum) for (docnum, _) in results.items()]
 
-def _run_phrase_query_uncached(word_tuple, searcher):
+    # The sort is stable, so the phrases as long as the word tuple come first, each kind still by score
+    candidates.sort(key=lambda candidate: candidate.word_count != word_count)
+    return tuple(candidates)
+
+
+def _run_whoosh_phrase_query(word_tuple, searcher, lang=None):
     terms = [
         query.Prefix(beeconstants.CONTENTS_COLUMN, word)
         for word in word_tuple
@@ -19,92 +92,171 @@ def _run_phrase_query_uncached(word_tuple, searcher):
         terms
     )
 
-    submatches = searcher.search(
+    phrase_store = get_phrase_store(searcher)
+    lang_docnums = None if lang is None else phrase_store.get_lang_docs(lang)
+
+    if lang_docnums:
+        candidates, outside_count = _search_phrase_partition(
+            sub_qry,
+            searcher,
+            partition_docnums=lang_docnums,
+            exact_docnums=phrase_store.get_lang_docs(lang, word_count=len(word_tuple)),
+        )
+
+        # Only if none of the language's phrases match do the other languages get searched -
+        # which, seeing as none of the former match, is the same as searching them all.
+        if candidates or not outside_count:
+            return candidates
+
+    # Once the documents with the word count have been looked up (as the warm-up does), searching by it is quicker
+    if not phrase_store.has_word_count_docs(len(word_tuple)):
+        candidates = _search_phrase_at_once(sub_qry, searcher, len(word_tuple))
+
+        if candidates is not None:
+            return candidates
+
+    candidates, _ = _search_phrase_partition(
         sub_qry,
-        limit=25
+        searcher,
+        exact_docnums=phrase_store.get_word_count_docs(len(word_tuple)),
     )
+    return candidates
 
-    return submatches
 
+def _run_phrase_query_uncached(word_tuple, searcher, lang=None):
+    # The in-memory phrase engine answers phrase queries by itself (see phraseindex.get_phrase_searcher())
+    search_phrase = getattr(searcher, "search_phrase", None)
 
-_run_phrase_query_cached = functools.lru_cache(maxsize=beeconstants.PHRASE_QUERY_CACHE_SIZE)(_run_phrase_query_uncached)
+    if search_phrase is not None:
+        return search_phrase(word_tuple, limit=beeconstants.PHRASE_QUERY_LIMIT, lang=lang)
 
+    return _run_whoosh_phrase_query(word_tuple, searcher, lang=lang)
 
-def run_phrase_query(word_tuple, searcher, clear_cache=False, clear_on_cache_miss=True):
+
+phrase_query_cache = caching.ResultCache(
+    name="phrase_queries",
+    max_entries=beeconstants.PHRASE_QUERY_CACHE_SIZE,
+    max_bytes=beeconstants.PHRASE_QUERY_CACHE_MAX_BYTES,
+    ttl=beeconstants.QUERY_CACHE_TTL_SECONDS,
+)
+
+
+def run_phrase_query(word_tuple, searcher, generation=None, clear_cache=False, lang=None):
     if clear_cache:
-        _run_phrase_query_cached.cache_clear()
+        phrase_query_cache.clear()
 
-    submatches = _run_phrase_query_cached(
-        word_tuple,
-        searcher
-    )
+    if generation is None:
+        return _run_phrase_query_uncached(word_tuple, searcher, lang=lang)
 
-    if clear_on_cache_miss and not submatches:
-        _run_phrase_query_cached.cache_clear()
+    submatches = phrase_query_cache.get((word_tuple, lang), generation)
+
+    if submatches is caching.MISSING:
+        submatches = phrase_query_cache.put(
+            (word_tuple, lang),
+            generation,
+            _run_phrase_query_uncached(word_tuple, searcher, lang=lang)
+        )
 
     return submatches
 
 
-def evaluate_candidate(candidate, word_tuple, subphrases, user_query):
-    # Welcome to the Most Unholy Pile of Heuristics!
+class PhraseMatcher:
+    """The parts of scoring candidates that only depend on the word tuple, precomputed once.
 
-    if candidate in user_query:
-        # Direct match - best possible, heavy boost
-        return candidate, (len(word_tuple) ** 2) * beeconstants.MAGIC_DIRECT_MATCH_BOOST
+    Matchers are cached across queries (see `get_phrase_matcher()`), so the
+    fuzzy regex for a word tuple only ever gets compiled once.
+    """
 
-    candidate_words = candidate.split()
-    word_tup_len = len(word_tuple)
+    def __init__(self, word_tuple):
+        self.word_tuple = word_tuple
+        self.length = len(word_tuple)
+        self.phrase = " ".join(word_tuple)
 
-    if len(candidate_words) != word_tup_len:
-        # If match is longer (word-wise), can't possibly fully match
-        return None, float("-inf")
+        term_regex = r"{term}\w*?\W*" if self.length > 1 else r"{term}\w?\w?"
+        self.pattern = re.compile(
+            r"\s+".join(
+                # Terms may contain dots, which must not match any character
+                term_regex.format(term=re.escape(term)) for term in word_tuple
+            )
+        )
+
+
+    def matches(self, user_query):
+        regex_match = self.pattern.search(user_query)
+        return regex_match is not None
 
-    regex = "{term}\w*?\W*" if word_tup_len > 1 else "{term}\w?\w?"
-    regex_match = re.search(
-        "\s+".join(
-            regex.format(term=term) for term in word_tuple
-        ),
-        user_query
-    )
 
-    if not regex_match:
+@functools.lru_cache(maxsize=beeconstants.PHRASE_MATCHER_CACHE_SIZE)
+def get_phrase_matcher(word_tuple):
+    matcher = PhraseMatcher(word_tuple=word_tuple)
+    return matcher
+
+
+def get_subphrases(query_terms, length):
+    """The distinct n-grams of the query of the given length.
+
+    NOTE: these are deliberately kept as word tuples rather than joined into strings.
+    The mismatch penalty compares candidate strings against them item-by-item, and
+    its multiplier has been tuned for exactly that; joined strings lower the penalty
+    so much that junk single-word candidates (e.g. 'anda' for 'and') start scoring.
+    """
+    subphrases = tuple(dict.fromkeys(
+        generate_ngrams(query_terms, length=length)
+    ))
+    return subphrases
+
+
+def get_direct_match_score(length):
+    return (length ** 2) * beeconstants.MAGIC_DIRECT_MATCH_BOOST
+
+
+def _prescreen_candidate(candidate, matcher, user_query):
+    """Settles the cheap cases of scoring a candidate.
+
+    Returns a final (guess, score) pair, or None if the candidate needs to be fully scored.
+    """
+
+    # Direct match - best possible, heavy boost
+    direct_match = candidate.phrase, get_direct_match_score(matcher.length)
+
+    if candidate.word_count != matcher.length:
+        # If match is longer (word-wise), can't possibly fully match - unless it's a direct match
+        return direct_match if candidate.phrase in user_query else (None, float("-inf"))
+
+    if candidate.phrase in user_query:
+        return direct_match
+
+    if not matcher.matches(user_query):
         # The phrase must (fuzzy-)match the input (mostly,
         # to avoid making up new phrases not in query, but
         # also to limit excessive matching for single-terms)
         return None, float("-inf")
 
+    return None
+
+
+def _score_candidate(candidate, word_tuple, user_query, phrase_distance, word_distances):
     phrase_match_score = 0
     word_match_score = 0
     pos_match_score = 0
 
     # Boost each direct word/pos match in a phrase
-    phrase_match_score += sum(
-        (w1 == w2 for (w1, w2) in itertools.zip_longest(
-            user_query,
-            candidate,
-            fillvalue="*"
-        ))
+    phrase_match_score += alignment(
+        user_query,
+        candidate.phrase,
     ) * beeconstants.MAGIC_SENTENCE_MATCH_BOOST_MULT
 
     # Penalize mismatches (by min(levenshtein), because that's the best-case mismatch)
-    try:
-        phrase_match_score -= min(
-            (levenshtein(candidate, subphrase) for subphrase in subphrases)
-        ) * beeconstants.MAGIC_SENTENCE_MISMATCH_PENALTY_MULT
-    except ValueError:
-        raise ValueError((subphrases, candidate, word_tuple))
-
+    phrase_match_score -= phrase_distance * beeconstants.MAGIC_SENTENCE_MISMATCH_PENALTY_MULT
 
     # Character-wise scoring:
-    for (qry_word, cand_word) in itertools.zip_longest(word_tuple, candidate_words):
+    for (qry_word, cand_word, word_distance) in zip(word_tuple, candidate.words, word_distances):
         # Boost matching characters
-        word_match_score += sum(
-            (w1 == w2 for (w1, w2) in itertools.zip_longest(qry_word, cand_word, fillvalue="*"))
-        ) * beeconstants.MAGIC_WORD_ALIGNMENT_BOOST_MULT
+        word_match_score += alignment(qry_word, cand_word) * beeconstants.MAGIC_WORD_ALIGNMENT_BOOST_MULT
 
         # Penalize edits
         word_match_score -= (
-                levenshtein(qry_word, cand_word)
+                word_distance
                 * beeconstants.MAGIC_WORD_ALIGNMENT_DIFF_PENALTY_MULT
         )
 
@@ -116,19 +268,81 @@ def evaluate_candidate(candidate, word_tuple, subphrases, user_query):
         pos_match_score,
     ))
 
-    return candidate, total_score
+    return candidate.phrase, total_score
+
+
+def _get_score_upper_bound(candidate, word_tuple, subphrases, user_query):
+    """The best score a candidate could get, were its edit distances no larger than the differences in length."""
+    _, score_bound = _score_candidate(
+        candidate=candidate,
+        word_tuple=word_tuple,
+        user_query=user_query,
+        phrase_distance=min(abs(len(candidate.phrase) - len(subphrase)) for subphrase in subphrases),
+        word_distances=[
+            abs(len(qry_word) - len(cand_word))
+            for (qry_word, cand_word) in zip(word_tuple, candidate.words)
+        ],
+    )
+    return score_bound
+
+
+def evaluate_candidates(candidates, word_tuple, subphrases, user_query, scoring_backend=None, matcher=None):
+    # Welcome to the Most Unholy Pile of Heuristics!
+    _scoring_backend = scoring_backend or get_scoring_backend()
+    _matcher = matcher or get_phrase_matcher(word_tuple)
+    _subphrases = tuple(subphrases)
+
+    if not _subphrases:
+        raise ValueError((subphrases, candidates, word_tuple))
 
+    evaluations = [
+        (candidate, _prescreen_candidate(candidate, _matcher, user_query))
+        for candidate in candidates
+    ]
+
+    best_prescreened_score = max(
+        (prescreened[1] for (_, prescreened) in evaluations if prescreened is not None),
+        default=float("-inf"),
+    )
+
+    if best_prescreened_score > float("-inf"):
+        # Candidates that can't even match the best prescreened score in the best case can't win
+        # (nor tie with it), so there's no need to compute their edit distances at all.
+        evaluations = [
+            (candidate, prescreened)
+            for (candidate, prescreened) in evaluations
+            if prescreened is not None
+            or _get_score_upper_bound(candidate, word_tuple, _subphrases, user_query) >= best_prescreened_score
+        ]
+
+    # All the edit distances for this word tuple are computed in one go, so that
+    # the batching backends can vectorize them; the heuristics need, per candidate,
+    # the distance to every subphrase and the word-by-word distances.
+    pairs = []
+    for (candidate, prescreened) in evaluations:
+        if prescreened is None:
+            pairs.extend((candidate.phrase, subphrase) for subphrase in _subphrases)
+            pairs.extend(zip(word_tuple, candidate.words))
+
+    distances = iter(_scoring_backend.pairwise_distances(pairs))
 
-def evaluate_candidates(candidates, word_tuple, subphrases, user_query):
     best_cand, best_score = None, float("-inf")
 
-    for candidate_match in candidates:
-        cand_guess, cand_score = evaluate_candidate(
-            candidate=candidate_match,
-            word_tuple=word_tuple,
-            subphrases=subphrases,
-            user_query=user_query
-        )
+    for (candidate, prescreened) in evaluations:
+        if prescreened is None:
+            phrase_distance = min(itertools.islice(distances, len(_subphrases)))
+            word_distances = list(itertools.islice(distances, len(word_tuple)))
+
+            cand_guess, cand_score = _score_candidate(
+                candidate=candidate,
+                word_tuple=word_tuple,
+                user_query=user_query,
+                phrase_distance=phrase_distance,
+                word_distances=word_distances,
+            )
+
+        else:
+            cand_guess, cand_score = prescreened
 
         if cand_score > best_score:
             best_cand, best_score = cand_guess, cand_score
@@ -136,40 +350,130 @@ def evaluate_candidates(candidates, word_tuple, subphrases, user_query):
     return best_cand, best_score
 
 
-def run_query_uncached(user_query, searcher):
+def evaluate_candidate(candidate, word_tuple, subphrases, user_query, scoring_backend=None, matcher=None):
+    cand_guess, cand_score = evaluate_candidates(
+        candidates=[candidate],
+        word_tuple=word_tuple,
+        subphrases=subphrases,
+        user_query=user_query,
+        scoring_backend=scoring_backend,
+        matcher=matcher,
+    )
+    return cand_guess, cand_score
+
+
+def normalize_query(user_query):
     normalized_query = user_query.lower()
-    query_terms = parse_query(normalized_query)
+    query_terms = tuple(parse_query(normalized_query))
+    return query_terms
+
+
+def get_phrase_options(max_ngram_length=None, max_ngram_skip=None):
+    phrase_options = (
+        max_ngram_length or beeconstants.DEFAULT_MAX_NGRAM_LENGTH,
+        beeconstants.DEFAULT_MAX_NGRAM_SKIP if max_ngram_skip is None else max_ngram_skip,
+    )
+    return phrase_options
+
+
+def _get_env_flag(envvar, default):
+    raw_value = (os.environ.get(envvar) or '').strip().lower()
+    value = raw_value == 'true' if raw_value else default
+    return value
+
+
+def get_prune_matches(prune_matches=None):
+    if prune_matches is not None:
+        return prune_matches
+
+    return _get_env_flag(beeconstants.ENV_PRUNE_MATCHES, beeconstants.DEFAULT_PRUNE_MATCHES)
+
+
+def get_stem_lookup(stem_lookup=None, default=None):
+    if stem_lookup is not None:
+        return stem_lookup
+
+    _default = beeconstants.DEFAULT_STEM_LOOKUP if default is None else default
+    return _get_env_flag(beeconstants.ENV_STEM_LOOKUP, _default)
+
+
+def get_match_span(phrase, positions, query_terms):
+    """The positions of the first and the last of the query terms a match covers.
+
+    For a direct match, that's wherever the phrase occurs in the query around the word tuple
+    it was found for - which may well go beyond the word tuple; otherwise, the word tuple's.
+    """
+    standardized_query_phrase = " ".join(query_terms)
+
+    term_starts = list(itertools.accumulate((len(term) + 1 for term in query_terms[:-1]), initial=0))
+    term_ends = [term_start + len(term) for (term_start, term) in zip(term_starts, query_terms)]
+
+    tuple_start, tuple_end = term_starts[positions[0]], term_ends[positions[-1]]
+    match_start = standardized_query_phrase.find(phrase)
+
+    while match_start != -1:
+        match_end = match_start + len(phrase)
+
+        if match_start < tuple_end and tuple_start < match_end:
+            covered_positions = [
+                position for (position, (term_start, term_end)) in enumerate(zip(term_starts, term_ends))
+                if match_start < term_end and term_start < match_end
+            ]
+            return covered_positions[0], covered_positions[-1]
+
+        match_start = standardized_query_phrase.find(phrase, match_start + 1)
+
+    return positions[0], positions[-1]
+
+
+def _is_covered(positions, spans):
+    is_covered = any(
+        span_start <= positions[0] and positions[-1] <= span_end
+        for (span_start, span_end) in spans
+    )
+    return is_covered
+
+
+def score_query(query_terms, phrase_candidates, phrase_options=None, prune_matches=False):
+    """Picks the best-scoring candidates for each subphrase of a (normalized) query.
+
+    `phrase_candidates` is a lookup of the candidate phrases matching each word tuple.
+
+    With `prune_matches`, once a subphrase has a direct match (or one scoring at least as
+    high), the shorter subphrases within the span of the query it covers are skipped - and
+    so is looking up their candidates, if `phrase_candidates` does that lazily. Otherwise,
+    every subphrase gets scored, so a query for 'apple juice' may return both 'apple juice'
+    and 'apples'.
+    """
     if not query_terms:
         return {}
 
+    max_length, max_skip = phrase_options or get_phrase_options()
     standardized_query_phrase = " ".join(query_terms)
 
-    phrase_gen = itertools.chain.from_iterable((
-        itertools.combinations(query_terms, n)
-        for n in range(3, 0, -1)
-    ))
-
     best_candidates = {}
+    subphrases_by_length = {}
+    covered_spans = []
 
-    for word_tuple in phrase_gen:
+    for positions in generate_phrase_positions(len(query_terms), max_length=max_length, max_skip=max_skip):
+        if prune_matches and _is_covered(positions, covered_spans):
+            continue
 
-        matches = run_phrase_query(word_tuple, searcher)
-        if matches:
-            candidates = (
-                candidate_match[beeconstants.RAW_COLUMN]
-                for candidate_match in matches
-            )
+        word_tuple = tuple(query_terms[position] for position in positions)
 
-            applicable_subphrases = {
-                c for c in itertools.combinations(query_terms, len(word_tuple))
-                if " ".join(c) in standardized_query_phrase
-            }
+        candidates = phrase_candidates[word_tuple]
+        if candidates:
+
+            word_tup_len = len(word_tuple)
+            if word_tup_len not in subphrases_by_length:
+                subphrases_by_length[word_tup_len] = get_subphrases(query_terms, length=word_tup_len)
 
             best_cand, best_score = evaluate_candidates(
                 candidates=candidates,
                 word_tuple=word_tuple,
-                subphrases=applicable_subphrases,
+                subphrases=subphrases_by_length[word_tup_len],
                 user_query=standardized_query_phrase,
+                matcher=get_phrase_matcher(word_tuple),
             )
 
             if best_cand and best_score > 0:
@@ -177,29 +481,263 @@ def run_query_uncached(user_query, searcher):
                 if best_score > curr_score:
                     best_candidates[best_cand] = (best_score, word_tuple)
 
+                if prune_matches and best_score >= get_direct_match_score(len(word_tuple)):
+                    covered_spans.append(get_match_span(best_cand, positions, query_terms))
+
     return best_candidates
 
 
-run_query_cached = functools.lru_cache(maxsize=beeconstants.USER_QUERY_CACHE_SIZE)(run_query_uncached)
+class PhraseCandidates(dict):
+    """The candidate phrases for each word tuple, with each tuple's phrase query only run once it's looked up.
+
+    With a `stem_index`, the word tuple is looked up there first. If it's a dictionary phrase (spelled
+    just so), that's the phrase query's best candidate, too - a direct match - so the phrase query is
+    skipped. Otherwise, the phrase query runs as usual; the phrases that only share the word tuple's
+    stems aren't used, as they would change the results ('salts' for 'salted', say).
+    With a `lang`, both prefer the phrases in that language.
+    """
+
+    def __init__(self, searcher, generation=None, stem_index=None, lang=None):
+        super().__init__()
+        self.searcher = searcher
+        self.generation = generation
+        self.stem_index = stem_index
+        self.lang = lang
+
+
+    def __missing__(self, word_tuple):
+        candidates = ()
 
+        if self.stem_index is not None:
+            candidates = self.stem_index.search_phrase(word_tuple, lang=self.lang)
 
-def run_query(user_query, clear_cache=False, clear_on_cache_miss=True, index=None, dict_path=None):
-    _index = index or OFFCategoriesDictParser.parse_cached(
-        filepath=dict_path or beeconstants.DEFAULT_DICT_PATH
+        # The stem index ranks the phrase spelled just like the word tuple first, if there's one
+        if not candidates or candidates[0].phrase != " ".join(word_tuple):
+            candidates = run_phrase_query(word_tuple, self.searcher, generation=self.generation, lang=self.lang)
+
+        self[word_tuple] = candidates
+        return candidates
+
+
+def run_query_uncached(
+    user_query,
+    searcher,
+    generation=None,
+    phrase_options=None,
+    prune_matches=False,
+    stem_index=None,
+    lang=None,
+):
+    query_terms = normalize_query(user_query)
+
+    scored_matches = score_query(
+        query_terms=query_terms,
+        phrase_candidates=PhraseCandidates(searcher=searcher, generation=generation, stem_index=stem_index, lang=lang),
+        phrase_options=phrase_options,
+        prune_matches=prune_matches,
     )
+    return scored_matches
+
+
+user_query_cache = caching.ResultCache(
+    name="user_queries",
+    max_entries=beeconstants.USER_QUERY_CACHE_SIZE,
+    max_bytes=beeconstants.USER_QUERY_CACHE_MAX_BYTES,
+    ttl=beeconstants.QUERY_CACHE_TTL_SECONDS,
+)
+
+
+def run_queries_cached(
+    user_queries,
+    searcher,
+    generation,
+    phrase_options=None,
+    prune_matches=False,
+    stem_index=None,
+    lang=None,
+):
+    """Scores a batch of queries, sharing the work between them where possible.
+
+    Queries that normalize to the same terms are only scored once, and the
+    phrase query for each distinct word tuple is only run once for the whole
+    batch, no matter how many of the queries it occurs in.
+    """
+    _phrase_options = phrase_options or get_phrase_options()
+    all_query_terms = [normalize_query(user_query) for user_query in user_queries]
+
+    # The generation already pins down the stem index, if there's one
+    scoring_options = (_phrase_options, prune_matches, stem_index is not None, lang)
+
+    scored_by_terms = {}
+    for query_terms in all_query_terms:
+        if query_terms not in scored_by_terms:
+            scored_by_terms[query_terms] = user_query_cache.get((query_terms, scoring_options), generation)
+
+    pending_terms = [
+        query_terms for (query_terms, scored_matches) in scored_by_terms.items()
+        if scored_matches is caching.MISSING
+    ]
+
+    # Shared by the whole batch; with pruning, the phrase queries of skipped word tuples never even run
+    phrase_candidates = PhraseCandidates(searcher=searcher, generation=generation, stem_index=stem_index, lang=lang)
+
+    for query_terms in pending_terms:
+        scored_by_terms[query_terms] = user_query_cache.put(
+            (query_terms, scoring_options),
+            generation,
+            score_query(
+                query_terms=query_terms,
+                phrase_candidates=phrase_candidates,
+                phrase_options=_phrase_options,
+                prune_matches=prune_matches,
+            )
+        )
+
+    results = [scored_by_terms[query_terms] for query_terms in all_query_terms]
+    return results
+
+
+def run_query_cached(
+    user_query,
+    searcher,
+    generation,
+    phrase_options=None,
+    prune_matches=False,
+    stem_index=None,
+    lang=None,
+):
+    scored_matches, = run_queries_cached(
+        user_queries=[user_query],
+        searcher=searcher,
+        generation=generation,
+        phrase_options=phrase_options,
+        prune_matches=prune_matches,
+        stem_index=stem_index,
+        lang=lang,
+    )
+    return scored_matches
+
+
+def clear_caches():
+    user_query_cache.clear()
+    phrase_query_cache.clear()
+
+
+def get_cache_stats():
+    stats = {
+        cache.name: cache.stats()
+        for cache in (user_query_cache, phrase_query_cache)
+    }
+    return stats
+
+
+def prepare_phrase_searchers(searcher_manager, searcher, phrase_engine=None, stem_lookup=None):
+    """Returns the generation of a searcher, plus the phrase searcher and stem index queries on it run against.
+
+    The phrase engines and stem indices are built on first use (for each generation of the index).
+    """
+    _phrase_engine = get_phrase_engine(phrase_engine)
+
+    # Results may differ (slightly) between engines, so they're cached separately
+    generation = (*searcher_manager.generation(searcher), _phrase_engine)
+
+    phrase_searcher = get_phrase_searcher(searcher, generation, engine_type=_phrase_engine)
+    stem_index = get_stemmed_phrase_index(searcher, generation) if get_stem_lookup(stem_lookup) else None
+
+    return generation, phrase_searcher, stem_index
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_index(dict_path=None):
+    """Opens the existing index to query; only if there is none yet, builds it from the dictionary.
+
+    The dictionary parsing machinery is only imported in the latter case, so that one-off queries start up quickly.
+    """
+    index = index_exists()
+
+    if index is None:
+        from beeapi.core.parsing import OFFCategoriesDictParser
+        index = OFFCategoriesDictParser.parse_cached(
+            filepath=dict_path or beeconstants.DEFAULT_DICT_PATH
+        )
+
+    return index
+
+
+def run_queries(
+    user_queries,
+    clear_cache=False,
+    index=None,
+    dict_path=None,
+    max_ngram_length=None,
+    max_ngram_skip=None,
+    phrase_engine=None,
+    prune_matches=None,
+    stem_lookup=None,
+    lang=None,
+):
+    """Returns the best matches for each of the queries.
+
+    Queries can be in any language; a `lang` (prefix, e.g. 'fr') hint makes them search the
+    phrases in that language first, falling back to the others for the subphrases it has none for.
+    """
+    _index = index or get_default_index(dict_path=dict_path)
 
     if clear_cache:
-        run_query_cached.cache_clear()
+        clear_caches()
+
+    searcher_manager = get_searcher_manager(_index)
 
-    with _index.searcher() as searcher:
-        scored_matches = run_query_cached(
-            user_query=user_query,
-            searcher=searcher
+    with searcher_manager.searcher() as searcher:
+        generation, phrase_searcher, stem_index = prepare_phrase_searchers(
+            searcher_manager,
+            searcher,
+            phrase_engine=phrase_engine,
+            stem_lookup=stem_lookup,
         )
 
-    if clear_on_cache_miss and not scored_matches:
-        run_query_cached.cache_clear()
+        all_scored_matches = run_queries_cached(
+            user_queries=user_queries,
+            searcher=phrase_searcher,
+            generation=generation,
+            phrase_options=get_phrase_options(
+                max_ngram_length=max_ngram_length,
+                max_ngram_skip=max_ngram_skip,
+            ),
+            prune_matches=get_prune_matches(prune_matches),
+            stem_index=stem_index,
+            lang=lang.lower() if lang else None,
+        )
 
-    best_matches = list(scored_matches.keys())
+    all_best_matches = [
+        list(scored_matches.keys())
+        for scored_matches in all_scored_matches
+    ]
+    return all_best_matches
+
+
+def run_query(
+    user_query,
+    clear_cache=False,
+    index=None,
+    dict_path=None,
+    max_ngram_length=None,
+    max_ngram_skip=None,
+    phrase_engine=None,
+    prune_matches=None,
+    stem_lookup=None,
+    lang=None,
+):
+    best_matches, = run_queries(
+        user_queries=[user_query],
+        clear_cache=clear_cache,
+        index=index,
+        dict_path=dict_path,
+        max_ngram_length=max_ngram_length,
+        max_ngram_skip=max_ngram_skip,
+        phrase_engine=phrase_engine,
+        prune_matches=prune_matches,
+        stem_lookup=stem_lookup,
+        lang=lang,
+    )
     return best_matches
-
@@ -0,0 +1,46 @@
+import itertools
+import re
+
+from beeapi import constants as beeconst
+
+QUERY_PARSER_PATTERN = re.compile(r"(\.?\w+)+")
+
+
+def parse_query(user_query):
+    terms = QUERY_PARSER_PATTERN.findall(user_query)
+    return terms
+
+
+def generate_ngram_positions(terms_count, length, max_skip=0):
+    """Yields the positions of the terms of each n-gram of `length` terms, in order.
+
+    By default, the n-grams are contiguous; with `max_skip`, up to that many terms
+    in total may be skipped between the first and the last term of an n-gram.
+    """
+    for start in range(terms_count - length + 1):
+        window_end = min(terms_count, start + length + max_skip)
+
+        for rest in itertools.combinations(range(start + 1, window_end), length - 1):
+            yield (start, *rest)
+
+
+def generate_ngrams(terms, length, max_skip=0):
+    """Yields the n-grams of `length` terms, in order of their positions (see `generate_ngram_positions()`)."""
+    for positions in generate_ngram_positions(len(terms), length=length, max_skip=max_skip):
+        yield tuple(terms[position] for position in positions)
+
+
+def generate_phrase_positions(terms_count, max_length=None, max_skip=None):
+    """Yields the positions of the terms of each candidate subphrase of a query, longest first.
+
+    The number of phrases grows linearly with the length of the query,
+    (rather than cubically, as it would for all combinations of terms).
+    """
+    _max_length = max_length or beeconst.DEFAULT_MAX_NGRAM_LENGTH
+    _max_skip = beeconst.DEFAULT_MAX_NGRAM_SKIP if max_skip is None else max_skip
+
+    positions_gen = itertools.chain.from_iterable((
+        generate_ngram_positions(terms_count, length=n, max_skip=_max_skip)
+        for n in range(_max_length, 0, -1)
+    ))
+    return positions_gen
@@ -6,6 +6,13 @@ from beeapi.core.analyzers import BeeAnalyzer
 class OFFDictSchema(SchemaClass):
     path = ID(stored=True, unique=True)
     lineno = NUMERIC(stored=True)
-    original = TEXT(stored=True)
+    # Sortable, for the column: all the phrases of a segment, back to back in one (mmapped) buffer
+    original = TEXT(stored=True, sortable=True)
+    # Precomputed for the scoring heuristics (read from the column) and indexed, so phrase queries can filter on it;
+    # without the tiered range terms, the documents with a given word count are just the postings of one term
+    word_count = NUMERIC(int, bits=8, shift_step=8, signed=False, sortable=True)
+    # Indexed, so that phrase queries can search the phrases of a single language only, and sortable for the column
+    lang = ID(sortable=True)
     contents = TEXT(analyzer=BeeAnalyzer)
-    stemmed = TEXT(analyzer=BeeAnalyzer)
+    # Sortable, too - the stemmed phrases are looked up as a whole (see phraseindex.StemmedPhraseIndex)
+    stemmed = TEXT(analyzer=BeeAnalyzer, sortable=True)
@@ -0,0 +1,194 @@
+import abc
+import functools
+import importlib.util
+import operator
+import os
+import typing
+
+from whoosh.support.levenshtein import levenshtein
+
+from beeapi import constants as beeconst
+
+
+# The backend libraries are only imported once their backend gets used;
+# NumPy alone would take longer to import than a typical query takes to run.
+RAPIDFUZZ_UNAVAILABLE = importlib.util.find_spec("rapidfuzz") is None
+LEVENSHTEIN_UNAVAILABLE = importlib.util.find_spec("Levenshtein") is None
+NUMPY_UNAVAILABLE = importlib.util.find_spec("numpy") is None
+
+numpy = None
+
+
+Sequence = typing.Sequence[typing.Hashable]
+SequencePair = tuple[Sequence, Sequence]
+
+
+def alignment(seq1: Sequence, seq2: Sequence, fillvalue="*") -> int:
+    """Counts the positions at which two sequences hold the same item.
+
+    Equivalent to summing `w1 == w2` over `itertools.zip_longest(seq1, seq2, fillvalue=fillvalue)`.
+    """
+    matches = sum(map(operator.eq, seq1, seq2))
+
+    shorter_len = min(len(seq1), len(seq2))
+    overhang = seq1[shorter_len:] or seq2[shorter_len:]
+    matches += sum(item == fillvalue for item in overhang)
+
+    return matches
+
+
+class BaseScoringBackend(abc.ABC):
+    """Computes the (Levenshtein) edit distances used by the query scoring heuristics.
+
+    All backends must produce exactly the same distances; they only differ in speed.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def distance(self, seq1: Sequence, seq2: Sequence) -> int:
+        return levenshtein(seq1, seq2)
+
+
+    def pairwise_distances(self, pairs: typing.Sequence[SequencePair]) -> list[int]:
+        distances = [self.distance(seq1, seq2) for (seq1, seq2) in pairs]
+        return distances
+
+
+class PythonScoringBackend(BaseScoringBackend):
+    name = beeconst.SCORING_BACKEND_PYTHON
+
+    def distance(self, seq1: Sequence, seq2: Sequence) -> int:
+        return super().distance(seq1, seq2)
+
+
+class RapidfuzzScoringBackend(BaseScoringBackend):
+    name = beeconst.SCORING_BACKEND_RAPIDFUZZ
+
+    def __init__(self):
+        if RAPIDFUZZ_UNAVAILABLE:
+            raise ImportError("The rapidfuzz library required to use this class is not available!")
+
+        from rapidfuzz.distance import Levenshtein as rapidfuzz_levenshtein
+        self._distance = rapidfuzz_levenshtein.distance
+
+
+    def distance(self, seq1: Sequence, seq2: Sequence) -> int:
+        # rapidfuzz compares arbitrary sequences of hashables, just like the pure-Python version
+        return self._distance(seq1, seq2)
+
+
+class LevenshteinScoringBackend(BaseScoringBackend):
+    name = beeconst.SCORING_BACKEND_LEVENSHTEIN
+
+    def __init__(self):
+        if LEVENSHTEIN_UNAVAILABLE:
+            raise ImportError("The Levenshtein library required to use this class is not available!")
+
+        import Levenshtein as c_levenshtein
+        self._distance = c_levenshtein.distance
+
+
+    def distance(self, seq1: Sequence, seq2: Sequence) -> int:
+        if isinstance(seq1, str) and isinstance(seq2, str):
+            return self._distance(seq1, seq2)
+
+        # The C implementation only handles strings
+        return super().distance(seq1, seq2)
+
+
+class NumpyScoringBackend(BaseScoringBackend):
+    """Computes a whole batch of distances in one vectorized dynamic programming pass."""
+
+    name = beeconst.SCORING_BACKEND_NUMPY
+
+    def __init__(self):
+        if NUMPY_UNAVAILABLE:
+            raise ImportError("The NumPy library required to use this class is not available!")
+
+        global numpy
+        import numpy
+
+
+    def distance(self, seq1: Sequence, seq2: Sequence) -> int:
+        distance, = self.pairwise_distances([(seq1, seq2)])
+        return distance
+
+
+    @staticmethod
+    def _encode(sequences: typing.Sequence[Sequence], width: int, vocabulary: dict, padding: int):
+        encoded = numpy.full((len(sequences), width), padding, dtype=numpy.int64)
+
+        for (row, sequence) in enumerate(sequences):
+            encoded[row, :len(sequence)] = [
+                vocabulary.setdefault(item, len(vocabulary))
+                for item in sequence
+            ]
+
+        return encoded
+
+
+    def pairwise_distances(self, pairs: typing.Sequence[SequencePair]) -> list[int]:
+        if not pairs:
+            return []
+
+        firsts, seconds = zip(*pairs)
+        first_lens = numpy.array([len(seq) for seq in firsts])
+        second_lens = numpy.array([len(seq) for seq in seconds])
+        max_first_len, max_second_len = int(first_lens.max()), int(second_lens.max())
+
+        # Padding codes never match anything - and never each other, either
+        vocabulary = {}
+        first_codes = self._encode(firsts, max_first_len, vocabulary, padding=-1)
+        second_codes = self._encode(seconds, max_second_len, vocabulary, padding=-2)
+
+        batch_rows = numpy.arange(len(pairs))
+        columns = numpy.arange(max_second_len + 1)
+
+        row = numpy.broadcast_to(columns, (len(pairs), max_second_len + 1)).copy()
+        distances = row[batch_rows, second_lens].copy()
+
+        for idx in range(max_first_len):
+            costs = first_codes[:, idx, None] != second_codes
+
+            # Deletions and substitutions only depend on the previous row...
+            candidates = numpy.empty_like(row)
+            candidates[:, 0] = idx + 1
+            candidates[:, 1:] = numpy.minimum(row[:, 1:] + 1, row[:, :-1] + costs)
+
+            # ...while insertions chain along the current row: D[j] = min_k(D'[k] + j - k)
+            row = numpy.minimum.accumulate(candidates - columns, axis=1) + columns
+
+            finished = first_lens == (idx + 1)
+            distances[finished] = row[finished, second_lens[finished]]
+
+        return distances.tolist()
+
+
+SCORING_BACKENDS = {
+    backend_class.name: backend_class
+    for backend_class in (
+        RapidfuzzScoringBackend,
+        LevenshteinScoringBackend,
+        NumpyScoringBackend,
+        PythonScoringBackend,
+    )
+}
+
+
+@functools.lru_cache(maxsize=5)
+def get_scoring_backend(name: str = None) -> BaseScoringBackend:
+    """Returns the named scoring backend, or the fastest one available if no name is given."""
+    _name = name or os.environ.get(beeconst.ENV_SCORING_BACKEND)
+
+    if _name:
+        backend = SCORING_BACKENDS[_name.lower()]()
+        return backend
+
+    for backend_class in SCORING_BACKENDS.values():
+        try:
+            backend = backend_class()
+        except ImportError:
+            continue
+        else:
+            return backend
@@ -1,20 +1,16 @@
 import functools
+import importlib.util
+import typing
 
+from beeapi import constants as beeconst
 from beeapi.core.abcs import BaseStemmer
 from beeapi.core.logging import get_logger
 
 logger = get_logger()
 
 
-NLTK_UNAVAILABLE, NLTK_ERR = True, None
-
-try:
-    from nltk.stem import SnowballStemmer
-except ImportError as nltk_import_err:
-    from beeapi.core.abcs import BaseStemmer as SnowballStemmer
-    NLTK_ERR = nltk_import_err
-else:
-    NLTK_UNAVAILABLE = False
+# NLTK takes a long while to import, so it's only imported once one of its stemmers is actually needed
+NLTK_UNAVAILABLE = importlib.util.find_spec("nltk") is None
 
 
 class BasicStemmer(BaseStemmer):
@@ -24,6 +20,31 @@ class BasicStemmer(BaseStemmer):
         return processed
 
 
+class MemoizedStemmer(BaseStemmer):
+    """Wraps another stemmer, remembering the stems of (up to `max_entries` of) the most recently stemmed words."""
+
+    def __init__(self, stemmer: BaseStemmer, max_entries: int = None):
+        _max_entries = max_entries or beeconst.DEFAULT_STEM_CACHE_SIZE
+
+        self.stemmer = stemmer
+        self._stem = functools.lru_cache(maxsize=_max_entries)(stemmer.stem)
+
+
+    def stem(self, string: str, *args, **kwargs) -> str:
+        processed = self._stem(string)
+        return processed
+
+
+    def stats(self) -> dict:
+        cache_info = self._stem.cache_info()
+        stats = {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "entries": cache_info.currsize,
+        }
+        return stats
+
+
 class NltkStemmer(BaseStemmer):
     DEFAULT_LANG = "english"
 
@@ -47,8 +68,10 @@ class NltkStemmer(BaseStemmer):
 
     def __init__(self, language):
         if NLTK_UNAVAILABLE:
-            logger.warning("The NLTK library required to use this class is not available!", exc_info=True)
-            raise NLTK_ERR
+            logger.warning("The NLTK library required to use this class is not available!")
+            raise ImportError("The NLTK library required to use this class is not available!")
+
+        from nltk.stem import SnowballStemmer
 
         self.nltk = SnowballStemmer(
             language=language
@@ -76,8 +99,6 @@ class NltkStemmer(BaseStemmer):
 
 
 class WhooshSnowballStemmer(BaseStemmer):
-    from whoosh.lang.snowball import classes as snowball_classes
-
     def __init__(self, stemmer):
         self.stemmer = stemmer
 
@@ -87,11 +108,20 @@ class WhooshSnowballStemmer(BaseStemmer):
         return processed
 
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def get_snowball_classes() -> dict:
+        # Loads the stemmers of every language, so it's put off until one of them is needed
+        from whoosh.lang.snowball import classes
+        return classes
+
+
     @classmethod
-    @functools.lru_cache(maxsize=5)
+    @functools.lru_cache(maxsize=None)
     def get_stemmer_for(cls, lang: str = None):
+        # There are only ever a few dozen language prefixes, so every one of them gets to stay
         language = lang or "en"
-        stemmer_class = cls.snowball_classes.get(language)
+        stemmer_class = cls.get_snowball_classes().get(language)
 
         if stemmer_class is None:
             # If it's None at this point, it's not a Snowball-stemmable language
@@ -102,3 +132,66 @@ class WhooshSnowballStemmer(BaseStemmer):
 
         return cls(stemmer=stemmer)
 
+
+    @classmethod
+    def get_memoized_stemmer_for(cls, lang: str = None) -> MemoizedStemmer:
+        """Like `get_stemmer_for()`, but the stemmer remembers the stems of the words it has seen.
+
+        Every language gets a memo of its own (see `get_stem_cache_stats()`).
+        """
+        stemmer = memoized_stemmers.get(lang)
+
+        if stemmer is None:
+            stemmer = memoized_stemmers.setdefault(lang, MemoizedStemmer(cls.get_stemmer_for(lang)))
+
+        return stemmer
+
+
+memoized_stemmers: dict[typing.Optional[str], MemoizedStemmer] = {}
+
+
+def get_stem_cache_stats() -> dict:
+    """Reports the hits, misses and entries of the stem memo of each language, by language prefix."""
+    stats = {
+        (lang or ""): stemmer.stats()
+        for (lang, stemmer) in memoized_stemmers.items()
+    }
+    return stats
+
+
+def clear_stem_caches():
+    memoized_stemmers.clear()
+
+
+def merge_stem_cache_stats(all_stats: typing.Iterable[dict]) -> dict:
+    """Adds up the stem memo stats of several processes."""
+    merged = {}
+
+    for stats in all_stats:
+        for (lang, lang_stats) in stats.items():
+            merged_lang_stats = merged.setdefault(lang, dict.fromkeys(lang_stats, 0))
+
+            for (key, value) in lang_stats.items():
+                merged_lang_stats[key] += value
+
+    return merged
+
+
+def format_stem_cache_stats(stats: dict) -> str:
+    """Summarizes the stem memo stats as overall and per-language hit rates, busiest languages first."""
+    def hit_rate(lang_stats):
+        lookups = lang_stats["hits"] + lang_stats["misses"]
+        return lang_stats["hits"] / lookups if lookups else 0.0
+
+    total_stats = merge_stem_cache_stats({"": lang_stats} for lang_stats in stats.values()).get("")
+    if total_stats is None:
+        return "no words stemmed"
+
+    by_lookups = sorted(stats.items(), key=lambda item: -(item[1]["hits"] + item[1]["misses"]))
+    per_lang = ", ".join(
+        f"{lang or '-'} {hit_rate(lang_stats):.0%}"
+        for (lang, lang_stats) in by_lookups
+    )
+
+    summary = f"{hit_rate(total_stats):.1%} of {total_stats['hits'] + total_stats['misses']} words ({per_lang})"
+    return summary
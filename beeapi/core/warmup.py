@@ -0,0 +1,114 @@
+import collections
+import itertools
+import os
+import threading
+import time
+import typing
+
+from beeapi import constants as beeconst
+from beeapi.core import apptypes, logging
+from beeapi.core.indexing import get_phrase_store, get_searcher_manager
+from beeapi.core.queryhandler import prepare_phrase_searchers
+
+logger = logging.get_logger()
+
+
+def warm_up_index(index: apptypes.Index, phrase_engine: str = None, stem_lookup: bool = None) -> dict:
+    """Loads everything that queries on an index need up front, so that the first few queries don't have to.
+
+    Opens the (long-lived) searcher and the segment readers under it, reads through the term
+    dictionary the phrase queries expand prefixes in, looks up the documents of each subphrase
+    length and builds the phrase engine and the stem index that the queries use.
+    Returns some stats about what got loaded.
+    """
+    started_at = time.monotonic()
+    searcher_manager = get_searcher_manager(index)
+
+    with searcher_manager.searcher() as searcher:
+        # Reading through the terms pulls their (mmapped) pages into memory
+        term_count = sum(1 for _ in searcher.reader().lexicon(beeconst.CONTENTS_COLUMN))
+
+        phrase_store = get_phrase_store(searcher)
+        for word_count in range(1, beeconst.DEFAULT_MAX_NGRAM_LENGTH + 1):
+            phrase_store.get_word_count_docs(word_count)
+
+        prepare_phrase_searchers(
+            searcher_manager,
+            searcher,
+            phrase_engine=phrase_engine,
+            stem_lookup=stem_lookup,
+        )
+
+        phrase_count = searcher.doc_count()
+
+    stats = {
+        "phrases": phrase_count,
+        "terms": term_count,
+        "seconds": round(time.monotonic() - started_at, 3),
+    }
+    return stats
+
+
+def load_warmup_queries(path: os.PathLike, count: int = None) -> list[str]:
+    """Reads (up to `count` of) the queries to warm up on from a file, one per line; none if there's no file."""
+    _count = beeconst.DEFAULT_WARMUP_QUERY_COUNT if count is None else count
+
+    try:
+        with open(path, encoding="utf8") as queries_file:
+            stripped_lines = (line.strip() for line in queries_file)
+            queries = list(itertools.islice(filter(None, stripped_lines), _count))
+
+    except FileNotFoundError:
+        return []
+
+    return queries
+
+
+class QueryRecorder:
+    """Counts how often each query comes in, so that the most frequent ones can warm up the next run.
+
+    Only the counts of (about) the `max_entries` most frequent queries are kept.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or beeconst.MAX_RECORDED_QUERIES
+
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+
+    def record(self, user_queries: typing.Iterable[str]):
+        # Whitespace makes no difference to the results, and newlines would split up the saved queries
+        normalized_queries = [" ".join(user_query.split()) for user_query in user_queries]
+
+        with self._lock:
+            self._counts.update(filter(None, normalized_queries))
+
+            # Trimmed down only every so often, as that sorts all of them
+            if len(self._counts) > 2 * self.max_entries:
+                self._counts = collections.Counter(dict(self._counts.most_common(self.max_entries)))
+
+
+    def most_common(self, count: int = None) -> list[str]:
+        with self._lock:
+            queries = [user_query for (user_query, _) in self._counts.most_common(count or self.max_entries)]
+
+        return queries
+
+
+    def save(self, path: os.PathLike) -> int:
+        """Writes the most frequent queries to a file, one per line, most frequent first; returns how many.
+
+        If no queries were recorded, the file is left alone, rather than wiping out the last run's.
+        """
+        queries = self.most_common()
+        if not queries:
+            return 0
+
+        # Every API worker process saves its own; the last one to shut down wins
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf8") as queries_file:
+            queries_file.writelines(f"{user_query}\n" for user_query in queries)
+
+        os.replace(temp_path, path)
+        return len(queries)
@@ -0,0 +1,179 @@
+import functools
+import threading
+import typing
+import weakref
+
+from whoosh.index import LockError
+
+from beeapi import constants as beeconst
+from beeapi.core import apptypes, logging
+from beeapi.core.indexing import cancel_writer, get_searcher_manager
+
+logger = logging.get_logger()
+
+_buffers = weakref.WeakSet()
+
+
+class WriteBehindBuffer:
+    """Collects documents added to an index and commits them in batches, off the caller's thread.
+
+    Documents are committed once `max_docs` of them are waiting, or `period` seconds
+    after the previous commit, whichever comes first, so that a burst of single-document
+    writes becomes one segment rather than hundreds. The write lock is only held for
+    the duration of a commit, so other writers (e.g. reindexing) are not locked out.
+    """
+
+    def __init__(self, index: apptypes.Index, max_docs=None, period=None, lock_timeout=None):
+        self.index = index
+        self.max_docs = max_docs or beeconst.DEFAULT_WRITE_BUFFER_SIZE
+        self.period = period or beeconst.DEFAULT_WRITE_BUFFER_PERIOD_SECONDS
+        self.lock_timeout = (
+            beeconst.DEFAULT_WRITE_LOCK_TIMEOUT_SECONDS if lock_timeout is None
+            else lock_timeout
+        )
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_due = threading.Event()
+        self._closed = threading.Event()
+
+        self.committed = 0
+        self.commits = 0
+
+        self._flusher = threading.Thread(
+            target=self._run_flusher,
+            name="beeapi-write-buffer",
+            daemon=True,
+        )
+        self._flusher.start()
+
+        _buffers.add(self)
+
+
+    def _run_flusher(self):
+        while not self._closed.is_set():
+            self._flush_due.wait(timeout=self.period)
+            self._flush_due.clear()
+
+            try:
+                self.flush()
+            except LockError:
+                # The documents are put back in the buffer, so they'll be retried on the next round
+                logger.warning("Failed to commit buffered documents: the index is locked.")
+            except Exception:
+                logger.error("Failed to commit buffered documents; they have been dropped!", exc_info=True)
+
+
+    def add(self, document: dict) -> int:
+        pending_count = self.add_many([document])
+        return pending_count
+
+
+    def add_many(self, documents: typing.Iterable[dict]) -> int:
+        """Queues up the documents for the next commit; returns the number of documents waiting for one."""
+        if self._closed.is_set():
+            raise RuntimeError("Cannot add documents to a closed write buffer!")
+
+        with self._lock:
+            self._pending.extend(documents)
+            pending_count = len(self._pending)
+
+        if pending_count >= self.max_docs:
+            self._flush_due.set()
+
+        return pending_count
+
+
+    def flush(self) -> int:
+        """Commits all buffered documents in one go; returns how many got committed.
+
+        If the index is locked, the documents are put back in the buffer for the next flush.
+        Documents the index rejects would fail every retry, so they are logged and dropped;
+        so is the whole batch if the commit itself fails.
+        """
+        with self._flush_lock:
+            with self._lock:
+                documents, self._pending = self._pending, []
+
+            if not documents:
+                return 0
+
+            try:
+                committed_count = self._commit(documents)
+
+            except LockError:
+                with self._lock:
+                    self._pending[:0] = documents
+                raise
+
+            if not committed_count:
+                return 0
+
+            self.committed += committed_count
+            self.commits += 1
+
+        get_searcher_manager(self.index).invalidate_stale()
+        return committed_count
+
+
+    def _commit(self, documents: list[dict]) -> int:
+        while documents:
+            writer = self.index.writer(timeout=self.lock_timeout)
+            rejected_position = None
+
+            try:
+                for (position, document) in enumerate(documents):
+                    try:
+                        writer.update_document(**document)
+                    except Exception:
+                        rejected_position = position
+                        logger.error(f"Dropping a document the index rejected: {document!r}", exc_info=True)
+                        break
+
+                else:
+                    writer.commit()
+
+            except BaseException:
+                cancel_writer(writer)
+                raise
+
+            if rejected_position is None:
+                return len(documents)
+
+            # The rejected document may have been half-written already, so the rest are written over again;
+            # dropped in place, so that it isn't put back in the buffer if the index is locked by then
+            cancel_writer(writer)
+            del documents[rejected_position]
+
+        return 0
+
+
+    def close(self):
+        self._closed.set()
+        self._flush_due.set()
+        self._flusher.join()
+        self.flush()
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_count = len(self._pending)
+
+        stats = {
+            "pending": pending_count,
+            "committed": self.committed,
+            "commits": self.commits,
+        }
+        return stats
+
+
+@functools.lru_cache(maxsize=5)
+def get_write_buffer(index: apptypes.Index) -> WriteBehindBuffer:
+    write_buffer = WriteBehindBuffer(index=index)
+    return write_buffer
+
+
+def close_all():
+    for write_buffer in list(_buffers):
+        write_buffer.close()
@@ -6,7 +6,25 @@ import beeapi.constants
 
 
 @invoke.task
-def run_api(c, port=None, workers=None, reload=False, background=False):
+def run_api(
+    c,
+    port=None,
+    workers=None,
+    reload=False,
+    background=False,
+    query_engine=None,
+    query_workers=None,
+    query_queue_size=None,
+    query_timeout=None,
+    phrase_engine=None,
+    job_store=None,
+    optimize_interval=None,
+    prune_matches=False,
+    stem_lookup=True,
+    warmup_queries=None,
+    warmup_query_count=None,
+    record_queries=True,
+):
     _port = port or beeapi.constants.DEFAULT_API_PORT
     raw_commands = []
 
@@ -21,15 +39,51 @@ def run_api(c, port=None, workers=None, reload=False, background=False):
         raw_commands.append("--workers")
         raw_commands.append(workers)
 
+    if query_engine:
+        raw_commands.append(f"--query-engine {query_engine}")
+
+    if query_workers:
+        raw_commands.append(f"--query-workers {query_workers}")
+
+    if query_queue_size:
+        raw_commands.append(f"--query-queue-size {query_queue_size}")
+
+    if query_timeout:
+        raw_commands.append(f"--query-timeout {query_timeout}")
+
+    if phrase_engine:
+        raw_commands.append(f"--phrase-engine {phrase_engine}")
+
+    if job_store:
+        raw_commands.append(f"--job-store {job_store}")
+
+    if optimize_interval:
+        raw_commands.append(f"--optimize-interval {optimize_interval}")
+
+    if prune_matches:
+        raw_commands.append("--prune-matches")
+
+    if not stem_lookup:
+        raw_commands.append("--no-stem-lookup")
+
+    if warmup_queries:
+        raw_commands.append(f"--warmup-queries {warmup_queries}")
+
+    if warmup_query_count is not None:
+        raw_commands.append(f"--warmup-query-count {warmup_query_count}")
+
+    if not record_queries:
+        raw_commands.append("--no-record-queries")
+
     run_command = " ".join(raw_commands)
     runstate = c.run(run_command, disown=bool(background))
     return runstate
 
 
 @invoke.task
-def run_query(c, query):
+def run_query(c, query, prune_matches=False, lang=None):
     from beeapi.cli.cli import run_app_once
-    result = run_app_once(query)
+    result = run_app_once(query, prune_matches=prune_matches or None, lang=lang)
     print(result)
     return
 
@@ -42,16 +96,48 @@ def run_app(c):
 
 
 @invoke.task
-def run_indexing(c, filepath=None, force=False):
+def run_indexing(c, filepath=None, force=False, incremental=False, versioned=False, workers=None, batch_size=None):
     _filepath = filepath or beeapi.constants.DEFAULT_DICT_PATH
+    _workers = None if not workers else int(workers)
+    _batch_size = None if not batch_size else int(batch_size)
+
     from beeapi.core.parsing import OFFCategoriesDictParser
-    parsed = (
-        OFFCategoriesDictParser.parse(_filepath) if force
-        else OFFCategoriesDictParser.parse_cached(_filepath)
-    )
+    if versioned:
+        # Builds alongside the live index and swaps it in; a running API picks it up on its own
+        parser = OFFCategoriesDictParser.parse_versioned
+    elif force:
+        parser = OFFCategoriesDictParser.parse
+    elif incremental:
+        parser = OFFCategoriesDictParser.parse_incremental
+    else:
+        parser = OFFCategoriesDictParser.parse_cached
+
+    parsed = parser(_filepath, workers=_workers, batch_size=_batch_size)
     return parsed
 
 
+@invoke.task
+def optimize_index(c, merge_only=False):
+    from beeapi.core.indexing import build_file_indexer
+    from beeapi.core.maintenance import get_segment_stats, optimize_index as _optimize_index
+
+    index = build_file_indexer()
+    print(f"Before: {get_segment_stats(index)}")
+
+    optimized = _optimize_index(
+        index,
+        full=not merge_only,
+        lock_timeout=beeapi.constants.DEFAULT_WRITE_LOCK_TIMEOUT_SECONDS,
+    )
+
+    if not optimized:
+        print("The index is locked by another writer; try again later.")
+        return
+
+    print(f"After: {get_segment_stats(index)}")
+    return
+
+
 def _build_image(tag=None, dev=False):
     _tag = tag or beeapi.constants.DEFAULT_DOCKER_TAG
 
@@ -1,3 +1,5 @@
+import time
+
 import httpx
 import pytest
 
@@ -27,10 +29,79 @@ def test_jobs(query, must_haves):
             text=query
         )
     )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    for _ in range(100):
+        response = httpx.get(
+            f"{TEST_ADDRESS}/jobs/{job_id}"
+        )
+        if response.json()["status"] != "pending":
+            break
+        time.sleep(0.1)
 
+    assert response.json()["status"] == "done"
     json_resp = response.text
 
     for must_have in must_haves:
         assert must_have in json_resp
 
     return json_resp
+
+
+def test_batch_jobs():
+    response = httpx.post(
+        f"{TEST_ADDRESS}/jobs/batch",
+        json=["pancake", "red velvet cake", "pancake"]
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    for _ in range(100):
+        response = httpx.get(
+            f"{TEST_ADDRESS}/jobs/{job_id}"
+        )
+        if response.json()["status"] != "pending":
+            break
+        time.sleep(0.1)
+
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert "pancakes" in results[0]
+    assert "red velvet cake" in results[1]
+    assert results[0] == results[2]
+
+
+def test_jobs_demo():
+    response = httpx.get(
+        f"{TEST_ADDRESS}/jobs",
+        params=dict(
+            text="pancake"
+        )
+    )
+
+    assert "pancakes" in response.json()["results"]
+
+
+def test_missing_job():
+    response = httpx.get(
+        f"{TEST_ADDRESS}/jobs/does-not-exist"
+    )
+    assert response.status_code == 404
+
+
+def test_index_version():
+    response = httpx.get(
+        f"{TEST_ADDRESS}/admin/index"
+    )
+    assert response.status_code == 200
+    assert response.json()["results"]["doc_count"]
+
+
+def test_bulk_dictionary_rejects_invalid_lines():
+    response = httpx.put(
+        f"{TEST_ADDRESS}/dictionary/bulk",
+        content='{"lineno": 1, "original": "pancakes", "stemmed": "pancak"}\n{"lineno": 2}\n',
+    )
+    assert response.status_code == 400
+    assert "line 2" in response.json()["detail"]
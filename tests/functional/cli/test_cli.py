@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from beeapi import constants as beeconsts
+from beeapi.core.parsing import OFFCategoriesDictParser
+
+# Generous, so as not to be flaky on slow machines; on a typical one, it's under a third of that.
+# That's for a whole one-off query: starting up, opening the index, querying it and printing the matches.
+CLI_QUERY_BUDGET_SECONDS = 1.0
+CLI_QUERY_RUNS = 3
+
+
+def _run_cli_query(query: str) -> str:
+    """Runs a one-off query through the CLI in a fresh interpreter; returns what it prints."""
+    env = {**os.environ, "PYTHONPATH": beeconsts.PROJECT_DIR}
+    env.pop(beeconsts.ENV_MAIN_RUN_LOOPED, None)
+
+    result = subprocess.run(
+        [sys.executable, "-m", "beeapi.cli"],
+        input=f"{query}\n",
+        cwd=beeconsts.PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+@pytest.fixture(scope="module")
+def sample_index():
+    # The same index the rest of the functional tests query; built up front, so that no timed run does it
+    index = OFFCategoriesDictParser.parse_cached(filepath=beeconsts.DEFAULT_DICT_PATH)
+    return index
+
+
+def test_cli_query_time_budget(sample_index):
+    assert "apple juices" in _run_cli_query("apple juice")
+
+    run_seconds = []
+    for _ in range(CLI_QUERY_RUNS):
+        started_at = time.monotonic()
+        _run_cli_query("apple juice")
+        run_seconds.append(time.monotonic() - started_at)
+
+    assert min(run_seconds) < CLI_QUERY_BUDGET_SECONDS
@@ -1,7 +1,9 @@
+import pytest
+
 from beeapi.constants import DEFAULT_DICT_PATH
 from beeapi.core import apptypes
 from beeapi.core.parsing import OFFCategoriesDictParser
-from beeapi.core.queryhandler import run_query
+from beeapi.core.queryhandler import run_query, run_queries
 
 
 def test_sample_dict():
@@ -26,3 +28,40 @@ def test_sample_dict():
         assert best_match == expected_match
 
 
+def test_sample_dict_batch():
+    index: apptypes.Index = OFFCategoriesDictParser.parse_cached(filepath=DEFAULT_DICT_PATH)
+
+    raw_testwords = [
+        "cauliflower cheese",
+        "Red VeLVet caKe",
+        "I like lemon juice and granuated sugar on my pancakes.",
+        "apple juice",
+        "Apple. Juice",
+    ]
+
+    batch_matches = run_queries(
+        user_queries=raw_testwords,
+        index=index,
+        clear_cache=True,
+    )
+
+    for test_word, matches in zip(raw_testwords, batch_matches):
+        assert matches == run_query(user_query=test_word, index=index)
+
+
+# The matches of the original implementation, for queries that the optional tiers must not make worse
+GOLDEN_QUERIES = (
+    ("salted butter", ["butters", "salted butters"]),
+    ("peanut butter crunchy", ["butters", "peanut butters", "peanuts"]),
+    ("vanilla ice cream", ["creamy", "ice creams", "vanilla"]),
+    ("orange juice not from concentrate", ["juice", "orange juices", "oranges"]),
+    ("smoked salmon fillets", ["salmon fillets", "smoked salmons"]),
+)
+
+
+@pytest.mark.parametrize("stem_lookup", (False, True))
+@pytest.mark.parametrize("user_query, expected", GOLDEN_QUERIES)
+def test_golden_queries(user_query, expected, stem_lookup):
+    index: apptypes.Index = OFFCategoriesDictParser.parse_cached(filepath=DEFAULT_DICT_PATH)
+    # Looking the subphrases up by their stems first only ever skips phrase queries, never changes the matches
+    assert sorted(run_query(user_query=user_query, index=index, stem_lookup=stem_lookup)) == expected
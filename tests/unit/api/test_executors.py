@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from beeapi.api.executors import QueryExecutor
+from beeapi.core import indexing
+from beeapi.core.exceptions import QueryExecutorSaturated
+
+
+def test_query_executor_runs_off_event_loop():
+    executor = QueryExecutor(max_workers=1)
+
+    async def runner():
+        return await executor.run(threading.get_ident)
+
+    worker_thread = asyncio.run(runner())
+    assert worker_thread != threading.get_ident()
+    executor.shutdown()
+
+
+def test_query_executor_rejects_when_saturated():
+    executor = QueryExecutor(max_workers=1, max_pending=0)
+    release = threading.Event()
+
+    busy = executor.submit(release.wait)
+    with pytest.raises(QueryExecutorSaturated):
+        executor.submit(release.wait)
+
+    release.set()
+    busy.result()
+    executor.shutdown()
+
+
+def test_query_executor_times_out():
+    executor = QueryExecutor(max_workers=1, timeout=0.01)
+    release = threading.Event()
+
+    async def runner():
+        return await executor.run(release.wait)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(runner())
+
+    release.set()
+    executor.shutdown()
+
+
+def test_query_executor_warms_up_each_worker():
+    index = indexing.build_index_from_storage(storage=indexing.build_ram_storage())
+    indexing.add_document_to_index(original="apple juice", stemmed="appl juic", lineno=1, index=index)
+
+    executor = QueryExecutor(max_workers=3)
+    stats = executor.warm_up(index)
+
+    assert stats["workers"] == 3
+    assert stats["phrases"] == 1
+    # Each worker thread has a searcher of its own open (and warmed up)
+    assert len(indexing.get_searcher_manager(index)._slots) == 3
+    executor.shutdown()
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from beeapi.api import jobs
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def job_store(request, tmp_path):
+    kwargs = dict(max_entries=2, ttl=None)
+    if request.param == "sqlite":
+        kwargs["path"] = str(tmp_path / "jobs.sqlite3")
+
+    store = jobs.build_job_store(store_type=request.param, **kwargs)
+    return store
+
+
+def test_job_store_lifecycle(job_store):
+    record = job_store.create()
+    assert job_store.get(record["id"])["status"] == jobs.JOB_PENDING
+
+    job_store.complete(record["id"], results=["apple juice"])
+    done_record = job_store.get(record["id"])
+    assert done_record["status"] == jobs.JOB_DONE
+    assert done_record["results"] == ["apple juice"]
+
+
+def test_job_store_is_bounded(job_store):
+    records = [job_store.create() for _ in range(3)]
+
+    assert job_store.get(records[0]["id"]) is None
+    assert job_store.get(records[-1]["id"])
+
+
+def test_job_store_missing_job(job_store):
+    assert job_store.get("does-not-exist") is None
+
+
+def test_sqlite_job_store_closes_connections(tmp_path, monkeypatch):
+    store = jobs.build_job_store(store_type="sqlite", path=str(tmp_path / "jobs.sqlite3"), max_entries=2)
+
+    connections = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(jobs.sqlite3, "connect", tracking_connect)
+
+    record = store.create()
+    assert store.get(record["id"])
+    assert connections
+
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from beeapi import constants as beeconsts
+
+# Generous, so as not to be flaky on slow machines; on a typical one, it's under a third of that
+CLI_IMPORT_BUDGET_SECONDS = 0.4
+
+# One-off queries get by without any of these
+CLI_UNNEEDED_MODULES = (
+    "fastapi",
+    "pydantic",
+    "uvicorn",
+    "numpy",
+    "nltk",
+    "multiprocessing",
+    "whoosh.lang.snowball",
+    "beeapi.core.stemming",
+    "whoosh.writing",
+    "beeapi.core.parsing",
+    "beeapi.api",
+)
+
+
+def _profile_imports(module_name: str) -> dict[str, int]:
+    """Imports the module in a fresh interpreter; returns the import time of each module loaded, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=beeconsts.PROJECT_DIR,
+        env={**os.environ, "PYTHONPATH": beeconsts.PROJECT_DIR},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, _, name = line.removeprefix("import time:").split("|")
+        import_times[name.strip()] = int(self_time)
+
+    return import_times
+
+
+@pytest.fixture(scope="module")
+def cli_import_times():
+    import_times = _profile_imports("beeapi.cli.cli")
+    return import_times
+
+
+@pytest.mark.parametrize("module_name", CLI_UNNEEDED_MODULES)
+def test_cli_skips_unneeded_imports(cli_import_times, module_name):
+    assert module_name not in cli_import_times
+
+
+def test_cli_import_time_budget(cli_import_times):
+    # Everything imported after the interpreter's own startup (which finishes with `site`) is down to the CLI
+    names = list(cli_import_times)
+    cli_names = names[names.index("site") + 1:] if "site" in names else names
+
+    total_seconds = sum(cli_import_times[name] for name in cli_names) / 1e6
+    assert total_seconds < CLI_IMPORT_BUDGET_SECONDS
@@ -0,0 +1,61 @@
+from beeapi.core import caching
+
+
+def test_result_cache_hit_and_miss():
+    cache = caching.ResultCache(name="test", max_entries=10)
+
+    assert cache.get(("apple",), (0, 1)) is caching.MISSING
+    cache.put(("apple",), (0, 1), ("apple",))
+
+    assert cache.get(("apple",), (0, 1)) == ("apple",)
+    assert cache.get(("apple",), (0, 2)) is caching.MISSING
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = caching.ResultCache(name="test", max_entries=2)
+
+    cache.put("a", 0, 1)
+    cache.put("b", 0, 2)
+    cache.get("a", 0)
+    cache.put("c", 0, 3)
+
+    assert cache.get("b", 0) is caching.MISSING
+    assert cache.get("a", 0) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_result_cache_bounded_by_bytes():
+    cache = caching.ResultCache(name="test", max_entries=100, max_bytes=1000)
+
+    for idx in range(20):
+        cache.put(idx, 0, "x" * 100)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000
+    assert stats["evictions"] > 0
+
+
+def test_result_cache_expires_entries():
+    cache = caching.ResultCache(name="test", max_entries=10, ttl=-1)
+
+    cache.put("a", 0, 1)
+    assert cache.get("a", 0) is caching.MISSING
+
+
+def test_result_cache_invalidates_stale_generations():
+    cache = caching.ResultCache(name="test", max_entries=10)
+
+    cache.put("a", (0, 1), 1)
+    cache.put("b", (0, 2), 2)
+    cache.put("c", (1, 1), 3)
+
+    dropped = cache.invalidate(lambda generation: generation == (0, 1))
+
+    assert dropped == 1
+    assert cache.get("a", (0, 1)) is caching.MISSING
+    assert cache.get("b", (0, 2)) == 2
+    assert cache.get("c", (1, 1)) == 3
@@ -1,4 +1,8 @@
+import threading
+
 import pytest
+from whoosh import columns, fields
+
 from beeapi.core import indexing
 
 
@@ -16,3 +20,147 @@ def test_build_ram_storage():
     assert result
     assert isinstance(result, indexing.RamStorage)
 
+
+
+def test_searcher_manager_reuses_searcher_until_commit():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+    indexing.add_document_to_index(
+        original="apple",
+        stemmed="appl",
+        lineno=1,
+        index=index,
+    )
+    manager = indexing.SearcherManager(index=index)
+
+    with manager.searcher() as first_searcher:
+        pass
+
+    with manager.searcher() as second_searcher:
+        pass
+
+    assert first_searcher is second_searcher
+
+    indexing.add_document_to_index(
+        original="apple juice",
+        stemmed="appl juic",
+        lineno=2,
+        index=index,
+    )
+
+    with manager.searcher() as refreshed_searcher:
+        assert refreshed_searcher is not first_searcher
+        assert refreshed_searcher.doc_count() == 2
+
+    manager.close()
+
+
+def test_searcher_manager_closes_searchers_of_exited_threads():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+    manager = indexing.SearcherManager(index=index)
+    thread_searchers = []
+
+    thread = threading.Thread(target=lambda: thread_searchers.append(manager.acquire()))
+    thread.start()
+    thread.join()
+
+    assert thread_searchers[0].is_closed
+    assert not manager._slots
+
+    searcher = manager.acquire()
+    manager.close()
+    assert searcher.is_closed
+    assert manager.acquire() is not searcher
+
+
+def test_index_versions(tmp_path):
+    index_dir = str(tmp_path)
+    assert indexing.resolve_index_dir(index_dir=index_dir) == index_dir
+
+    first_version, _ = indexing.create_index_version(index_dir=index_dir)
+    second_version, second_dir = indexing.create_index_version(index_dir=index_dir)
+    assert (first_version, second_version) == ("v000001", "v000002")
+
+    indexing.publish_index_version(second_version, index_dir=index_dir)
+    assert indexing.get_current_index_version(index_dir=index_dir) == second_version
+    assert indexing.resolve_index_dir(index_dir=index_dir) == second_dir
+
+    third_version, _ = indexing.create_index_version(index_dir=index_dir)
+    pruned = indexing.prune_index_versions(index_dir=index_dir, keep=1)
+
+    # The published version is kept, even though it is no longer the newest
+    assert pruned == [first_version]
+    assert indexing.list_index_versions(index_dir=index_dir) == [second_version, third_version]
+
+
+def test_phrase_store_reads_column():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+
+    for (lineno, phrase) in enumerate(("apple juice", "crème brûlée"), start=1):
+        indexing.add_document_to_index(original=phrase, stemmed=phrase, lineno=lineno, index=index)
+
+    with index.searcher() as searcher:
+        phrase_store = indexing.get_phrase_store(searcher)
+
+        assert phrase_store.column is not None
+        assert [phrase_store[docnum] for docnum in searcher.reader().all_doc_ids()] == ["apple juice", "crème brûlée"]
+        assert indexing.get_phrase_store(searcher) is phrase_store
+
+        candidate = phrase_store.get_candidate(1)
+        assert phrase_store.word_count_column is not None
+        assert candidate == ("crème brûlée", ("crème", "brûlée"), 2)
+
+
+def test_phrase_store_word_count_docs():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+
+    for (lineno, phrase) in enumerate(("apple juice", "apples", "red velvet cake", "lemon juice"), start=1):
+        indexing.add_document_to_index(original=phrase, stemmed=phrase, lineno=lineno, index=index)
+
+    with index.searcher() as searcher:
+        phrase_store = indexing.get_phrase_store(searcher)
+
+        assert phrase_store.word_count_indexed
+        assert phrase_store.get_word_count_docs(2) == {0, 3}
+        assert phrase_store.get_word_count_docs(1) == {1}
+        assert phrase_store.get_word_count_docs(4) == set()
+
+
+def test_phrase_store_lang_docs():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+
+    documents = (("apple juice", "en"), ("jus de pomme", "fr"), ("pommes", "fr"), ("apples", None))
+    for (lineno, (phrase, lang)) in enumerate(documents, start=1):
+        indexing.add_document_to_index(original=phrase, stemmed=phrase, lineno=lineno, lang=lang, index=index)
+
+    with index.searcher() as searcher:
+        phrase_store = indexing.get_phrase_store(searcher)
+
+        assert phrase_store.lang_indexed
+        # The phrases without a language are the English ones
+        assert phrase_store.get_lang_docs("en") == {0, 3}
+        assert phrase_store.get_lang_docs("fr") == {1, 2}
+        assert phrase_store.get_lang_docs("fr", word_count=1) == {2}
+        assert phrase_store.get_lang_docs("de") == set()
+        assert [phrase_store.lang_column[docnum] for docnum in range(4)] == ["en", "fr", "fr", "en"]
+
+
+def test_phrase_store_word_count_docs_unindexed():
+    # As in indices built before the word counts were indexed, rather than only kept as a column
+    schema = indexing.OFFDictSchema()
+    schema.remove("word_count")
+    schema.add("word_count", fields.COLUMN(columns.NumericColumn("B")))
+
+    storage = indexing.build_ram_storage()
+    index = storage.create_index(schema)
+    indexing.add_document_to_index(original="apple juice", stemmed="apple juice", lineno=1, index=index)
+
+    with index.searcher() as searcher:
+        phrase_store = indexing.get_phrase_store(searcher)
+
+        assert not phrase_store.word_count_indexed
+        assert phrase_store.get_word_count_docs(2) is None
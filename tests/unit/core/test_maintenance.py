@@ -0,0 +1,85 @@
+import pytest
+from whoosh import writing
+
+from beeapi.core import indexing, maintenance
+
+
+def _build_fragmented_index(segments_count, storage=None):
+    storage = storage or indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+
+    for lineno in range(segments_count):
+        writer = index.writer()
+        indexing.add_document_to_index(
+            original=f"phrase {lineno}",
+            stemmed=f"phrase {lineno}",
+            lineno=lineno,
+            writer=writer,
+            commit=False,
+        )
+        writer.commit(merge=False)
+
+    return index
+
+
+@pytest.mark.parametrize("stats, expected", (
+    ({"segments": 3, "docs": 100, "deleted": 0, "bytes": 1000}, None),
+    ({"segments": 30, "docs": 100, "deleted": 0, "bytes": 1000}, maintenance.MAINTENANCE_OPTIMIZE),
+    ({"segments": 30, "docs": 100, "deleted": 0, "bytes": 10 ** 12}, maintenance.MAINTENANCE_MERGE),
+    ({"segments": 3, "docs": 100, "deleted": 50, "bytes": 1000}, maintenance.MAINTENANCE_OPTIMIZE),
+    ({"segments": 0, "docs": 0, "deleted": 0, "bytes": 0}, None),
+))
+def test_get_maintenance_action(stats, expected):
+    result = maintenance.get_maintenance_action(stats, max_segments=10, max_deleted_ratio=0.2)
+    assert result == expected
+
+
+def test_optimize_index_merges_segments():
+    index = _build_fragmented_index(segments_count=5)
+    assert maintenance.get_segment_stats(index)["segments"] == 5
+
+    assert maintenance.optimize_index(index)
+
+    stats = maintenance.get_segment_stats(index)
+    assert stats["segments"] == 1
+    assert stats["docs"] == 5
+
+
+def test_optimize_index_skips_locked_index(tmp_path):
+    # NOTE: RAM storage locks can only be waited on, hence the file storage
+    storage = indexing.build_file_storage(index_dir=str(tmp_path))
+    index = _build_fragmented_index(segments_count=2, storage=storage)
+    writer = index.writer()
+
+    try:
+        assert not maintenance.optimize_index(index)
+    finally:
+        writer.cancel()
+
+    assert maintenance.get_segment_stats(index)["segments"] == 2
+
+
+def test_maintenance_scheduler_run_once():
+    index = _build_fragmented_index(segments_count=4)
+    scheduler = maintenance.IndexMaintenanceScheduler(get_index=lambda: index, max_segments=3)
+
+    assert scheduler.run_once() == maintenance.MAINTENANCE_OPTIMIZE
+    assert scheduler.run_once() is None
+    assert maintenance.get_segment_stats(index)["segments"] == 1
+
+
+def test_optimize_index_releases_lock_on_failure(tmp_path, monkeypatch):
+    storage = indexing.build_file_storage(index_dir=str(tmp_path))
+    index = _build_fragmented_index(segments_count=2, storage=storage)
+
+    def failing_commit(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(writing.SegmentWriter, "commit", failing_commit)
+    with pytest.raises(OSError):
+        maintenance.optimize_index(index)
+    monkeypatch.undo()
+
+    # The write lock is free again
+    assert maintenance.optimize_index(index)
+    assert maintenance.get_segment_stats(index)["segments"] == 1
@@ -1,6 +1,11 @@
+import gzip
+import io
+import sys
+import time
+
 import pytest
 
-from beeapi.core import parsing
+from beeapi.core import indexing, parsing
 
 
 @pytest.mark.parametrize("qry, expected", (
@@ -16,3 +21,189 @@ from beeapi.core import parsing
 def test_parse_query(qry, expected):
     result = parsing.parse_query(qry)
     assert result
+
+
+@pytest.mark.parametrize("terms, length, max_skip, expected", (
+    (("a", "b", "c"), 1, 0, [("a",), ("b",), ("c",)]),
+    (("a", "b", "c"), 2, 0, [("a", "b"), ("b", "c")]),
+    (("a", "b", "c"), 3, 0, [("a", "b", "c")]),
+    (("a", "b"), 3, 0, []),
+    (("a", "b", "c"), 2, 1, [("a", "b"), ("a", "c"), ("b", "c")]),
+    (("a", "b", "c", "d"), 2, 1, [("a", "b"), ("a", "c"), ("b", "c"), ("b", "d"), ("c", "d")]),
+))
+def test_generate_ngrams(terms, length, max_skip, expected):
+    result = list(parsing.generate_ngrams(terms, length=length, max_skip=max_skip))
+    assert result == expected
+
+
+def test_generate_phrase_positions_is_linear():
+    result = list(parsing.generate_phrase_positions(30, max_length=3))
+    assert len(result) == 28 + 29 + 30
+    assert result[0] == (0, 1, 2)
+    assert result[-1] == (29,)
+
+
+@pytest.mark.parametrize("bin_line, expected", (
+    (b"\tfr:Jus-de-pommes\t/category/x\t\n", ("jus de pommes", "jus de pomm", "fr")),
+    # Words with spaces in between, rather than dashes, get stemmed one by one, too
+    (b"\tPlant-based foods and beverages\t/category/x\t\n", ("plant based foods and beverages", "plant base food and beverag", "en")),
+))
+def test_handle_line(bin_line, expected):
+    result = parsing.OFFCategoriesDictParser._handle_line(bin_line, lineno=1)
+    assert result == expected
+
+
+def test_handle_lines_parallel_matches_serial():
+    bin_lines = [
+        (f"parent\tfr:Jus-de-pommes-{idx}\t/category/x\t\n".encode("utf8"), idx)
+        for idx in range(1, 50)
+    ]
+
+    serial = list(parsing.OFFCategoriesDictParser._handle_lines(bin_lines, workers=1))
+    parallel = list(parsing.OFFCategoriesDictParser._handle_lines(bin_lines, workers=2, batch_size=7))
+
+    assert parallel == serial
+    assert serial[0] == (("jus de pommes 1", "jus de pomm 1", "fr"), 1)
+
+
+@pytest.mark.parametrize("bin_line, index, expected", (
+    (b"parent\tcategory\turi\twiki\n", 1, b"category"),
+    (b"parent\tcategory\turi\r\n", 2, b"uri"),
+    (b"parent\tcategory", 1, b"category"),
+    (b"parent\tcategory\n", 2, None),
+))
+def test_get_tsv_column(bin_line, index, expected):
+    assert parsing.get_tsv_column(bin_line, index) == expected
+
+
+def test_iter_lines_across_chunks():
+    data = io.BytesIO(b"header\nfirst line\n\nsecond line\nlast")
+    result = list(parsing.iter_lines(data, chunk_size=4))
+    assert result == [b"header", b"first line", b"", b"second line", b"last"]
+
+
+def test_read_data_compressed_stdin(tmp_path, monkeypatch):
+    dict_path = tmp_path / "dict.tsv"
+    _write_tsv(dict_path, [("Pancakes", "/category/pancakes"), ("Crepes", "/category/crepes")])
+    expected = list(parsing.OFFCategoriesDictParser._read_data(dict_path))
+
+    compressed = gzip.compress(dict_path.read_bytes())
+    (tmp_path / "dict.tsv.gz").write_bytes(compressed)
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(compressed)))
+
+    assert expected == [(b"\tPancakes\t/category/pancakes\t", 1), (b"\tCrepes\t/category/crepes\t", 2)]
+    assert list(parsing.OFFCategoriesDictParser._read_data(tmp_path / "dict.tsv.gz")) == expected
+    assert list(parsing.OFFCategoriesDictParser._read_data("-", chunk_size=16)) == expected
+
+
+def test_handle_lines_stems_by_language():
+    bin_lines = [
+        (f"\t{category}\t/category/x\t".encode("utf8"), lineno)
+        for (lineno, category) in enumerate(("fr:Jus-de-pommes", "Apple juices", "fr:Pommes", "de:Äpfel", "Apples"), 1)
+    ]
+
+    stem_stats = {}
+    result = list(parsing.OFFCategoriesDictParser._handle_lines(bin_lines, batch_size=4, stem_stats=stem_stats))
+
+    assert result == [
+        (parsing.OFFCategoriesDictParser._handle_line(bin_line, lineno), lineno)
+        for (bin_line, lineno) in bin_lines
+    ]
+    assert result[2] == (("pommes", "pomm", "fr"), 3)
+    assert stem_stats["fr"] == {"hits": 1, "misses": 3, "entries": 3}
+    assert stem_stats["de"] == {"hits": 0, "misses": 1, "entries": 1}
+
+
+def _write_tsv(path, rows):
+    lines = ["parent\tcategory\turi\twiki"]
+    lines.extend(f"\t{category}\t{uri}\t" for (category, uri) in rows)
+    path.write_text("\n".join(lines) + "\n", encoding="utf8")
+
+
+def _indexed_phrases(index):
+    with index.searcher() as searcher:
+        phrases = sorted(fields["original"] for fields in searcher.all_stored_fields())
+    return phrases
+
+
+def test_parse_incremental(tmp_path):
+    dict_path = tmp_path / "dict.tsv"
+    index_dir = str(tmp_path / "index")
+    parser = parsing.OFFCategoriesDictParser
+
+    _write_tsv(dict_path, [
+        ("Apple juices", "/category/apple-juices"),
+        ("Apple juices", "/category/apple-juices"),
+        ("Pancakes", "/category/pancakes"),
+        ("Red velvet cakes", "/category/red-velvet-cakes"),
+    ])
+    index = parser.parse_incremental(dict_path, index_dir=index_dir)
+    assert _indexed_phrases(index) == ["apple juices", "pancakes", "red velvet cakes"]
+
+    _write_tsv(dict_path, [
+        ("Apple juices", "/category/apple-juices"),
+        ("Crepes", "/category/pancakes"),
+        ("Lemon juices", "/category/lemon-juices"),
+    ])
+    index = parser.parse_incremental(dict_path, index_dir=index_dir)
+    assert _indexed_phrases(index) == ["apple juices", "crepes", "lemon juices"]
+
+    manifest = parsing.load_index_manifest(index_dir=index_dir)
+    assert set(manifest) == {"/category/apple-juices", "/category/pancakes", "/category/lemon-juices"}
+
+
+def test_parse_rebuild_is_as_quick_as_fresh_build(tmp_path):
+    dict_path = tmp_path / "dict.tsv"
+    index_dir = str(tmp_path / "index")
+    parser = parsing.OFFCategoriesDictParser
+
+    _write_tsv(dict_path, [(f"Phrase {lineno}", f"/category/phrase-{lineno}") for lineno in range(1000)])
+
+    started_at = time.perf_counter()
+    parser.parse(dict_path, workers=1, index_dir=index_dir)
+    fresh_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    index = parser.parse(dict_path, workers=1, index_dir=index_dir)
+    rebuild_seconds = time.perf_counter() - started_at
+
+    # Rebuilding on top of an existing index must not pay for deleting each row from it first
+    assert rebuild_seconds < 1.5 * fresh_seconds
+    assert index.doc_count() == 1000
+
+
+def test_parse_versioned_switches_readers_over(tmp_path):
+    dict_path = tmp_path / "dict.tsv"
+    index_dir = str(tmp_path / "index")
+    parser = parsing.OFFCategoriesDictParser
+
+    _write_tsv(dict_path, [("Pancakes", "/category/pancakes")])
+    parser.parse_versioned(dict_path, index_dir=index_dir)
+
+    switcher = indexing.IndexSwitcher(index_dir=index_dir, check_interval=0)
+    old_index = switcher.get_index()
+    assert switcher.version == "v000001"
+    assert _indexed_phrases(old_index) == ["pancakes"]
+    old_searcher = indexing.get_searcher_manager(old_index).acquire()
+
+    _write_tsv(dict_path, [("Crepes", "/category/crepes")])
+    parser.parse_versioned(dict_path, index_dir=index_dir, keep=1)
+
+    # Even once the cache has dropped its manager, the old version's searchers get closed when it's retired for good
+    indexing.get_searcher_manager.cache_clear()
+
+    new_index = switcher.get_index()
+    assert switcher.version == "v000002"
+    assert _indexed_phrases(new_index) == ["crepes"]
+    assert indexing.list_index_versions(index_dir=index_dir) == ["v000002"]
+
+    _write_tsv(dict_path, [("Waffles", "/category/waffles")])
+    parser.parse_versioned(dict_path, index_dir=index_dir, keep=1)
+
+    assert switcher.get_index() is not new_index
+    assert old_searcher.is_closed
+
+
+def test_generate_phrase_positions():
+    result = list(parsing.generate_phrase_positions(3, max_length=2, max_skip=1))
+    assert result == [(0, 1), (0, 2), (1, 2), (0,), (1,), (2,)]
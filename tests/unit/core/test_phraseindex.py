@@ -0,0 +1,254 @@
+import pytest
+
+from beeapi.core import indexing, phraseindex, queryhandler
+
+PHRASES = (
+    "apple juice",
+    "apple juices",
+    "apples",
+    "lemon juice",
+    "juice",
+    "sparkling apple juice",
+    "red velvet cake",
+    "red velvet cakes",
+    "crème brûlée",
+    "pancakes",
+    "apple pie",
+)
+
+
+@pytest.fixture(scope="module")
+def index():
+    storage = indexing.build_ram_storage()
+    _index = indexing.build_index_from_storage(storage=storage)
+
+    writer = _index.writer()
+    for (lineno, phrase) in enumerate(PHRASES, start=1):
+        indexing.add_document_to_index(
+            original=phrase,
+            stemmed=phrase,
+            lineno=lineno,
+            writer=writer,
+            commit=False,
+        )
+    writer.commit()
+
+    return _index
+
+
+LANG_PHRASES = (
+    ("apple juice", "en"),
+    ("apples", "en"),
+    ("pear", "en"),
+    ("apple strudel", "de"),
+    ("apfelsaft", "de"),
+)
+
+
+@pytest.fixture(scope="module")
+def lang_index():
+    storage = indexing.build_ram_storage()
+    _index = indexing.build_index_from_storage(storage=storage)
+
+    writer = _index.writer()
+    for (lineno, (phrase, lang)) in enumerate(LANG_PHRASES, start=1):
+        indexing.add_document_to_index(
+            original=phrase,
+            stemmed=phrase,
+            lineno=lineno,
+            lang=lang,
+            writer=writer,
+            commit=False,
+        )
+    writer.commit()
+
+    return _index
+
+
+@pytest.mark.parametrize("word_tuple, lang, expected", (
+    (("apple",), None, ["apple juice", "apple strudel", "apples"]),
+    (("apple",), "en", ["apple juice", "apples"]),
+    (("apple",), "de", ["apple strudel"]),
+    # No German phrase matches, so the other languages' phrases do
+    (("pear",), "de", ["pear"]),
+    (("apple", "juice"), "de", ["apple juice"]),
+    (("apple",), "xx", ["apple juice", "apple strudel", "apples"]),
+))
+def test_lang_partitions(lang_index, word_tuple, lang, expected):
+    with lang_index.searcher() as searcher:
+        phrase_index = phraseindex.InMemoryPhraseIndex.from_searcher(searcher)
+        whoosh_result = queryhandler._run_whoosh_phrase_query(word_tuple, searcher, lang=lang)
+
+    memory_result = phrase_index.search_phrase(word_tuple, lang=lang)
+
+    assert sorted(candidate.phrase for candidate in whoosh_result) == expected
+    assert sorted(candidate.phrase for candidate in memory_result) == expected
+
+
+def test_stemmed_phrase_index_lang():
+    stem_index = phraseindex.StemmedPhraseIndex(
+        phrases=("butt", "butters", "butter"),
+        stemmed_phrases=("butt", "butter", "butt"),
+        phrase_langs=phraseindex.PhraseLanguages(("en", "en", "de")),
+    )
+
+    def search_phrase(word_tuple, lang=None):
+        return [candidate.phrase for candidate in stem_index.search_phrase(word_tuple, lang=lang)]
+
+    # 'butter' is 'butt' to the German stemmer only, so it doesn't match the English 'butt'
+    assert search_phrase(("butter",)) == ["butters"]
+    assert search_phrase(("butter",), lang="en") == ["butters"]
+    assert search_phrase(("butter",), lang="de") == ["butter"]
+    assert search_phrase(("butter",), lang="fr") == []
+
+
+@pytest.mark.parametrize("word_tuple", (
+    ("apple",),
+    ("app",),
+    ("juice",),
+    ("apple", "juice"),
+    ("apple", "j"),
+    ("red", "velvet", "cake"),
+    ("velvet", "cakes"),
+    ("creme",),
+    ("crème",),
+    ("juice", "apple"),
+    ("banana",),
+))
+def test_memory_engine_matches_whoosh(index, word_tuple):
+    with index.searcher() as searcher:
+        phrase_index = phraseindex.InMemoryPhraseIndex.from_searcher(searcher)
+        expected = queryhandler._run_whoosh_phrase_query(word_tuple, searcher)
+
+    result = phrase_index.search_phrase(word_tuple)
+    assert sorted(result) == sorted(expected)
+
+
+def test_memory_engine_ranks_closest_matches_first(index):
+    with index.searcher() as searcher:
+        phrase_index = phraseindex.InMemoryPhraseIndex.from_searcher(searcher)
+
+    result = phrase_index.search_phrase(("apple",), limit=3)
+    # The limit applies to the phrases as long as the word tuple and to all the others separately
+    assert [candidate.phrase for candidate in result] == ["apples", "apple juice", "apple juices", "apple pie"]
+
+
+def test_whoosh_phrase_query_splits_by_word_count(index, monkeypatch):
+    monkeypatch.setattr(queryhandler.beeconstants, "PHRASE_QUERY_LIMIT", 1)
+
+    with index.searcher() as searcher:
+        result = queryhandler._run_whoosh_phrase_query(("juice",), searcher)
+
+    assert [candidate.word_count for candidate in result] == [1, 2]
+
+
+@pytest.mark.parametrize("word_tuple", (
+    ("apple",),
+    ("juice",),
+    ("apple", "juice"),
+    ("red", "velvet", "cake"),
+    ("banana",),
+))
+def test_whoosh_phrase_query_at_once_matches_partitions(index, word_tuple):
+    sub_qry = queryhandler.query.Sequence([
+        queryhandler.query.Prefix(queryhandler.beeconstants.CONTENTS_COLUMN, word)
+        for word in word_tuple
+    ])
+
+    with index.searcher() as searcher:
+        result = queryhandler._search_phrase_at_once(sub_qry, searcher, len(word_tuple))
+        expected, _ = queryhandler._search_phrase_partition(
+            sub_qry,
+            searcher,
+            exact_docnums=indexing.get_phrase_store(searcher).get_word_count_docs(len(word_tuple)),
+        )
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("user_query", (
+    "I like apple juice and red velvet cake",
+    "sparkling apple juices",
+    "pancakes with lemon juice",
+))
+def test_memory_engine_query_results(index, user_query):
+    expected = queryhandler.run_query(user_query, index=index, phrase_engine="whoosh")
+    result = queryhandler.run_query(user_query, index=index, phrase_engine="memory")
+    assert result == expected
+
+
+def test_packed_phrases():
+    packed = phraseindex.PackedPhrases(PHRASES)
+
+    assert len(packed) == len(PHRASES)
+    assert list(packed) == list(PHRASES)
+    assert packed[8] == "crème brûlée"
+
+    with pytest.raises(IndexError):
+        packed[len(PHRASES)]
+
+
+@pytest.mark.parametrize("lang, expected", (
+    ("en", "appl juic"),
+    ("fr", "apple juic"),
+    # Languages without a stemmer leave the words as they are
+    ("xx", "apple juices"),
+))
+def test_stemmed_phrase(lang, expected):
+    assert phraseindex.get_stemmed_phrase(("apple", "juices"), lang) == expected
+
+
+def test_stemmed_phrase_index():
+    phrases = ("apple juice", "apple juices", "pommes", "apples")
+    stem_index = phraseindex.StemmedPhraseIndex(
+        phrases=phrases,
+        stemmed_phrases=("appl juic", "appl juic", "pomm", "appl"),
+    )
+
+    result = stem_index.search_phrase(("apple", "juices"))
+    # The phrase spelled just like the word tuple goes first
+    assert [candidate.phrase for candidate in result] == ["apple juices", "apple juice"]
+
+    assert [candidate.phrase for candidate in stem_index.search_phrase(("pomme",))] == ["pommes"]
+    assert stem_index.search_phrase(("banana",)) == ()
+
+
+def test_phrase_candidates_look_up_stems_first(index, monkeypatch):
+    stem_index = phraseindex.StemmedPhraseIndex(
+        phrases=("apple juices", "apple juice"),
+        stemmed_phrases=("appl juic", "appl juic"),
+    )
+    phrase_queries = []
+    run_phrase_query = queryhandler.run_phrase_query
+
+    def tracking_run_phrase_query(word_tuple, *args, **kwargs):
+        phrase_queries.append(word_tuple)
+        return run_phrase_query(word_tuple, *args, **kwargs)
+
+    monkeypatch.setattr(queryhandler, "run_phrase_query", tracking_run_phrase_query)
+
+    with index.searcher() as searcher:
+        phrase_candidates = queryhandler.PhraseCandidates(searcher=searcher, stem_index=stem_index)
+
+        # A dictionary phrase - no need for the phrase query
+        assert phrase_candidates[("apple", "juice")] == (
+            indexing.build_candidate("apple juice"), indexing.build_candidate("apple juices"),
+        )
+        assert not phrase_queries
+
+        # Only stemmed phrases to go by, or none at all - just the phrase query
+        for word_tuple in (("apple", "juic"), ("red", "velvet")):
+            assert phrase_candidates[word_tuple] == run_phrase_query(word_tuple, searcher)
+
+        assert phrase_queries == [("apple", "juic"), ("red", "velvet")]
+
+
+def test_stemmed_phrase_index_from_searcher(index):
+    with index.searcher() as searcher:
+        stem_index = phraseindex.StemmedPhraseIndex.from_searcher(searcher)
+
+    assert len(stem_index) == len(PHRASES)
+    assert stem_index.phrase_langs.langs == ("en",)
+    # The fixture index 'stems' the phrases to themselves, so only those the stemmer leaves be match
+    assert [candidate.phrase for candidate in stem_index.search_phrase(("red", "velvet", "cake"))] == ["red velvet cake"]
+    assert stem_index.search_phrase(("apple", "pie")) == ()
@@ -0,0 +1,30 @@
+from beeapi.core import indexing, procpool
+
+
+def test_process_pool_runs_queries(tmp_path):
+    index_dir = str(tmp_path)
+    storage = indexing.build_file_storage(index_dir=index_dir)
+    index = indexing.build_index_from_storage(storage=storage)
+
+    writer = index.writer()
+    for lineno, phrase in enumerate(("apple juice", "red velvet cake", "pancakes"), start=1):
+        indexing.add_document_to_index(
+            original=phrase,
+            stemmed=phrase,
+            lineno=lineno,
+            writer=writer,
+            commit=False,
+        )
+    writer.commit()
+
+    # The same pool the API's process query executor runs its queries on
+    pool = procpool.build_process_pool(workers=1, index_dir=index_dir)
+    try:
+        results = pool.submit(procpool.run_queries_in_worker, ["apple juice", "red velvet cake", "pancakes"]).result()
+        warmup_stats = pool.submit(procpool.get_worker_warmup_stats).result()
+    finally:
+        pool.shutdown()
+
+    assert results == [["apple juice"], ["red velvet cake"], ["pancakes"]]
+    # Each worker warms up its index as it starts up
+    assert warmup_stats["phrases"] == 3
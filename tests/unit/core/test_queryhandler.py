@@ -0,0 +1,108 @@
+import pytest
+
+from beeapi.core import indexing, queryhandler
+
+
+@pytest.mark.parametrize("word_tuple, user_query, expected", (
+    (("apple", "juice"), "fresh apple juices", True),
+    (("apple",), "apples", True),
+    (("apple",), "pineapple", True),
+    (("juice",), "juicer juicing", True),
+    (("red", "cake"), "red velvet cake", False),
+    ((".milk",), "amilk", False),
+    ((".milk",), "juice.milk", True),
+))
+def test_phrase_matcher(word_tuple, user_query, expected):
+    matcher = queryhandler.PhraseMatcher(word_tuple)
+    assert matcher.matches(user_query) == expected
+
+
+def test_phrase_matchers_are_cached():
+    matcher = queryhandler.get_phrase_matcher(("apple", "juice"))
+    assert queryhandler.get_phrase_matcher(("apple", "juice")) is matcher
+    assert matcher.phrase == "apple juice"
+
+
+def test_get_subphrases():
+    result = queryhandler.get_subphrases(("a", "b", "a", "b"), length=2)
+    assert result == (("a", "b"), ("b", "a"))
+
+
+@pytest.mark.parametrize("phrase, word_tuple, user_query, expected", (
+    # Length mismatch, but in the query verbatim: a direct match
+    ("milk chocolate with hazelnuts", ("milk", "chocolate"), "milk chocolate with hazelnuts", ("milk chocolate with hazelnuts", 400)),
+    # Length mismatch otherwise: rejected outright
+    ("milk chocolates", ("milk",), "milk and cookies", (None, float("-inf"))),
+    # Same length, but not a direct match: left for the full scoring
+    ("apple juices", ("apple", "juice"), "apple juice", None),
+))
+def test_prescreen_candidate(phrase, word_tuple, user_query, expected):
+    candidate = indexing.build_candidate(phrase)
+    matcher = queryhandler.get_phrase_matcher(word_tuple)
+
+    result = queryhandler._prescreen_candidate(candidate, matcher, user_query)
+    assert result == expected
+
+
+@pytest.mark.parametrize("phrase, word_tuple", (
+    ("apple juices", ("apple", "juice")),
+    ("apples", ("apple",)),
+    ("pineapple", ("apple",)),
+    ("red velvet cakes", ("red", "velvet", "cake")),
+))
+def test_score_upper_bound(phrase, word_tuple):
+    candidate = indexing.build_candidate(phrase)
+    user_query = "fresh apple juice and red velvet cake"
+    subphrases = queryhandler.get_subphrases(tuple(user_query.split()), length=len(word_tuple))
+
+    _, score = queryhandler.evaluate_candidate(candidate, word_tuple, subphrases, user_query)
+    assert queryhandler._get_score_upper_bound(candidate, word_tuple, subphrases, user_query) >= score
+
+
+@pytest.mark.parametrize("phrase, positions, expected", (
+    # Direct matches cover wherever they occur around the word tuple...
+    ("milk chocolate with hazelnuts", (1, 2), (1, 4)),
+    ("chocolate with", (2,), (2, 3)),
+    # ...including the terms they only match partially
+    ("milk chocolate wit", (1, 2), (1, 3)),
+    # ...but only around the word tuple itself
+    ("hazelnuts", (0,), (0, 0)),
+))
+def test_get_match_span(phrase, positions, expected):
+    query_terms = ("dark", "milk", "chocolate", "with", "hazelnuts")
+    assert queryhandler.get_match_span(phrase, positions, query_terms) == expected
+
+
+class RecordingCandidates(dict):
+    """Finds the phrases as long as the word tuple they contain (as if the others had been cut off)."""
+
+    def __init__(self, phrases):
+        super().__init__()
+        self.phrases = phrases
+        self.looked_up = []
+
+
+    def __missing__(self, word_tuple):
+        self.looked_up.append(word_tuple)
+        return tuple(
+            indexing.build_candidate(phrase) for phrase in self.phrases
+            if " ".join(word_tuple) in phrase and len(phrase.split()) == len(word_tuple)
+        )
+
+
+@pytest.mark.parametrize("prune_matches, expected_matches, expected_lookups", (
+    (False, {"red velvet cake", "velvet", "apples"}, 9),
+    # The subphrases within 'red velvet cake' are never even looked up
+    (True, {"red velvet cake", "apples"}, 4),
+))
+def test_score_query_prunes_matches(prune_matches, expected_matches, expected_lookups):
+    phrase_candidates = RecordingCandidates(("red velvet cake", "velvet", "apples"))
+
+    result = queryhandler.score_query(
+        query_terms=("red", "velvet", "cake", "apples"),
+        phrase_candidates=phrase_candidates,
+        phrase_options=(3, 0),
+        prune_matches=prune_matches,
+    )
+    assert set(result) == expected_matches
+    assert len(phrase_candidates.looked_up) == expected_lookups
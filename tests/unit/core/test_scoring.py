@@ -0,0 +1,55 @@
+import itertools
+import random
+
+import pytest
+from whoosh.support.levenshtein import levenshtein
+
+from beeapi import constants as beeconst
+from beeapi.core import scoring
+
+
+def _sample_pairs():
+    rng = random.Random(1234)
+    words = ["", "a", "apple", "apples", "juice", "jus", "pomme", "red velvet cake", "velvet", "cakes"]
+
+    pairs = [(word1, word2) for (word1, word2) in itertools.product(words, repeat=2)]
+    pairs.extend(
+        ("".join(rng.choices("abc ", k=rng.randint(0, 12))), "".join(rng.choices("abc ", k=rng.randint(0, 12))))
+        for _ in range(200)
+    )
+    # The phrase-level heuristics compare candidate strings against tuples of words
+    pairs.extend((word, ("red", "velvet", "cake")) for word in words)
+    pairs.append((("a",), "a"))
+    return pairs
+
+
+@pytest.mark.parametrize("backend_name", scoring.SCORING_BACKENDS.keys())
+def test_backends_match_reference_levenshtein(backend_name):
+    try:
+        backend = scoring.get_scoring_backend(backend_name)
+    except ImportError:
+        pytest.skip(f"{backend_name} is not installed")
+
+    pairs = _sample_pairs()
+    expected = [levenshtein(seq1, seq2) for (seq1, seq2) in pairs]
+
+    assert backend.pairwise_distances(pairs) == expected
+    assert [backend.distance(seq1, seq2) for (seq1, seq2) in pairs] == expected
+
+
+def test_default_backend_available():
+    backend = scoring.get_scoring_backend()
+    assert backend.name in scoring.SCORING_BACKENDS
+    assert scoring.get_scoring_backend(beeconst.SCORING_BACKEND_PYTHON)
+
+
+@pytest.mark.parametrize("seq1, seq2", (
+    ("apple", "apple"),
+    ("apple", "apples"),
+    ("apples*", "apple"),
+    ("", "**"),
+    ("red velvet cake", "red velvet cakes"),
+))
+def test_alignment(seq1, seq2):
+    expected = sum(w1 == w2 for (w1, w2) in itertools.zip_longest(seq1, seq2, fillvalue="*"))
+    assert scoring.alignment(seq1, seq2) == expected
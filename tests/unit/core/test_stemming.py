@@ -0,0 +1,31 @@
+from beeapi.core import stemming
+
+
+def test_memoized_stemmer():
+    stemmer = stemming.MemoizedStemmer(stemming.WhooshSnowballStemmer.get_stemmer_for("fr"), max_entries=2)
+
+    assert [stemmer(word) for word in ("pommes", "pommes", "poires", "jus", "pommes")] == \
+        ["pomm", "pomm", "poir", "jus", "pomm"]
+
+    # The memo only holds on to the last two words, so the last "pommes" had been forgotten
+    assert stemmer.stats() == {"hits": 1, "misses": 4, "entries": 2}
+
+
+def test_memoized_stemmers_by_language():
+    stemming.clear_stem_caches()
+    langs = ("fr", "de", "es", "it", "ru", "pt", None, "xx")
+
+    stemmers = [stemming.WhooshSnowballStemmer.get_memoized_stemmer_for(lang) for lang in langs]
+    assert [stemming.WhooshSnowballStemmer.get_memoized_stemmer_for(lang) for lang in langs] == stemmers
+
+    stemmers[0]("pommes")
+    stemmers[0]("pommes")
+    stemmers[-1]("Apples")
+
+    stats = stemming.get_stem_cache_stats()
+    assert stats["fr"] == {"hits": 1, "misses": 1, "entries": 1}
+    assert stats["xx"] == {"hits": 0, "misses": 1, "entries": 1}
+    assert stemming.format_stem_cache_stats(stats).startswith("33.3% of 3 words (fr 50%, xx 0%")
+
+    merged = stemming.merge_stem_cache_stats([stats, {"fr": {"hits": 2, "misses": 0, "entries": 1}}])
+    assert merged["fr"] == {"hits": 3, "misses": 1, "entries": 2}
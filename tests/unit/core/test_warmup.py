@@ -0,0 +1,38 @@
+from beeapi.core import indexing, warmup
+
+
+def test_warm_up_index():
+    index = indexing.build_index_from_storage(storage=indexing.build_ram_storage())
+    for (lineno, (original, stemmed)) in enumerate((("apple", "appl"), ("apple juice", "appl juic")), start=1):
+        indexing.add_document_to_index(
+            original=original,
+            stemmed=stemmed,
+            lineno=lineno,
+            index=index,
+        )
+
+    stats = warmup.warm_up_index(index)
+    assert stats["phrases"] == 2
+    assert stats["terms"] == 2
+    assert stats["seconds"] >= 0
+
+
+def test_query_recorder_roundtrip(tmp_path):
+    path = tmp_path / "warmup_queries.txt"
+    recorder = warmup.QueryRecorder(max_entries=2)
+
+    # Nothing recorded yet - nothing to save
+    assert recorder.save(path) == 0
+    assert not path.exists()
+
+    recorder.record(["apple  juice", "pear"])
+    recorder.record(["apple juice", "", "peach"])
+    recorder.record(["peach", "apple juice"])
+
+    assert recorder.most_common() == ["apple juice", "peach"]
+    assert recorder.save(path) == 2
+
+    assert warmup.load_warmup_queries(path) == ["apple juice", "peach"]
+    assert warmup.load_warmup_queries(path, count=1) == ["apple juice"]
+    assert warmup.load_warmup_queries(path, count=0) == []
+    assert warmup.load_warmup_queries(tmp_path / "missing.txt") == []
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+from whoosh.index import LockError
+
+from beeapi.core import indexing, writebuffer
+
+
+def _build_index():
+    storage = indexing.build_ram_storage()
+    index = indexing.build_index_from_storage(storage=storage)
+    return index
+
+
+def _document(lineno, phrase):
+    document = indexing.build_document(original=phrase, stemmed=phrase, lineno=lineno)
+    return document
+
+
+def test_write_buffer_commits_in_batches():
+    index = _build_index()
+    write_buffer = writebuffer.WriteBehindBuffer(index=index, max_docs=3, period=60)
+
+    try:
+        assert write_buffer.add(_document(1, "apple juice")) == 1
+        assert write_buffer.add(_document(2, "pancakes")) == 2
+        assert index.doc_count() == 0
+
+        write_buffer.add(_document(3, "red velvet cake"))
+
+        for _ in range(100):
+            if index.doc_count() == 3:
+                break
+            time.sleep(0.05)
+
+        assert index.doc_count() == 3
+        assert write_buffer.stats() == {"pending": 0, "committed": 3, "commits": 1}
+
+    finally:
+        write_buffer.close()
+
+
+def test_write_buffer_flushes_on_close():
+    index = _build_index()
+    write_buffer = writebuffer.WriteBehindBuffer(index=index, max_docs=100, period=60)
+
+    write_buffer.add_many([_document(1, "apple juice"), _document(2, "pancakes")])
+    write_buffer.close()
+
+    assert index.doc_count() == 2
+
+
+def test_write_buffer_drops_rejected_documents():
+    index = _build_index()
+    write_buffer = writebuffer.WriteBehindBuffer(index=index, max_docs=100, period=60)
+
+    try:
+        write_buffer.add_many([
+            _document(1, "apple juice"),
+            {**_document(2, "pancakes"), "no_such_field": "x"},
+            _document(3, "red velvet cake"),
+        ])
+        assert write_buffer.flush() == 2
+        assert index.doc_count() == 2
+
+        # The write lock has been released, and nothing is stuck in the buffer
+        write_buffer.add(_document(4, "crepes"))
+        assert write_buffer.flush() == 1
+        assert write_buffer.stats() == {"pending": 0, "committed": 3, "commits": 2}
+
+    finally:
+        write_buffer.close()
+
+
+def test_write_buffer_requeues_on_locked_index(tmp_path):
+    # NOTE: RAM storage locks can only be waited on, hence the file storage
+    storage = indexing.build_file_storage(index_dir=str(tmp_path))
+    index = indexing.build_index_from_storage(storage=storage)
+    write_buffer = writebuffer.WriteBehindBuffer(index=index, max_docs=100, period=60, lock_timeout=0)
+
+    try:
+        write_buffer.add(_document(1, "apple juice"))
+
+        writer = index.writer()
+        try:
+            with pytest.raises(LockError):
+                write_buffer.flush()
+        finally:
+            writer.cancel()
+
+        assert write_buffer.stats()["pending"] == 1
+        assert write_buffer.flush() == 1
+        assert index.doc_count() == 1
+
+    finally:
+        write_buffer.close()